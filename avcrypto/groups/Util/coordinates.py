@@ -0,0 +1,439 @@
+"""
+Point representations for elliptic curves y**2 = x**3 + a*x + b over F_p.
+
+Affine points are tuples (x, y). Jacobian points (X, Y, Z) stand for the
+affine point (X/Z**2, Y/Z**3) and projective points (X, Y, Z) stand for
+(X/Z, Y/Z). In both the point at infinity is any triple with Z = 0; in
+affine form it is the INFINITY sentinel below.
+
+None of the formulas below invert anything, so a whole scalar
+multiplication can run in one of these systems and pay for a single
+inversion when the result is converted back to affine coordinates.
+Formulas follow the explicit-formulas database (add-2007-bl, dbl-2007-bl,
+madd-2007-bl for Jacobian; add-1998-cmo-2 and dbl-2007-bl for projective).
+ExtensionJacobian repeats the Jacobian formulas for curves over F_{p**k},
+with the arithmetic of an ExtensionField in place of ints mod p.
+"""
+
+from number_theory import mod_inv, batch_mod_inv
+
+
+class PointAtInfinity(object):
+    """ The identity O of the group of points of an elliptic curve """
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'O'
+
+    def __reduce__(self):
+        return 'INFINITY'
+
+
+INFINITY = PointAtInfinity()
+
+
+class Jacobian(object):
+    """ Jacobian coordinates (X, Y, Z) ~ (X/Z**2, Y/Z**3) """
+
+    IDENTITY = (1, 1, 0)
+
+    @staticmethod
+    def from_affine(point):
+        """ Lifts an affine point (x, y) to (x, y, 1) """
+        return (point[0], point[1], 1)
+
+    @staticmethod
+    def to_affine(point, p):
+        """ Converts back to (x, y), or None for the point at infinity """
+        X, Y, Z = point
+        if Z % p == 0:
+            return None
+        zi = mod_inv(Z, p)
+        zi2 = zi * zi % p
+        return (X * zi2 % p, Y * zi2 * zi % p)
+
+    @staticmethod
+    def batch_to_affine(points, p):
+        """ Converts a list of points to affine with a single inversion """
+        finite = [i for i, P in enumerate(points) if P[2] % p != 0]
+        inverses = batch_mod_inv([points[i][2] for i in finite], p)
+        affine = [None] * len(points)
+        for i, zi in zip(finite, inverses):
+            X, Y, Z = points[i]
+            zi2 = zi * zi % p
+            affine[i] = (X * zi2 % p, Y * zi2 * zi % p)
+        return affine
+
+    @staticmethod
+    def double(point, a, p):
+        """ Doubles a Jacobian point """
+        X1, Y1, Z1 = point
+        if Z1 == 0 or Y1 == 0:
+            return Jacobian.IDENTITY
+        XX = X1 * X1 % p
+        YY = Y1 * Y1 % p
+        YYYY = YY * YY % p
+        ZZ = Z1 * Z1 % p
+        S = 4 * X1 * YY % p
+        M = (3 * XX + a * ZZ * ZZ) % p
+        X3 = (M * M - 2 * S) % p
+        Y3 = (M * (S - X3) - 8 * YYYY) % p
+        Z3 = 2 * Y1 * Z1 % p
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def add(P, Q, a, p):
+        """ Adds two Jacobian points """
+        X1, Y1, Z1 = P
+        X2, Y2, Z2 = Q
+        if Z1 == 0:
+            return Q
+        if Z2 == 0:
+            return P
+        Z1Z1 = Z1 * Z1 % p
+        Z2Z2 = Z2 * Z2 % p
+        U1 = X1 * Z2Z2 % p
+        U2 = X2 * Z1Z1 % p
+        S1 = Y1 * Z2 * Z2Z2 % p
+        S2 = Y2 * Z1 * Z1Z1 % p
+        H = (U2 - U1) % p
+        r = (S2 - S1) % p
+        if H == 0:
+            if r == 0:
+                return Jacobian.double(P, a, p)
+            return Jacobian.IDENTITY
+        HH = H * H % p
+        HHH = H * HH % p
+        V = U1 * HH % p
+        X3 = (r * r - HHH - 2 * V) % p
+        Y3 = (r * (V - X3) - S1 * HHH) % p
+        Z3 = Z1 * Z2 * H % p
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def add_mixed(P, Q, a, p):
+        """ Adds a Jacobian point P and an affine point Q """
+        X1, Y1, Z1 = P
+        X2, Y2 = Q
+        if Z1 == 0:
+            return (X2, Y2, 1)
+        Z1Z1 = Z1 * Z1 % p
+        U2 = X2 * Z1Z1 % p
+        S2 = Y2 * Z1 * Z1Z1 % p
+        H = (U2 - X1) % p
+        r = (S2 - Y1) % p
+        if H == 0:
+            if r == 0:
+                return Jacobian.double(P, a, p)
+            return Jacobian.IDENTITY
+        HH = H * H % p
+        HHH = H * HH % p
+        V = X1 * HH % p
+        X3 = (r * r - HHH - 2 * V) % p
+        Y3 = (r * (V - X3) - Y1 * HHH) % p
+        Z3 = Z1 * H % p
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def negate(point, p):
+        """ Negates a Jacobian point """
+        return (point[0], -point[1] % p, point[2])
+
+
+class Projective(object):
+    """ Homogeneous projective coordinates (X, Y, Z) ~ (X/Z, Y/Z) """
+
+    IDENTITY = (0, 1, 0)
+
+    @staticmethod
+    def from_affine(point):
+        """ Lifts an affine point (x, y) to (x, y, 1) """
+        return (point[0], point[1], 1)
+
+    @staticmethod
+    def to_affine(point, p):
+        """ Converts back to (x, y), or None for the point at infinity """
+        X, Y, Z = point
+        if Z % p == 0:
+            return None
+        zi = mod_inv(Z, p)
+        return (X * zi % p, Y * zi % p)
+
+    @staticmethod
+    def batch_to_affine(points, p):
+        """ Converts a list of points to affine with a single inversion """
+        finite = [i for i, P in enumerate(points) if P[2] % p != 0]
+        inverses = batch_mod_inv([points[i][2] for i in finite], p)
+        affine = [None] * len(points)
+        for i, zi in zip(finite, inverses):
+            X, Y, Z = points[i]
+            affine[i] = (X * zi % p, Y * zi % p)
+        return affine
+
+    @staticmethod
+    def double(point, a, p):
+        """ Doubles a projective point """
+        X1, Y1, Z1 = point
+        if Z1 == 0 or Y1 == 0:
+            return Projective.IDENTITY
+        XX = X1 * X1 % p
+        ZZ = Z1 * Z1 % p
+        w = (a * ZZ + 3 * XX) % p
+        s = 2 * Y1 * Z1 % p
+        ss = s * s % p
+        sss = s * ss % p
+        R = Y1 * s % p
+        RR = R * R % p
+        B = ((X1 + R) ** 2 - XX - RR) % p
+        h = (w * w - 2 * B) % p
+        X3 = h * s % p
+        Y3 = (w * (B - h) - 2 * RR) % p
+        return (X3, Y3, sss)
+
+    @staticmethod
+    def add(P, Q, a, p):
+        """ Adds two projective points """
+        X1, Y1, Z1 = P
+        X2, Y2, Z2 = Q
+        if Z1 == 0:
+            return Q
+        if Z2 == 0:
+            return P
+        Y1Z2 = Y1 * Z2 % p
+        X1Z2 = X1 * Z2 % p
+        Z1Z2 = Z1 * Z2 % p
+        u = (Y2 * Z1 - Y1Z2) % p
+        v = (X2 * Z1 - X1Z2) % p
+        if v == 0:
+            if u == 0:
+                return Projective.double(P, a, p)
+            return Projective.IDENTITY
+        uu = u * u % p
+        vv = v * v % p
+        vvv = v * vv % p
+        R = vv * X1Z2 % p
+        A = (uu * Z1Z2 - vvv - 2 * R) % p
+        X3 = v * A % p
+        Y3 = (u * (R - A) - vvv * Y1Z2) % p
+        Z3 = vvv * Z1Z2 % p
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def add_mixed(P, Q, a, p):
+        """ Adds a projective point P and an affine point Q """
+        X1, Y1, Z1 = P
+        X2, Y2 = Q
+        if Z1 == 0:
+            return (X2, Y2, 1)
+        u = (Y2 * Z1 - Y1) % p
+        v = (X2 * Z1 - X1) % p
+        if v == 0:
+            if u == 0:
+                return Projective.double(P, a, p)
+            return Projective.IDENTITY
+        uu = u * u % p
+        vv = v * v % p
+        vvv = v * vv % p
+        R = vv * X1 % p
+        A = (uu * Z1 - vvv - 2 * R) % p
+        X3 = v * A % p
+        Y3 = (u * (R - A) - vvv * Y1) % p
+        Z3 = vvv * Z1 % p
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def negate(point, p):
+        """ Negates a projective point """
+        return (point[0], -point[1] % p, point[2])
+
+
+class ExtensionJacobian(object):
+    """
+    Jacobian coordinates over an ExtensionField F (see extension_field.py):
+    coordinates are tuples of k ints and F takes the place of p, the
+    identity being any triple with Z = 0
+    """
+
+    @staticmethod
+    def identity(F):
+        return (F.one, F.one, F.zero)
+
+    @staticmethod
+    def from_affine(point, F):
+        """ Lifts an affine point (x, y) to (x, y, 1) """
+        return (point[0], point[1], F.one)
+
+    @staticmethod
+    def to_affine(point, F):
+        """ Converts back to (x, y), or None for the point at infinity """
+        X, Y, Z = point
+        if not any(Z):
+            return None
+        zi = F.inv(Z)
+        zi2 = F.sqr(zi)
+        return (F.mul(X, zi2), F.mul(Y, F.mul(zi2, zi)))
+
+    @staticmethod
+    def batch_to_affine(points, F):
+        """ Converts a list of points to affine with a single inversion """
+        finite = [i for i, P in enumerate(points) if any(P[2])]
+        inverses = F.batch_inv([points[i][2] for i in finite])
+        affine = [None] * len(points)
+        for i, zi in zip(finite, inverses):
+            X, Y, Z = points[i]
+            zi2 = F.sqr(zi)
+            affine[i] = (F.mul(X, zi2), F.mul(Y, F.mul(zi2, zi)))
+        return affine
+
+    @staticmethod
+    def double(point, a, F):
+        """ Doubles a Jacobian point """
+        X1, Y1, Z1 = point
+        if not any(Z1) or not any(Y1):
+            return ExtensionJacobian.identity(F)
+        XX = F.sqr(X1)
+        YY = F.sqr(Y1)
+        YYYY = F.sqr(YY)
+        ZZ = F.sqr(Z1)
+        S = F.scale(F.mul(X1, YY), 4)
+        M = F.add(F.scale(XX, 3), F.mul(a, F.sqr(ZZ)))
+        X3 = F.sub(F.sqr(M), F.scale(S, 2))
+        Y3 = F.sub(F.mul(M, F.sub(S, X3)), F.scale(YYYY, 8))
+        Z3 = F.scale(F.mul(Y1, Z1), 2)
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def add(P, Q, a, F):
+        """ Adds two Jacobian points """
+        X1, Y1, Z1 = P
+        X2, Y2, Z2 = Q
+        if not any(Z1):
+            return Q
+        if not any(Z2):
+            return P
+        Z1Z1 = F.sqr(Z1)
+        Z2Z2 = F.sqr(Z2)
+        U1 = F.mul(X1, Z2Z2)
+        U2 = F.mul(X2, Z1Z1)
+        S1 = F.mul(Y1, F.mul(Z2, Z2Z2))
+        S2 = F.mul(Y2, F.mul(Z1, Z1Z1))
+        H = F.sub(U2, U1)
+        r = F.sub(S2, S1)
+        if not any(H):
+            if not any(r):
+                return ExtensionJacobian.double(P, a, F)
+            return ExtensionJacobian.identity(F)
+        HH = F.sqr(H)
+        HHH = F.mul(H, HH)
+        V = F.mul(U1, HH)
+        X3 = F.sub(F.sub(F.sqr(r), HHH), F.scale(V, 2))
+        Y3 = F.sub(F.mul(r, F.sub(V, X3)), F.mul(S1, HHH))
+        Z3 = F.mul(F.mul(Z1, Z2), H)
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def add_mixed(P, Q, a, F):
+        """ Adds a Jacobian point P and an affine point Q """
+        X1, Y1, Z1 = P
+        X2, Y2 = Q
+        if not any(Z1):
+            return (X2, Y2, F.one)
+        Z1Z1 = F.sqr(Z1)
+        U2 = F.mul(X2, Z1Z1)
+        S2 = F.mul(Y2, F.mul(Z1, Z1Z1))
+        H = F.sub(U2, X1)
+        r = F.sub(S2, Y1)
+        if not any(H):
+            if not any(r):
+                return ExtensionJacobian.double(P, a, F)
+            return ExtensionJacobian.identity(F)
+        HH = F.sqr(H)
+        HHH = F.mul(H, HH)
+        V = F.mul(X1, HH)
+        X3 = F.sub(F.sub(F.sqr(r), HHH), F.scale(V, 2))
+        Y3 = F.sub(F.mul(r, F.sub(V, X3)), F.mul(Y1, HHH))
+        Z3 = F.mul(Z1, H)
+        return (X3, Y3, Z3)
+
+    @staticmethod
+    def negate(point, F):
+        """ Negates a Jacobian point """
+        return (point[0], F.neg(point[1]), point[2])
+
+
+COORDINATE_SYSTEMS = {'jacobian': Jacobian, 'projective': Projective}
+
+
+def cswap(bit, u, v):
+    """
+    Returns (u, v) if bit == 0 and (v, u) if bit == 1 for non-negative ints,
+    without branching on bit
+    """
+    t = -bit & (u ^ v)
+    return u ^ t, v ^ t
+
+
+class XOnly(object):
+    """
+    x-only coordinates (X, Z) ~ x = X/Z, with Z = 0 the point at infinity
+    (Brier-Joye formulas for short Weierstrass curves).
+    """
+
+    @staticmethod
+    def double(X, Z, a, b, p):
+        """ x(2Q) from x(Q) """
+        XX = X * X % p
+        ZZ = Z * Z % p
+        t = (XX - a * ZZ) % p
+        X2 = (t * t - 8 * b * X * ZZ * Z) % p
+        Z2 = 4 * Z * (X * XX + a * X * ZZ + b * ZZ * Z) % p
+        return X2, Z2
+
+    @staticmethod
+    def differential_add(X1, Z1, X2, Z2, x, a, b, p):
+        """ x(Q + R) from x(Q), x(R) and the affine x = x(Q - R) """
+        X1Z2 = X1 * Z2 % p
+        X2Z1 = X2 * Z1 % p
+        Z1Z2 = Z1 * Z2 % p
+        d = (X1Z2 - X2Z1) % p
+        Z3 = d * d % p
+        X3 = (2 * (X1Z2 + X2Z1) * (X1 * X2 + a * Z1Z2)
+              + 4 * b * Z1Z2 * Z1Z2 - x * Z3) % p
+        return X3, Z3
+
+    @staticmethod
+    def ladder(k, point, a, b, p, bits):
+        """
+        Montgomery ladder for k*point with 0 <= k < 2**bits. Every one of
+        the bits iterations performs one differential addition and one
+        doubling, and the ladder registers are exchanged with cswap, so
+        the sequence of field operations does not depend on k. y is
+        recovered at the end (Okeya-Sakurai) with a single inversion.
+        Returns an affine point or None for the point at infinity.
+        """
+        x, y = point
+        X0, Z0, X1, Z1 = 1, 0, x, 1
+        previous = 0
+        for i in xrange(bits - 1, -1, -1):
+            bit = (k >> i) & 1
+            swap = bit ^ previous
+            X0, X1 = cswap(swap, X0, X1)
+            Z0, Z1 = cswap(swap, Z0, Z1)
+            previous = bit
+            X1, Z1 = XOnly.differential_add(X0, Z0, X1, Z1, x, a, b, p)
+            X0, Z0 = XOnly.double(X0, Z0, a, b, p)
+        X0, X1 = cswap(previous, X0, X1)
+        Z0, Z1 = cswap(previous, Z0, Z1)
+
+        # Now (X0 : Z0) = x(kP) and (X1 : Z1) = x((k+1)P)
+        if Z0 == 0:
+            return None
+        if y == 0:
+            return (x, 0)
+        if Z1 == 0:
+            return (x, -y % p)
+        N = (2 * b * Z0 * Z0 * Z1 + (a * Z0 + x * X0) * (x * Z0 + X0) * Z1
+             - X1 * (x * Z0 - X0) ** 2) % p
+        D = 2 * y * Z0 * Z0 * Z1 % p
+        inverse = mod_inv(D, p)
+        return (X0 * 2 * y * Z0 * Z1 * inverse % p, N * inverse % p)
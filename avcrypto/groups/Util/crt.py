@@ -0,0 +1,90 @@
+"""
+Chinese remaindering.
+
+crt combines a list of congruences along a product tree: neighbours are
+merged pairwise, then the merged pairs, and so on, so most of the work is
+on balanced operands and the whole costs O(log k) rounds of products
+instead of k growing ones. Congruences accumulates them one at a time as
+they arrive, which lets point counting watch how many traces are still
+possible and stop as soon as that is few enough. restrict cuts a single
+progression down by one more congruence, as the baby-step giant-step
+searches of mestre.py and jacobian_order.py do with point orders.
+"""
+
+from fractions import gcd
+
+import number_theory
+
+
+def _combine((m1, r1), (m2, r2)):
+    """ The congruence mod lcm(m1, m2) equivalent to both """
+    g = gcd(m1, m2)
+    if g == 1:
+        k = (r2 - r1) * number_theory.mod_inv(m1 % m2, m2) % m2 if m2 > 1 \
+            else 0
+        return m1 * m2, r1 + m1 * k
+    if (r2 - r1) % g:
+        raise ValueError("inconsistent congruences mod %d and %d" % (m1, m2))
+    m = m2 // g
+    k = (r2 - r1) // g * number_theory.mod_inv(m1 // g % m, m) % m \
+        if m > 1 else 0
+    return m1 * m, (r1 + m1 * k) % (m1 * m)
+
+
+def restrict(r, m, s, n):
+    """
+    (r', lcm(m, n)) for the progression x = r mod m cut down to the x = s
+    mod n. Raises ArithmeticError if there are none, which in point
+    counting means the orders of two points contradict each other.
+    """
+    try:
+        M, x = _combine((m, r % m), (n, s % n))
+    except ValueError:
+        raise ArithmeticError("no x = %d mod %d is %d mod %d" % (r, m, s, n))
+    return x % M, M
+
+
+def crt(congruences):
+    """
+    (r, M) with x = r mod M equivalent to x = r_i mod m_i for all the
+    (m_i, r_i) in congruences, M the lcm of the m_i
+    """
+    level = [(m, r % m) for m, r in congruences]
+    if not level:
+        return 0, 1
+    while len(level) > 1:
+        merged = [_combine(level[i], level[i + 1])
+                  for i in xrange(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            merged.append(level[-1])
+        level = merged
+    m, r = level[0]
+    return r % m, m
+
+
+class Congruences(object):
+    """ x = residue mod modulus, refined one congruence at a time """
+
+    def __init__(self, congruences=()):
+        self.residue, self.modulus = crt(congruences)
+
+    def add(self, m, r):
+        """ Adds x = r mod m """
+        self.modulus, self.residue = _combine((self.modulus, self.residue),
+                                              (m, r % m))
+        self.residue %= self.modulus
+
+    def update(self, congruences):
+        """ Adds many congruences at once, through crt """
+        r, m = crt(congruences)
+        self.add(m, r)
+
+    def symmetric(self):
+        """ The residue in (-modulus/2, modulus/2] """
+        r = self.residue
+        return r - self.modulus if r > self.modulus // 2 else r
+
+    def count(self, bound):
+        """ The number of x with |x| <= bound left """
+        M, r = self.modulus, self.residue
+        return (bound - r) // M - (-bound - r - 1) // M
@@ -0,0 +1,411 @@
+"""
+Discrete logarithms on elliptic curves y**2 = x**3 + a*x + b over F_p:
+Pollard's rho for k with Q = k*P and P of order n, Pollard's kangaroo
+(lambda) method for k known to lie in an interval [lo, hi), and
+Pohlig-Hellman with baby steps and giant steps for smooth n.
+
+Both run many walks at once, in lockstep, so every step of a batch of
+walkers shares one modular inversion (see batch_mod_inv), and both detect
+collisions with distinguished points: a walk only reports the points whose
+x has dp_bits zero bits, and two walks that met carry on to the same
+distinguished point. The batches are independent, so with workers (see
+parallel.py) they run on a process pool between rounds of collision
+checks.
+
+The rho walk is an r-adding walk X -> X + R_j, j = x(X) mod r, on the
+classes {X, -X} (the negation map): every point is replaced by the one of
+X, -X with the smaller y, which halves the space to walk and saves a
+factor sqrt(2). Fruitless 2-cycles X -> Y -> X are left by doubling, and
+walks that go on too long without a distinguished point start over. If
+Q is not a multiple of P no collision gives a logarithm, so rho gives up
+after _rho_budget times sqrt(n) steps, against about sqrt(pi*n/4) when
+there is one.
+
+Kangaroos jump by powers of two 2**j*P, j = x(X) mod J, with J picked so
+the mean jump is m*sqrt(w)/4 for m kangaroos and an interval of width w
+(van Oorschot and Wiener). Tame kangaroos start near the middle of the
+interval at known multiples of P, wild ones at Q plus known multiples.
+
+Pohlig-Hellman reduces k mod q**e, for each prime power q**e of n, to e
+logarithms in the subgroup of order q, and those are found by baby steps
+and giant steps when q is small enough for the table and by rho when it
+is not. The table maps x(j*P) to j for 1 <= j <= m, which covers -j*P
+too, so the giant steps can be 2m + 1 apart.
+"""
+
+import random
+from fractions import gcd
+
+from number_theory import mod_inv, batch_mod_inv, isqrt
+from coordinates import Jacobian
+from mestre import multiply
+from crt import crt
+from parallel import unordered_map, is_parallel
+
+# Walkers stepped together by one task, sharing their inversions
+_walkers = 32
+
+# Jumps R_j of the r-adding walk
+_rho_jumps = 64
+
+# Steps of all the rho walks together, in multiples of sqrt(n) plus one
+# round, before Q is taken not to be a multiple of P
+_rho_budget = 8
+
+# Walks without a distinguished point for this many times 2**dp_bits
+# steps are assumed stuck in a cycle
+_max_walk = 20
+
+# Distinguished point bits are taken above the ones choosing the jump
+_dp_shift = 16
+
+# Collisions leaving more than this many candidates for k are dropped
+_max_candidates = 1 << 12
+
+# Tasks per round when workers is an executor of unknown size
+_executor_tasks = 8
+
+# Most baby steps kept in memory, a few hundred bytes each; subgroups of
+# order above (2*_max_babies)**2 go to rho instead
+_max_babies = 1 << 18
+
+# Giant steps normalised to affine with one inversion
+_giant_batch = 256
+
+
+def _tasks(workers):
+    """ The number of batches of walkers run each round """
+    if not is_parallel(workers):
+        return 1
+    return _executor_tasks if hasattr(workers, 'submit') else workers
+
+
+def _distinguished(x, dp_bits):
+    return (x >> _dp_shift) & ((1 << dp_bits) - 1) == 0
+
+
+def _combination(c, P, d, Q, a, p):
+    """ c*P + d*Q in affine coordinates, None for the identity """
+    R = Jacobian.add(multiply(c, Jacobian.from_affine(P), a, p),
+                     multiply(d, Jacobian.from_affine(Q), a, p), a, p)
+    return Jacobian.to_affine(R, p)
+
+
+def _batch_add(left, right, a, p):
+    """
+    left[i] + right[i] for affine points other than the identity, with a
+    single inversion; None where a sum is the identity
+    """
+    sums = [None] * len(left)
+    pending, numerators, denominators = [], [], []
+    for i, ((x1, y1), (x2, y2)) in enumerate(zip(left, right)):
+        if x1 != x2:
+            numerators.append(y1 - y2)
+            denominators.append(x1 - x2)
+        elif (y1 + y2) % p == 0:
+            continue
+        else:
+            numerators.append(3 * x1 * x1 + a)
+            denominators.append(2 * y1)
+        pending.append((i, x1, y1, x2))
+    inverses = batch_mod_inv(denominators, p)
+    for (i, x1, y1, x2), u, inverse in zip(pending, numerators, inverses):
+        s = u * inverse % p
+        x3 = (s * s - x1 - x2) % p
+        sums[i] = (x3, (s * (x1 - x3) - y1) % p)
+    return sums
+
+
+def _rho_start(P, Q, n, a, p, rn):
+    """ A fresh walk [x, y, c, d, previous x, length] on X = c*P + d*Q """
+    while True:
+        c, d = rn.randrange(n), rn.randrange(n)
+        X = _combination(c, P, d, Q, a, p)
+        if X is not None:
+            return _canonical(X[0], X[1], c, d, n, p) + [None, 0]
+
+
+def _canonical(x, y, c, d, n, p):
+    """ The one of +-X with the smaller y, with its coefficients """
+    if 2 * y > p:
+        return [x, p - y, -c % n, -d % n]
+    return [x, y, c, d]
+
+
+def rho_walks(a, p, n, P, Q, jumps, states, dp_bits, steps, seed):
+    """
+    steps of the r-adding walks in states (fresh ones if None) on the
+    classes +-X. Returns the walks, to be carried on by the next call, and
+    the (x, c, d) of every distinguished point c*P + d*Q met.
+    """
+    rn = random.Random(seed)
+    if states is None:
+        states = [_rho_start(P, Q, n, a, p, rn) for i in xrange(_walkers)]
+    r = len(jumps)
+    limit = _max_walk << dp_bits
+    found = []
+    for step in xrange(steps):
+        # Walks that just went X -> Y -> X double instead
+        right = [(s[0], s[1]) if s[0] == s[4] else jumps[s[0] % r][2]
+                 for s in states]
+        sums = _batch_add([(s[0], s[1]) for s in states], right, a, p)
+        for i, (s, R) in enumerate(zip(states, sums)):
+            x, y, c, d, previous, length = s
+            if R is None:
+                states[i] = _rho_start(P, Q, n, a, p, rn)
+                continue
+            if x == previous:
+                e, f = 2 * c % n, 2 * d % n
+            else:
+                e, f = (c + jumps[x % r][0]) % n, (d + jumps[x % r][1]) % n
+            s = _canonical(R[0], R[1], e, f, n, p)
+            if s[0] == previous:
+                # X -> Y -> X, the one with the smaller x doubles next
+                s = min(s, [x, y, c, d])
+                s += [s[0], length + 1]
+            else:
+                s += [x, length + 1]
+            if _distinguished(s[0], dp_bits):
+                found.append((s[0], s[2], s[3]))
+                s = _rho_start(P, Q, n, a, p, rn)
+            elif length > limit:
+                s = _rho_start(P, Q, n, a, p, rn)
+            states[i] = s
+    return states, found
+
+
+def _solve(c1, d1, c2, d2, n, is_log):
+    """ A k with c1 + d1*k = c2 + d2*k mod n and is_log(k), or None """
+    u, v = (d1 - d2) % n, (c2 - c1) % n
+    g = gcd(u, n)
+    if g == n or v % g or g > _max_candidates:
+        return None
+    m = n // g
+    k = v // g * mod_inv(u // g, m) % m
+    for i in xrange(g):
+        if is_log(k + i * m):
+            return k + i * m
+    return None
+
+
+def rho_log(a, p, P, Q, n, workers=None):
+    """
+    k in [0, n) with Q = k*P for affine points P of order n and Q, by
+    Pollard's rho in about sqrt(pi*n/4) steps. n should be prime (or
+    Pohlig-Hellman will do better). Raises ArithmeticError if no
+    logarithm turns up in _rho_budget*sqrt(n) steps, which is all but
+    certain to mean that Q is not a multiple of P.
+    """
+    if Q == P:
+        return 1 % n
+    is_log = lambda k: _combination(k, P, 0, P, a, p) == Q
+    tasks = _tasks(workers)
+    dp_bits = max(0, n.bit_length() // 2 -
+                  (tasks * _walkers).bit_length() - 3)
+    steps = max(64, 2 << dp_bits)
+    limit = _rho_budget * (isqrt(n) + tasks * _walkers * steps)
+
+    jumps = []
+    while len(jumps) < _rho_jumps:
+        c, d = random.randrange(n), random.randrange(n)
+        R = _combination(c, P, d, Q, a, p)
+        if R is not None:
+            jumps.append((c, d, R))
+
+    groups = [None] * tasks
+    seen = {}
+    walked = 0
+    while walked < limit:
+        args = [(a, p, n, P, Q, jumps, states, dp_bits, steps,
+                 random.getrandbits(64)) for states in groups]
+        groups = []
+        results = unordered_map(rho_walks, args, workers)
+        for task, (states, found) in results:
+            groups.append(states)
+            for x, c, d in found:
+                if x not in seen:
+                    seen[x] = (c, d)
+                    continue
+                k = _solve(c, d, seen[x][0], seen[x][1], n, is_log)
+                if k is not None:
+                    results.close()
+                    return k
+        walked += tasks * _walkers * steps
+    raise ArithmeticError("Q is not a multiple of P")
+
+
+def kangaroo_walks(a, p, jumps, states, dp_bits, steps):
+    """
+    steps jumps of the kangaroos [x, y, distance, tame] in states. Returns
+    them and the (i, x, distance, tame) of every distinguished point that
+    kangaroo i landed on.
+    """
+    J = len(jumps)
+    found = []
+    for step in xrange(steps):
+        choices = []
+        for x, y, distance, tame in states:
+            # X + S_j = O would end the walk, take the next jump instead
+            j = x % J
+            while jumps[j][1][0] == x and jumps[j][1][1] != y:
+                j = (j + 1) % J
+            choices.append(j)
+        sums = _batch_add([(s[0], s[1]) for s in states],
+                          [jumps[j][1] for j in choices], a, p)
+        for i, (s, j, R) in enumerate(zip(states, choices, sums)):
+            s = [R[0], R[1], s[2] + jumps[j][0], s[3]]
+            if _distinguished(s[0], dp_bits):
+                found.append((i, s[0], s[2], s[3]))
+            states[i] = s
+    return states, found
+
+
+def kangaroo_log(a, p, P, Q, lo, hi, workers=None):
+    """
+    k in [lo, hi) with Q = k*P for affine points P and Q, by Pollard's
+    kangaroo method in about 2*sqrt(hi - lo) steps. Raises ArithmeticError
+    once the kangaroos have gone far enough that there is no such k.
+    """
+    if Q == _combination(lo, P, 0, P, a, p):
+        return lo
+    w = hi - lo
+    tasks = _tasks(workers)
+    m = tasks * _walkers
+    mean = max(1, m * isqrt(w) // 4)
+    J = 1
+    while ((1 << J) - 1) // J < mean:
+        J += 1
+    jumps, S = [], P
+    for j in xrange(J):
+        jumps.append((1 << j, S))
+        S = _combination(2, S, 0, S, a, p)
+        if S is None:
+            break
+    mean = ((1 << len(jumps)) - 1) // len(jumps)
+    dp_bits = max(0, w.bit_length() // 2 - m.bit_length() - 2)
+    steps = max(64, 2 << dp_bits)
+    limit = 4 * w + (mean << (dp_bits + 6))
+
+    # Tame kangaroos at t*P near the middle, wild ones at Q - lo*P + u*P,
+    # so that k - lo = t - u when a tame and a wild one meet
+    def start(tame):
+        while True:
+            u = random.randrange(1, mean + 1)
+            t = w // 2 + u if tame else u
+            X = _combination(t, P, 0, P, a, p) if tame else \
+                _combination(u - lo, P, 1, Q, a, p)
+            if X is not None:
+                return [X[0], X[1], t, tame]
+    groups = [[start(j % 2 == 0) for j in xrange(_walkers)]
+              for i in xrange(tasks)]
+
+    seen = {}
+    travelled = 0
+    while travelled < limit:
+        args = [(a, p, jumps, states, dp_bits, steps) for states in groups]
+        groups = []
+        for task, (states, found) in unordered_map(kangaroo_walks, args,
+                                                   workers):
+            groups.append(states)
+            for i, x, distance, tame in found:
+                if x not in seen:
+                    seen[x] = (distance, tame)
+                    continue
+                other, other_tame = seen[x]
+                if tame == other_tame:
+                    # Same trail as an earlier kangaroo, move this one off
+                    states[i] = start(tame)
+                    continue
+                k = lo + (other - distance if other_tame else distance - other)
+                if lo <= k < hi and _combination(k, P, 0, P, a, p) == Q:
+                    return k
+        travelled += steps * mean
+    raise ArithmeticError("no logarithm in the interval")
+
+
+def bsgs_log(a, p, P, Q, n, babies=_max_babies):
+    """
+    k in [0, n) with Q = k*P for an affine point P of order n, by baby
+    steps and giant steps with at most babies baby steps in memory, or
+    None if Q is not a multiple of P
+    """
+    m = max(1, min(babies, isqrt(n) // 2 + 1, (n - 1) // 2))
+    Pj = Jacobian.from_affine(P)
+    steps = [Pj]
+    for j in xrange(1, m):
+        steps.append(Jacobian.add_mixed(steps[-1], P, a, p))
+    table = {}
+    for j, (x, y) in enumerate(Jacobian.batch_to_affine(steps, p), 1):
+        table.setdefault(x, (j, y))
+
+    # Giant steps Q - i*s*P, s = 2m + 1
+    s = 2 * m + 1
+    G = Jacobian.to_affine(multiply(-s, Pj, a, p), p)
+    R = Jacobian.from_affine(Q)
+    i = 0
+    while (i - 1) * s <= n:
+        giants = [R]
+        # s*P = O only for tiny n, and then Q is the only giant step
+        while G is not None and len(giants) < _giant_batch:
+            giants.append(Jacobian.add_mixed(giants[-1], G, a, p))
+        for l, T in enumerate(Jacobian.batch_to_affine(giants, p)):
+            if T is None:
+                return (i + l) * s % n
+            if T[0] in table:
+                j, y = table[T[0]]
+                return ((i + l) * s + (j if y == T[1] else -j)) % n
+        if G is None:
+            break
+        R = Jacobian.add_mixed(giants[-1], G, a, p)
+        i += _giant_batch
+    return None
+
+
+def _subgroup_log(a, p, P, Q, q, workers):
+    """ The logarithm of Q to the base P of prime order q """
+    if Q is None:
+        return 0
+    if q <= (2 * _max_babies) ** 2:
+        k = bsgs_log(a, p, P, Q, q)
+        if k is None:
+            raise ArithmeticError("Q is not a multiple of P")
+        return k
+    return rho_log(a, p, P, Q, q, workers)
+
+
+def pohlig_hellman_log(a, p, P, Q, factors, workers=None):
+    """
+    k in [0, n) with Q = k*P for affine points P of order n and Q, given
+    the prime factors of n with multiplicity. Costs about sqrt(q) group
+    operations for the largest prime q | n. Raises ArithmeticError if Q
+    is not a multiple of P.
+    """
+    if Q is None:
+        return 0
+    n = 1
+    for q in factors:
+        n *= q
+    # Every multiple of P has n*Q = O. That rules out any other Q unless
+    # E has points of order q | n outside <P>, which needs q**2 | #E;
+    # rho's step budget catches those
+    if _combination(n, Q, 0, Q, a, p) is not None:
+        raise ArithmeticError("Q is not a multiple of P")
+    congruences = []
+    for q in sorted(set(factors)):
+        e = factors.count(q)
+        # P_q of order q**e and gamma of order q
+        Pq = _combination(n // q ** e, P, 0, P, a, p)
+        Qq = _combination(n // q ** e, Q, 0, Q, a, p)
+        gamma = _combination(q ** (e - 1), Pq, 0, Pq, a, p)
+        k = 0
+        for i in xrange(e):
+            # q**(e-1-i)*(Q_q - k*P_q) = d*gamma, the next digit d of k
+            c = q ** (e - 1 - i)
+            h = _combination(-k * c, Pq, c, Qq, a, p) if Qq is not None \
+                else _combination(-k * c, Pq, 0, Pq, a, p)
+            k += _subgroup_log(a, p, gamma, h, q, workers) * q ** i
+        congruences.append((q ** e, k))
+    k = crt(congruences)[0]
+    if _combination(k, P, 0, P, a, p) != Q:
+        raise ArithmeticError("Q is not a multiple of P")
+    return k
@@ -0,0 +1,158 @@
+"""
+Division polynomials of y**2 = x**3 + a*x + b over F_p.
+
+The y**2 = f(x) convention keeps everything in F_p[x]: psi_n = f_n for odd
+n and psi_n = y*f_n for even n, and every y**2 that the recurrences
+produce is replaced by f. With m = n // 2,
+
+    f_{2m+1} = f**2 * f_{m+2} f_m**3 - f_{m-1} f_{m+1}**3   (m even)
+    f_{2m+1} = f_{m+2} f_m**3 - f**2 * f_{m-1} f_{m+1}**3   (m odd)
+    f_{2m}   = f_m (f_{m+2} f_{m-1}**2 - f_{m-2} f_{m+1}**2) / 2
+
+so f_n only depends on the five f_k around n/2. DivisionPolynomials
+builds f_n from the few indices that chain actually reaches, bottom up,
+and keeps the results in a cache bounded by its total number of
+coefficients, evicting the least recently used ones. One cache per curve
+is shared through for_curve() by Schoof, SEA and EllipticCurve.dpoly.
+"""
+
+from collections import OrderedDict
+
+from polynomial import normalize, sub, mul, sqr, scale
+
+# Default bound on the coefficients a cache holds, f_n has about n**2/2
+_max_coefficients = 1 << 22
+
+# Caches kept by for_curve(), least recently used first
+_max_curves = 8
+_curves = OrderedDict()
+
+
+class DivisionPolynomials(object):
+    """
+    The f_n of y**2 = x**3 + a*x + b over F_p, optionally reduced by a
+    PolynomialModulus, computed on demand and cached
+    """
+
+    def __init__(self, a, b, p, modulus=None,
+                 max_coefficients=_max_coefficients):
+        self.a, self.b, self.p = a % p, b % p, p
+        self.modulus = modulus
+        self.max_coefficients = max_coefficients
+        a, b = self.a, self.b
+        self._f2 = self._reduce(sqr([b, a, 0, 1], p))
+        self._base = [
+            [], [1], [2 % p],
+            self._reduce(normalize([-a * a % p, 12 * b % p, 6 * a % p, 0,
+                                    3 % p])),
+            self._reduce(normalize([4 * (-a ** 3 - 8 * b * b) % p,
+                                    -16 * a * b % p, -20 * a * a % p,
+                                    80 * b % p, 20 * a % p, 0, 4 % p]))]
+        self._half = pow(2, p - 2, p)
+        self._cache = OrderedDict()
+        self._size = 0
+
+    def _reduce(self, g):
+        return g if self.modulus is None else self.modulus.reduce(g)
+
+    def _mul(self, g, h):
+        if self.modulus is None:
+            return mul(g, h, self.p)
+        return self.modulus.mul(g, h)
+
+    def _sqr(self, g):
+        if self.modulus is None:
+            return sqr(g, self.p)
+        return self.modulus.sqr(g)
+
+    def _step(self, n, f):
+        """ f_n from the dict f holding f_{m-2}..f_{m+2}, m = n // 2 """
+        m, p = n // 2, self.p
+        if n % 2:
+            u = self._mul(f[m + 2], self._mul(f[m], self._sqr(f[m])))
+            v = self._mul(f[m - 1], self._mul(f[m + 1], self._sqr(f[m + 1])))
+            if m % 2:
+                v = self._mul(self._f2, v)
+            else:
+                u = self._mul(self._f2, u)
+            return sub(u, v, p)
+        u = sub(self._mul(f[m + 2], self._sqr(f[m - 1])),
+                self._mul(f[m - 2], self._sqr(f[m + 1])), p)
+        return scale(self._mul(f[m], u), self._half, p)
+
+    def _store(self, n, g):
+        self._cache[n] = g
+        self._size += len(g)
+        while self._size > self.max_coefficients and len(self._cache) > 1:
+            k, h = self._cache.popitem(last=False)
+            self._size -= len(h)
+
+    def __getitem__(self, n):
+        """ f_n """
+        if n < 0:
+            raise ValueError("division polynomials have index n >= 0")
+        if n < len(self._base):
+            return self._base[n]
+        if n in self._cache:
+            g = self._cache.pop(n)
+            self._cache[n] = g
+            return g
+
+        # The indices f_n depends on that are not at hand, holding on to
+        # the ones that are so the stores below cannot evict them
+        known, missing, stack = {}, set(), [n]
+        while stack:
+            k = stack.pop()
+            if k in known or k in missing:
+                continue
+            if k < len(self._base):
+                known[k] = self._base[k]
+            elif k in self._cache:
+                known[k] = self._cache[k]
+            else:
+                missing.add(k)
+                stack.extend(xrange(k // 2 - 2, k // 2 + 3))
+        for k in sorted(missing):
+            known[k] = self._step(k, known)
+            self._store(k, known[k])
+        return known[n]
+
+    def range(self, n):
+        """
+        [f_0, ..., f_n], bottom up: the f_k that f_n depends on all come
+        before it in the list, so none is rebuilt however small the cache
+        """
+        f = self._base[:n + 1]
+        for k in xrange(len(f), n + 1):
+            g = self._cache.get(k)
+            if g is None:
+                g = self._step(k, f)
+                self._store(k, g)
+            f.append(g)
+        return f
+
+    def psi(self, n):
+        """ (f_n, e) with psi_n = y**e * f_n """
+        return self[n], 1 - n % 2
+
+
+def division_polynomials(n, a, b, p, modulus=None):
+    """
+    [f_0, ..., f_n] as coefficient lists over F_p, where the division
+    polynomials are psi_m = f_m for odd m and psi_m = y*f_m for even m.
+    With a PolynomialModulus they are computed in F_p[x]/(modulus).
+    """
+    return DivisionPolynomials(a, b, p, modulus, max_coefficients=0).range(n)
+
+
+def for_curve(a, b, p):
+    """ The DivisionPolynomials cache shared by everything working on E """
+    key = (a % p, b % p, p)
+    if key in _curves:
+        cache = _curves.pop(key)
+    else:
+        cache = DivisionPolynomials(a, b, p)
+        if len(_curves) >= _max_curves:
+            _curves.popitem(last=False)
+    _curves[key] = cache
+    return cache
@@ -0,0 +1,238 @@
+"""
+Integer factorisation: trial division, Pollard's rho and Lenstra's
+elliptic curve method (ECM).
+
+ECM works on Montgomery curves B*y**2 = x**3 + A*x**2 + x mod n in x-only
+projective coordinates (X : Z), Suyama's parametrisation giving each sigma
+a curve whose order is divisible by 12. Stage 1 computes k*Q with a
+Montgomery ladder for k the product of the prime powers up to B1; a prime
+p | n for which #E(F_p) is B1-smooth shows up in gcd(Z, n). Stage 2
+catches the orders with one more prime q in (B1, B2]: with q = m*D +- j
+and baby steps x(j*Q) normalised by one batch inversion, the single
+product of X(m*D*Q) - x(j*Q)*Z(m*D*Q) over all such q covers both members
+of a prime pair m*D +- j at once.
+
+The curves are independent, so with workers (see parallel.py) they run
+on a process pool and the rest are cancelled as soon as one of them
+finds a factor.
+"""
+
+import random
+from fractions import gcd
+
+import number_theory
+import sieve
+from parallel import unordered_map
+
+# Trial division bound and Pollard rho iterations before ECM
+_trial_bound = 1 << 12
+_rho_iterations = 1 << 16
+
+# (B1, curves) by expected size of the factor, 15 to 40 digits, B2 = 100*B1
+_schedule = [(2000, 25), (11000, 90), (50000, 300), (250000, 700),
+             (1000000, 1800), (3000000, 5100)]
+
+# Stage 1 multipliers by B1, filled on first use in each process
+_multipliers = {}
+
+_trial_primes = list(sieve.primes(2, _trial_bound))
+
+
+def _double(X, Z, a24, n):
+    t1 = (X + Z) * (X + Z) % n
+    t2 = (X - Z) * (X - Z) % n
+    t3 = t1 - t2
+    return t1 * t2 % n, t3 * (t2 + a24 * t3) % n
+
+
+def _add(X1, Z1, X2, Z2, X0, Z0, n):
+    """ (X1 : Z1) + (X2 : Z2) given their difference (X0 : Z0) """
+    u = (X1 - Z1) * (X2 + Z2)
+    v = (X1 + Z1) * (X2 - Z2)
+    return Z0 * (u + v) * (u + v) % n, X0 * (u - v) * (u - v) % n
+
+
+def _ladder(k, X, Z, a24, n):
+    """ k*(X : Z) for k >= 1 """
+    X0, Z0 = X, Z
+    X1, Z1 = _double(X, Z, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == '1':
+            X0, Z0 = _add(X1, Z1, X0, Z0, X, Z, n)
+            X1, Z1 = _double(X1, Z1, a24, n)
+        else:
+            X1, Z1 = _add(X0, Z0, X1, Z1, X, Z, n)
+            X0, Z0 = _double(X0, Z0, a24, n)
+    return X0, Z0
+
+
+def _multiplier(B1):
+    """ The product of the largest powers of each prime up to B1 """
+    if B1 not in _multipliers:
+        k = 1
+        for q in sieve.primes(2, B1 + 1):
+            e = q
+            while e * q <= B1:
+                e *= q
+            k *= e
+        _multipliers[B1] = k
+    return _multipliers[B1]
+
+
+def _split(g, n):
+    return g if 1 < g < n else None
+
+
+def ecm_curve(n, sigma, B1, B2):
+    """
+    Stages 1 and 2 of ECM on the Suyama curve of sigma; returns a proper
+    factor of n or None
+    """
+    u = (sigma * sigma - 5) % n
+    v = 4 * sigma % n
+    X, Z = pow(u, 3, n), pow(v, 3, n)
+    # (A + 2)/4 = (v - u)**3 (3u + v) / (16 u**3 v)
+    denominator = 16 * X * v % n
+    g = gcd(denominator, n)
+    if g != 1:
+        return _split(g, n)
+    a24 = pow(v - u, 3, n) * (3 * u + v) * \
+        number_theory.mod_inv(denominator, n) % n
+
+    # Stage 1
+    X, Z = _ladder(_multiplier(B1), X, Z, a24, n)
+    g = gcd(Z, n)
+    if g != 1:
+        return _split(g, n)
+    if B2 <= B1:
+        return None
+
+    # Stage 2, baby steps j*Q for odd j < D/2 prime to D
+    D = 2310 if B2 >= 1 << 20 else 210
+    X2, Z2 = _double(X, Z, a24, n)
+    steps = {1: (X, Z)}
+    previous, current = (X, Z), _add(X2, Z2, X, Z, X, Z, n)
+    for j in xrange(3, D // 2, 2):
+        steps[j] = current
+        previous, current = current, _add(current[0], current[1], X2, Z2,
+                                          previous[0], previous[1], n)
+    babies = sorted(j for j in steps if gcd(j, D) == 1)
+    zs = [steps[j][1] for j in babies]
+    g = gcd(reduce(lambda s, t: s * t % n, zs, 1), n)
+    if g != 1:
+        return _split(g, n)
+    inverses = number_theory.batch_mod_inv(zs, n)
+    x = dict((j, steps[j][0] * zi % n) for j, zi in zip(babies, inverses))
+
+    # Giant steps m*D*Q
+    GX, GZ = _ladder(D, X, Z, a24, n)
+    m = max(1, (B1 + D // 2) // D)
+    R = _ladder(m, GX, GZ, a24, n)
+    R_previous = _ladder(m - 1, GX, GZ, a24, n) if m > 1 else None
+    product = 1
+    used = set()
+    for q in sieve.primes(B1 + 1, B2 + 1):
+        target = (q + D // 2) // D
+        while m < target:
+            if R_previous is None:
+                R, R_previous = _double(R[0], R[1], a24, n), R
+            else:
+                R, R_previous = _add(R[0], R[1], GX, GZ, R_previous[0],
+                                     R_previous[1], n), R
+            m += 1
+            used = set()
+        j = abs(q - m * D)
+        if j in x and j not in used:
+            used.add(j)
+            product = product * (R[0] - x[j] * R[1]) % n
+    return _split(gcd(product, n), n)
+
+
+def pollard_rho(n, iterations=_rho_iterations):
+    """ A proper factor of the odd composite n by Brent's rho, or None """
+    for c in xrange(1, 4):
+        y, r, q, g = random.randrange(n), 1, 1, 1
+        x = ys = y
+        while g == 1 and r <= iterations:
+            x = y
+            for i in xrange(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for i in xrange(min(128, r - k)):
+                    y = (y * y + c) % n
+                    q = q * (x - y) % n
+                g = gcd(q, n)
+                k += 128
+            r *= 2
+        if g == n:
+            # Backtrack one step at a time over the last batch
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(x - ys, n)
+        if 1 < g < n:
+            return g
+    return None
+
+
+def ecm(n, workers=None, schedule=_schedule):
+    """
+    A proper factor of the composite n by ECM with the B1 and numbers of
+    curves of schedule, or None
+    """
+    for B1, curves in schedule:
+        tasks = [(n, random.randrange(6, n - 1), B1, 100 * B1)
+                 for i in xrange(curves)]
+        results = unordered_map(ecm_curve, tasks, workers)
+        try:
+            for task, g in results:
+                if g is not None:
+                    return g
+        finally:
+            results.close()
+    return None
+
+
+def _perfect_power(n):
+    """ (r, k) with r**k = n and k > 1 as large as possible, or None """
+    for k in xrange(n.bit_length(), 1, -1):
+        # Newton's method for the integer k-th root, from above
+        r = 1 << ((n.bit_length() + k - 1) // k)
+        while True:
+            s = ((k - 1) * r + n // r ** (k - 1)) // k
+            if s >= r:
+                break
+            r = s
+        if r > 1 and r ** k == n:
+            return r, k
+    return None
+
+
+def factor(n, workers=None):
+    """ The prime factors of n with multiplicity, in increasing order """
+    if n < 0:
+        return [-1] + factor(-n, workers)
+    if n < 2:
+        return []
+    factors = []
+    for q in _trial_primes:
+        while n % q == 0:
+            factors.append(q)
+            n //= q
+    stack = [n] if n > 1 else []
+    while stack:
+        n = stack.pop()
+        if n < _trial_bound ** 2 or number_theory.is_probable_prime(n):
+            factors.append(n)
+            continue
+        power = _perfect_power(n)
+        if power is not None:
+            stack.extend([power[0]] * power[1])
+            continue
+        g = pollard_rho(n) or ecm(n, workers)
+        if g is None:
+            raise ArithmeticError("could not factor %d" % n)
+        stack.extend([g, n // g])
+    return sorted(factors)
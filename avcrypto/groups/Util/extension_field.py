@@ -0,0 +1,512 @@
+"""
+Arithmetic in extension fields F_{p**k} = F_p[t]/(m) without going
+through sympy.
+
+An element is a tuple of k ints in [0, p), lowest degree first, and the
+batch methods also take NumPy arrays of shape (n, k). The modulus m is
+picked as sparse as possible, a binomial t**k - c when one is irreducible
+and a trinomial otherwise, so reducing a product only folds each high
+coefficient into one or two low ones. Products are Karatsuba's, down to
+schoolbook below _karatsuba_threshold coefficients.
+
+Frobenius is F_p-linear, so a**(p**i) is the vector a times the matrix of
+the t**(j*p**i) mod m, precomputed for every i < k and kept sparse (for a
+binomial every row is a single monomial). Inversion is Itoh and Tsujii's:
+with r = (p**k - 1)/(p - 1), a**(r - 1) = a**(p + p**2 + ... + p**(k-1))
+takes O(log k) multiplications and Frobenius maps, the norm a**r lies in
+F_p, and 1/a = a**(r - 1)/a**r for one inversion mod p. The quadratic
+character of F_{p**k} is likewise that of the norm.
+"""
+
+import random
+
+from number_theory import mod_inv, batch_mod_inv, jacobi
+from polynomial import PolynomialModulus, gcd, sub
+
+# NumPy is optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many coefficients schoolbook multiplication beats Karatsuba
+_karatsuba_threshold = 6
+
+# Products of two residues must fit an int64 in the NumPy batches
+_max_prime = 1 << 31
+
+# Constants tried for a sparse modulus t**k - c or t**k + a*t**j + c
+_small_constants = 16
+
+
+def _karatsuba(f, g):
+    """ f * g for lists of the same length, coefficients not reduced """
+    n = len(f)
+    if n <= _karatsuba_threshold:
+        h = [0] * (2 * n - 1)
+        for i, a in enumerate(f):
+            if a:
+                for j, b in enumerate(g):
+                    h[i + j] += a * b
+        return h
+    m = n // 2
+    pad = [0] * (n - 2 * m)
+    f0, f1, g0, g1 = f[:m] + pad, f[m:], g[:m] + pad, g[m:]
+    z0 = _karatsuba(f0, g0)
+    z2 = _karatsuba(f1, g1)
+    z1 = _karatsuba([a + b for a, b in zip(f0, f1)],
+                    [a + b for a, b in zip(g0, g1)])
+    h = [0] * (2 * n - 1)
+    for i, (a, b, c) in enumerate(zip(z0, z1, z2)):
+        h[i] += a
+        h[i + m] += b - a - c
+        h[i + 2 * m] += c
+    return h
+
+
+def _karatsuba_sqr(f):
+    """ f**2, coefficients not reduced """
+    n = len(f)
+    if n <= _karatsuba_threshold:
+        h = [0] * (2 * n - 1)
+        for i, a in enumerate(f):
+            if a:
+                h[2 * i] += a * a
+                a2 = 2 * a
+                for j in xrange(i + 1, n):
+                    h[i + j] += a2 * f[j]
+        return h
+    m = n // 2
+    pad = [0] * (n - 2 * m)
+    f0, f1 = f[:m] + pad, f[m:]
+    z0 = _karatsuba_sqr(f0)
+    z2 = _karatsuba_sqr(f1)
+    z1 = _karatsuba_sqr([a + b for a, b in zip(f0, f1)])
+    h = [0] * (2 * n - 1)
+    for i, (a, b, c) in enumerate(zip(z0, z1, z2)):
+        h[i] += a
+        h[i + m] += b - a - c
+        h[i + 2 * m] += c
+    return h
+
+
+def _prime_factors(n):
+    """ The distinct prime factors of a small n """
+    factors, q = [], 2
+    while q * q <= n:
+        if n % q == 0:
+            factors.append(q)
+            while n % q == 0:
+                n //= q
+        q += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def is_irreducible(m, p):
+    """
+    Rabin's test for a monic m of degree k over F_p: t**(p**k) = t mod m
+    and gcd(t**(p**(k/q)) - t, m) = 1 for every prime q dividing k
+    """
+    k = len(m) - 1
+    R = PolynomialModulus(m, p)
+    powers = [[0, 1]]
+    for i in xrange(k):
+        powers.append(R.pow(powers[-1], p))
+    if sub(powers[k], [0, 1], p):
+        return False
+    return all(len(gcd(sub(powers[k // q], [0, 1], p), m, p)) == 1
+               for q in _prime_factors(k))
+
+
+def sparse_modulus(p, k):
+    """
+    An irreducible binomial t**k - c or trinomial t**k + a*t**j + c of
+    degree k with small constants, or a random irreducible if there is none
+    """
+    small = min(p, _small_constants)
+    for c in xrange(2, small):
+        m = [-c % p] + [0] * (k - 1) + [1]
+        if is_irreducible(m, p):
+            return m
+    for j in xrange(1, k):
+        for a in xrange(1, small):
+            for c in xrange(1, small):
+                m = [c] + [0] * (j - 1) + [a] + [0] * (k - j - 1) + [1]
+                if is_irreducible(m, p):
+                    return m
+    while True:
+        m = [random.randrange(1, p)] + \
+            [random.randrange(p) for i in xrange(k - 1)] + [1]
+        if is_irreducible(m, p):
+            return m
+
+
+class ExtensionField(object):
+    """ The finite field F_{p**k} = F_p[t]/(m) for an odd prime p, k > 1 """
+    __slots__ = ('p', 'k', 'modulus', 'zero', 'one', '_tail', '_frobenius',
+                 '_nonresidue')
+
+    def __init__(self, p, k, modulus=None):
+        """
+        modulus is a monic irreducible polynomial of degree k, lowest degree
+        first; by default the sparsest one sparse_modulus finds
+        """
+        p, k = int(p), int(k)
+        if k < 2:
+            raise ValueError("an extension needs degree k > 1")
+        if modulus is None:
+            modulus = sparse_modulus(p, k)
+        modulus = [int(c) % p for c in modulus]
+        if len(modulus) != k + 1 or modulus[-1] != 1:
+            raise ValueError("modulus must be monic of degree %s" % k)
+        self.p, self.k, self.modulus = p, k, modulus
+        self.zero = (0,) * k
+        self.one = (1,) + (0,) * (k - 1)
+        self._nonresidue = None
+
+        # t**k = sum of c*t**i over the tail
+        self._tail = [(i, -c % p) for i, c in enumerate(modulus[:k]) if c]
+
+        # _frobenius[i][j] = t**(j*p**i) mod m, as sparse rows (index, c)
+        t = (0, 1) + (0,) * (k - 2)
+        tp = self.pow(t, p)
+        rows = [self.one]
+        for j in xrange(1, k):
+            rows.append(self.mul(rows[-1], tp))
+        self._frobenius = [None, self._sparse(rows)]
+        for i in xrange(2, k):
+            rows = [self.frobenius(row) for row in rows]
+            self._frobenius.append(self._sparse(rows))
+
+    @staticmethod
+    def _sparse(rows):
+        return [[(i, c) for i, c in enumerate(row) if c] for row in rows]
+
+    def __call__(self, value):
+        """ Coerces an int, a sequence of ints or an element into the field """
+        return ExtensionElement(self.coerce(value), self)
+
+    def __eq__(self, other):
+        return isinstance(other, ExtensionField) and self.p == other.p and \
+            self.modulus == other.modulus
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.p, tuple(self.modulus)))
+
+    def __repr__(self):
+        return 'F_%s^%s' % (self.p, self.k)
+
+    def characteristic(self):
+        """ The characteristic p, as sympy's FiniteField reports it """
+        return self.p
+
+    def order(self):
+        """ Number of elements of F_{p**k} """
+        return self.p ** self.k
+
+    def coerce(self, value):
+        """ value as a tuple of k reduced ints """
+        if isinstance(value, ExtensionElement):
+            if value.field != self:
+                raise ValueError("Elements belong to different fields")
+            return value.value
+        p, k = self.p, self.k
+        if isinstance(value, (int, long)):
+            return (value % p,) + (0,) * (k - 1)
+        value = [int(c) % p for c in value]
+        if len(value) > k:
+            raise ValueError("%s has more than %s coefficients" % (value, k))
+        return tuple(value) + (0,) * (k - len(value))
+
+    def _reduce(self, h):
+        """ The tuple of h mod m for an unreduced list h of 2k - 1 ints """
+        p, k = self.p, self.k
+        for j in xrange(len(h) - 1, k - 1, -1):
+            c = h[j] % p
+            if c:
+                for i, d in self._tail:
+                    h[j - k + i] += c * d
+        return tuple(c % p for c in h[:k])
+
+    def add(self, a, b):
+        """ a + b """
+        p = self.p
+        return tuple((x + y) % p for x, y in zip(a, b))
+
+    def sub(self, a, b):
+        """ a - b """
+        p = self.p
+        return tuple((x - y) % p for x, y in zip(a, b))
+
+    def neg(self, a):
+        """ -a """
+        p = self.p
+        return tuple(-x % p for x in a)
+
+    def scale(self, a, c):
+        """ c*a for an int c """
+        p = self.p
+        return tuple(x * c % p for x in a)
+
+    def mul(self, a, b):
+        """ a * b by Karatsuba """
+        return self._reduce(_karatsuba(list(a), list(b)))
+
+    def sqr(self, a):
+        """ a**2 """
+        return self._reduce(_karatsuba_sqr(list(a)))
+
+    def pow(self, a, e):
+        """ a**e for e >= 0, left to right """
+        r = self.one
+        for bit in bin(e)[2:]:
+            r = self.sqr(r)
+            if bit == '1':
+                r = self.mul(r, a)
+        return r
+
+    def frobenius(self, a, i=1):
+        """ a**(p**i) with the precomputed matrix """
+        i %= self.k
+        if i == 0:
+            return a
+        p = self.p
+        h = [0] * self.k
+        for x, row in zip(a, self._frobenius[i]):
+            if x:
+                for j, c in row:
+                    h[j] += x * c
+        return tuple(c % p for c in h)
+
+    def _norm_cofactor(self, a):
+        """ a**(p + p**2 + ... + p**(k-1)), Itoh and Tsujii's chain """
+        k = self.k
+        b, n = self.frobenius(a), 1
+        for bit in bin(k - 1)[3:]:
+            b = self.mul(b, self.frobenius(b, n))
+            n *= 2
+            if bit == '1':
+                b = self.frobenius(self.mul(b, a))
+                n += 1
+        return b
+
+    def norm(self, a):
+        """ The norm a**((p**k - 1)/(p - 1)) of a to F_p, an int """
+        return self.mul(a, self._norm_cofactor(a))[0]
+
+    def inv(self, a):
+        """ 1/a by Itoh and Tsujii's algorithm """
+        b = self._norm_cofactor(a)
+        return self.scale(b, mod_inv(self.mul(a, b)[0], self.p))
+
+    def batch_inv(self, values):
+        """
+        Inverses of a list of elements for one Itoh-Tsujii inversion
+        (Montgomery's simultaneous inversion trick), or of an (n, k) array
+        with the Itoh-Tsujii chain run on the whole array
+        """
+        if np is not None and isinstance(values, np.ndarray):
+            b = self._array_norm_cofactor(values)
+            norms = self.batch_mul(values, b)[:, 0]
+            inverses = batch_mod_inv([int(c) for c in norms], self.p)
+            return b * np.array(inverses, dtype=np.int64)[:, None] % self.p
+        if not values:
+            return []
+        prefix = [self.one] * len(values)
+        acc = self.one
+        for i, v in enumerate(values):
+            prefix[i] = acc
+            acc = self.mul(acc, v)
+        acc = self.inv(acc)
+        inverses = [None] * len(values)
+        for i in xrange(len(values) - 1, -1, -1):
+            inverses[i] = self.mul(acc, prefix[i])
+            acc = self.mul(acc, values[i])
+        return inverses
+
+    def _check_array(self, values):
+        if self.p >= _max_prime:
+            raise ValueError("NumPy batches need p < 2**31")
+        return np.asarray(values, dtype=np.int64)
+
+    def batch_mul(self, left, right):
+        """
+        left[i] * right[i] for lists of elements, or column by column for
+        (n, k) arrays
+        """
+        if np is None or not isinstance(left, np.ndarray):
+            return [self.mul(a, b) for a, b in zip(left, right)]
+        left, right = self._check_array(left), self._check_array(right)
+        p, k = self.p, self.k
+        lazy = k * (p - 1) ** 2 < 1 << 63
+        h = np.zeros((len(left), 2 * k - 1), dtype=np.int64)
+        for i in xrange(k):
+            for j in xrange(k):
+                h[:, i + j] += left[:, i] * right[:, j] if lazy else \
+                    left[:, i] * right[:, j] % p
+                if not lazy:
+                    h[:, i + j] %= p
+        h %= p
+        for j in xrange(2 * k - 2, k - 1, -1):
+            for i, d in self._tail:
+                h[:, j - k + i] = (h[:, j - k + i] + h[:, j] * d) % p
+        return h[:, :k].copy()
+
+    def batch_frobenius(self, values, i=1):
+        """ values[n]**(p**i) for a list of elements or an (n, k) array """
+        if np is None or not isinstance(values, np.ndarray):
+            return [self.frobenius(a, i) for a in values]
+        values = self._check_array(values)
+        i %= self.k
+        if i == 0:
+            return values.copy()
+        p = self.p
+        out = np.zeros_like(values)
+        for x, row in enumerate(self._frobenius[i]):
+            for j, c in row:
+                out[:, j] = (out[:, j] + values[:, x] * c) % p
+        return out
+
+    def _array_norm_cofactor(self, values):
+        """ _norm_cofactor on every row of an (n, k) array """
+        b, n = self.batch_frobenius(values), 1
+        for bit in bin(self.k - 1)[3:]:
+            b = self.batch_mul(b, self.batch_frobenius(b, n))
+            n *= 2
+            if bit == '1':
+                b = self.batch_frobenius(self.batch_mul(b, values))
+                n += 1
+        return b
+
+    def legendre(self, a):
+        """ The quadratic character of a, that of its norm in F_p """
+        if not any(a):
+            return 0
+        return jacobi(self.norm(a), self.p)
+
+    def is_square(self, a):
+        """ Whether a is a square in F_{p**k}, zero included """
+        return self.legendre(a) >= 0
+
+    def nonresidue(self):
+        """ A random non-square of F_{p**k}, found once """
+        if self._nonresidue is None:
+            while True:
+                z = tuple(random.randrange(self.p) for i in xrange(self.k))
+                if self.legendre(z) == -1:
+                    self._nonresidue = z
+                    break
+        return self._nonresidue
+
+    def sqrt(self, a):
+        """
+        A square root of a in F_{p**k}, or None if a is no square: one
+        exponentiation for q = 3 mod 4, Tonelli-Shanks otherwise
+        """
+        if not any(a):
+            return self.zero
+        if self.legendre(a) != 1:
+            return None
+        q = self.order()
+        if q % 4 == 3:
+            return self.pow(a, (q + 1) // 4)
+        s, t = 0, q - 1
+        while t % 2 == 0:
+            s, t = s + 1, t // 2
+        z = self.pow(self.nonresidue(), t)
+        x = self.pow(a, (t + 1) // 2)
+        b = self.pow(a, t)
+        while b != self.one:
+            # The least i with b**(2**i) = 1
+            i, c = 0, b
+            while c != self.one:
+                c, i = self.sqr(c), i + 1
+            for j in xrange(s - i - 1):
+                z = self.sqr(z)
+            x, z = self.mul(x, z), self.sqr(z)
+            b, s = self.mul(b, z), i
+        return x
+
+
+class ExtensionElement(object):
+    """ An element of an ExtensionField """
+    __slots__ = ('value', 'field')
+
+    def __init__(self, value, field):
+        self.field = field
+        self.value = field.coerce(value)
+
+    def __add__(self, other):
+        F = self.field
+        return ExtensionElement(F.add(self.value, F.coerce(other)), F)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        F = self.field
+        return ExtensionElement(F.sub(self.value, F.coerce(other)), F)
+
+    def __rsub__(self, other):
+        F = self.field
+        return ExtensionElement(F.sub(F.coerce(other), self.value), F)
+
+    def __mul__(self, other):
+        F = self.field
+        return ExtensionElement(F.mul(self.value, F.coerce(other)), F)
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        F = self.field
+        return ExtensionElement(F.mul(self.value, F.inv(F.coerce(other))), F)
+
+    __truediv__ = __div__
+
+    def __rdiv__(self, other):
+        F = self.field
+        return ExtensionElement(F.mul(F.coerce(other), F.inv(self.value)), F)
+
+    __rtruediv__ = __rdiv__
+
+    def __neg__(self):
+        return ExtensionElement(self.field.neg(self.value), self.field)
+
+    def __pow__(self, n):
+        F = self.field
+        if n < 0:
+            return ExtensionElement(F.pow(F.inv(self.value), -n), F)
+        return ExtensionElement(F.pow(self.value, n), F)
+
+    def inverse(self):
+        """ Multiplicative inverse """
+        return ExtensionElement(self.field.inv(self.value), self.field)
+
+    def frobenius(self, i=1):
+        """ self**(p**i) """
+        return ExtensionElement(self.field.frobenius(self.value, i),
+                                self.field)
+
+    def __eq__(self, other):
+        try:
+            return self.value == self.field.coerce(other)
+        except (TypeError, ValueError):
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __nonzero__(self):
+        return any(self.value)
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return '%s' % (self.value,)
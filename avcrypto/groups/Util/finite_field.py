@@ -0,0 +1,82 @@
+"""
+Arithmetic in prime fields F_p without going through sympy.
+
+PrimeField holds everything that only depends on p, so curves can keep one
+around and reduce, invert and batch-invert through it. Elements are plain
+reduced ints, which is what the curve arithmetic works on.
+"""
+
+from number_theory import mod_inv, batch_mod_inv, is_probable_prime, \
+    jacobi, jacobi_batch
+from square_roots import nonresidue, sqrt_mod
+
+
+class PrimeField(object):
+    """ The finite field F_p for an odd prime p """
+    __slots__ = ('p', '_prime', '_nonresidue')
+
+    def __init__(self, p):
+        self.p = int(p)
+        self._prime = None
+        self._nonresidue = None
+
+    def __eq__(self, other):
+        return isinstance(other, PrimeField) and self.p == other.p
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.p)
+
+    def __repr__(self):
+        return 'F_%s' % self.p
+
+    def characteristic(self):
+        """ The characteristic p, as sympy's FiniteField reports it """
+        return self.p
+
+    def order(self):
+        """ Number of elements of F_p """
+        return self.p
+
+    def inv(self, a):
+        """ Inverse of the int a modulo p """
+        return mod_inv(a, self.p)
+
+    def batch_inv(self, values):
+        """ Inverses of many ints modulo p for the price of one inversion """
+        return batch_mod_inv(values, self.p)
+
+    def _check_prime(self):
+        """ Tests p for primality the first time a symbol is asked for """
+        if self._prime is None:
+            self._prime = self.p > 2 and is_probable_prime(self.p)
+        if not self._prime:
+            raise ValueError("%s is not an odd prime" % self.p)
+
+    def legendre(self, a):
+        """ The Legendre symbol of the int a, by the Jacobi symbol """
+        self._check_prime()
+        return jacobi(a, self.p)
+
+    def legendre_batch(self, values):
+        """ Legendre symbols of a list or NumPy array of ints """
+        self._check_prime()
+        return jacobi_batch(values, self.p)
+
+    def is_square(self, a):
+        """ Whether the int a is a square in F_p, zero included """
+        return self.legendre(a) >= 0
+
+    def nonresidue(self):
+        """ The least non-square of F_p, found once """
+        if self._nonresidue is None:
+            self._check_prime()
+            self._nonresidue = nonresidue(self.p)
+        return self._nonresidue
+
+    def sqrt(self, a):
+        """ A square root of the int a in F_p, or None if a is no square """
+        z = self.nonresidue() if self.p % 8 == 1 else None
+        return sqrt_mod(a, self.p, z)
@@ -0,0 +1,267 @@
+"""
+Explicit formulas for the Jacobian of a genus 2 curve y**2 = f(x) over
+F_p, deg f = 5, after Harley and Lange.
+
+The generic divisor class has u = x**2 + u1*x + u0 and v = v1*x + v0. In
+affine coordinates it is the tuple (u1, u0, v1, v0), and an addition or
+a doubling costs a single inversion: the inverse of u1 modulo u2 (or of
+2v modulo u) is only computed up to the resultant r, and r and the
+leading coefficient s1' of the slope polynomial are inverted together as
+1/(r*s1'). In projective coordinates (U1, U0, V1, V0, Z) stands for
+(U1/Z, U0/Z, V1/Z, V0/Z) and nothing is inverted until the end.
+
+With s = s1*x + s0 the slope polynomial (l = s*u1 + v1 agrees with both
+v1 and v2, or is tangent to the curve at D for a doubling) the result is
+u = (l**2 - f)/(u1*u2) made monic and v = -l mod u. Whenever that would
+not be a generic class (u1 and u2 not coprime, s of degree 0, divisors
+with deg u < 2) the formulas give way to Cantor's algorithm on the Mumford
+pairs (see mumford.py), which is also the form those classes are kept in.
+"""
+
+import mumford
+from number_theory import mod_inv, batch_mod_inv
+from polynomial import normalize
+
+
+def to_mumford(D):
+    """ The Mumford pair (u, v) of an affine divisor """
+    if len(D) == 2:
+        return D
+    u1, u0, v1, v0 = D
+    return [u0, u1, 1], normalize([v0, v1])
+
+
+def from_mumford(D):
+    """ An affine divisor for the Mumford pair D """
+    u, v = D
+    if len(u) != 3:
+        return D
+    v = v + [0] * (2 - len(v))
+    return (u[1], u[0], v[1], v[0])
+
+
+class Affine(object):
+    """ Affine coordinates (u1, u0, v1, v0), Mumford pairs otherwise """
+
+    IDENTITY = mumford.IDENTITY
+
+    @staticmethod
+    def _cantor(D1, D2, f, p):
+        return from_mumford(mumford.add(to_mumford(D1), to_mumford(D2),
+                                        f, 2, p))
+
+    @staticmethod
+    def _compose(s1, s0, r, D, U3, U2, f, p):
+        """
+        The class of u = (l**2 - f)/U made monic, v = -l mod u, for
+        l = (s1*x + s0)/r * u_D + v_D and U = x**4 + U3*x**3 + U2*x**2 + ...
+        """
+        u1, u0, v1, v0 = D
+        w = mod_inv(r * s1, p)
+        ri = w * s1 % p
+        s1, s0 = s1 * ri % p, s0 * ri % p
+        si = w * r % p * r % p
+        l2 = (s0 + s1 * u1) % p
+        l1 = (s0 * u1 + s1 * u0 + v1) % p
+        l0 = (s0 * u0 + v0) % p
+        si2 = si * si % p
+        a = (2 * l2 * si - f[5] * si2 - U3) % p
+        b = ((l2 * l2 + 2 * s1 * l1 - f[4]) * si2 - U2 - a * U3) % p
+        return (a, b, (l2 * a - l1 - s1 * (a * a - b)) % p,
+                (l2 * b - l0 - s1 * a * b) % p)
+
+    @staticmethod
+    def add(D1, D2, f, p):
+        """ Adds two divisor classes """
+        if len(D1) == 2 or len(D2) == 2:
+            return Affine._cantor(D1, D2, f, p)
+        if D1 == D2:
+            return Affine.double(D1, f, p)
+        u11, u10, v11, v10 = D1
+        u21, u20, v21, v20 = D2
+
+        # u1 = a1*x + a0 mod u2, and i1*x + i0 = r/u1 mod u2
+        a1, a0 = u11 - u21, u10 - u20
+        i1, i0 = -a1, a0 - a1 * u21
+        r = (a1 * a1 * u20 + a0 * i0) % p
+        if r == 0:
+            return Affine._cantor(D1, D2, f, p)
+
+        # s' = r*s = (v2 - v1)*(i1*x + i0) mod u2
+        w1, w0 = v21 - v11, v20 - v10
+        t = w1 * i1
+        s1 = (w1 * i0 + w0 * i1 - t * u21) % p
+        if s1 == 0:
+            return Affine._cantor(D1, D2, f, p)
+        s0 = (w0 * i0 - t * u20) % p
+        return Affine._compose(s1, s0, r, D1, u11 + u21,
+                               u10 + u20 + u11 * u21, f, p)
+
+    @staticmethod
+    def double(D, f, p):
+        """ Doubles a divisor class """
+        if len(D) == 2:
+            return Affine._cantor(D, D, f, p)
+        u1, u0, v1, v0 = D
+
+        # k = (f - v**2)/u mod u
+        k2 = f[4] - f[5] * u1
+        k1 = f[3] - f[5] * u0 - u1 * k2
+        k0 = f[2] - v1 * v1 - u0 * k2 - u1 * k1
+        kk1 = (f[5] * (u1 * u1 - u0) - k2 * u1 + k1) % p
+        kk0 = (f[5] * u1 * u0 - k2 * u0 + k0) % p
+
+        # i1*x + i0 = r/(2v) mod u
+        a1, a0 = 2 * v1, 2 * v0
+        i1, i0 = -a1, a0 - a1 * u1
+        r = (a1 * a1 * u0 + a0 * i0) % p
+        if r == 0:
+            return Affine._cantor(D, D, f, p)
+
+        # s' = r*s = k*(i1*x + i0) mod u
+        t = kk1 * i1
+        s1 = (kk1 * i0 + kk0 * i1 - t * u1) % p
+        if s1 == 0:
+            return Affine._cantor(D, D, f, p)
+        s0 = (kk0 * i0 - t * u0) % p
+        return Affine._compose(s1, s0, r, D, 2 * u1, u1 * u1 + 2 * u0,
+                               f, p)
+
+    @staticmethod
+    def negate(D, p):
+        """ -(u, v) = (u, -v) """
+        if len(D) == 2:
+            return mumford.negate(D, p)
+        return (D[0], D[1], -D[2] % p, -D[3] % p)
+
+
+class Projective(object):
+    """
+    Projective coordinates (U1, U0, V1, V0, Z) ~ (U1/Z, U0/Z, V1/Z, V0/Z),
+    Mumford pairs otherwise
+    """
+
+    IDENTITY = mumford.IDENTITY
+
+    @staticmethod
+    def from_affine(D):
+        """ Lifts an affine divisor to Z = 1 """
+        if len(D) == 2:
+            return D
+        return D + (1,)
+
+    @staticmethod
+    def to_affine(D, p):
+        """ Converts back to an affine divisor """
+        if len(D) == 2:
+            return D
+        zi = mod_inv(D[4], p)
+        return tuple(c * zi % p for c in D[:4])
+
+    @staticmethod
+    def batch_to_affine(divisors, p):
+        """ Converts a list of divisors to affine with a single inversion """
+        projective = [i for i, D in enumerate(divisors) if len(D) == 5]
+        inverses = batch_mod_inv([divisors[i][4] for i in projective], p)
+        affine = list(divisors)
+        for i, zi in zip(projective, inverses):
+            affine[i] = tuple(c * zi % p for c in divisors[i][:4])
+        return affine
+
+    @staticmethod
+    def _affine(D1, D2, operation, f, p):
+        """ The special cases, through affine coordinates """
+        D1, D2 = Projective.batch_to_affine([D1, D2], p)
+        return Projective.from_affine(operation(D1, D2, f, p))
+
+    @staticmethod
+    def _compose(S1, S0, D, X, U3, U2, Zp, f, p):
+        """
+        Affine._compose with denominators: s = (S1*x + S0)/D, the first
+        divisor X and U3/Zp, U2/Zp
+        """
+        U1, U0, V1, V0, Z1 = X
+        E = D * Z1 % p
+        T = S1 * Z1 % p
+        L2 = (S0 * Z1 + S1 * U1) % p
+        L1 = (S0 * U1 + S1 * U0 + V1 * D) % p
+        L0 = (S0 * U0 + V0 * D) % p
+        EE, TT = E * E % p, T * T % p
+        A = ((2 * L2 * T - f[5] * EE) * Zp - U3 * TT) % p
+        B = ((L2 * L2 + 2 * T * L1 - f[4] * EE) * Zp * Zp - U2 * TT * Zp
+             - A * U3) % p
+        A = A * Zp % p
+        Zo = TT * Zp % p * Zp % p
+        Zo2 = Zo * Zo % p
+        W1 = (L2 * A * Zo - L1 * Zo2 - T * (A * A - B * Zo)) % p
+        W0 = (L2 * B * Zo - L0 * Zo2 - T * A * B) % p
+        EZo = E * Zo % p
+        return (A * EZo % p, B * EZo % p, W1, W0, EZo * Zo % p)
+
+    @staticmethod
+    def add(D1, D2, f, p):
+        """ Adds two divisor classes """
+        if len(D1) == 2 or len(D2) == 2:
+            return Projective._affine(D1, D2, Affine.add, f, p)
+        U11, U10, V11, V10, Z1 = D1
+        U21, U20, V21, V20, Z2 = D2
+
+        A1 = (U11 * Z2 - U21 * Z1) % p
+        A0 = (U10 * Z2 - U20 * Z1) % p
+        W1 = (V21 * Z1 - V11 * Z2) % p
+        W0 = (V20 * Z1 - V10 * Z2) % p
+        if A1 == A0 == W1 == W0 == 0:
+            return Projective.double(D1, f, p)
+        I1 = -A1 * Z2
+        I0 = A0 * Z2 - A1 * U21
+        R = (A1 * A1 * U20 + A0 * I0) % p
+        if R == 0:
+            return Projective._affine(D1, D2, Affine.add, f, p)
+
+        t = W1 * I1
+        S1 = ((W1 * I0 + W0 * I1) * Z2 - t * U21) % p
+        if S1 == 0:
+            return Projective._affine(D1, D2, Affine.add, f, p)
+        S0 = (W0 * I0 * Z2 - t * U20) % p
+        return Projective._compose(S1, S0, Z2 * R % p, D1,
+                                   U11 * Z2 + U21 * Z1,
+                                   U10 * Z2 + U20 * Z1 + U11 * U21,
+                                   Z1 * Z2 % p, f, p)
+
+    @staticmethod
+    def double(D, f, p):
+        """ Doubles a divisor class """
+        if len(D) == 2:
+            return Projective._affine(D, D, Affine.add, f, p)
+        U1, U0, V1, V0, Z = D
+        ZZ = Z * Z % p
+
+        K2 = (f[4] * Z - f[5] * U1) % p
+        K1 = (f[3] * ZZ - f[5] * U0 * Z - U1 * K2) % p
+        K0 = (f[2] * ZZ * Z - V1 * V1 * Z - U0 * K2 * Z - U1 * K1) % p
+        KK1 = (f[5] * (U1 * U1 - U0 * Z) - K2 * U1 + K1) % p
+        KK0 = ((f[5] * U1 * U0 - K2 * U0) * Z + K0) % p
+
+        I1 = -2 * V1 * Z
+        I0 = 2 * V0 * Z - 2 * V1 * U1
+        R = (4 * V1 * V1 * U0 + 2 * V0 * I0) % p
+        if R == 0:
+            return Projective._affine(D, D, Affine.add, f, p)
+
+        t = KK1 * I1
+        S1 = (KK1 * I0 * Z + KK0 * I1 - t * U1) % p
+        if S1 == 0:
+            return Projective._affine(D, D, Affine.add, f, p)
+        S0 = (KK0 * I0 - t * U0) % p
+        return Projective._compose(S1, S0, ZZ * R % p, D, 2 * U1 * Z,
+                                   U1 * U1 + 2 * U0 * Z, ZZ, f, p)
+
+    @staticmethod
+    def negate(D, p):
+        """ -(u, v) = (u, -v) """
+        if len(D) == 2:
+            return mumford.negate(D, p)
+        return (D[0], D[1], -D[2] % p, -D[3] % p, D[4])
+
+
+COORDINATE_SYSTEMS = {'affine': Affine, 'projective': Projective}
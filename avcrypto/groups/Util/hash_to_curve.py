@@ -0,0 +1,115 @@
+"""
+Hashing to y**2 = x**3 + a*x + b with the simplified SWU map, following
+RFC 9380 (expand_message_xmd with SHA-256, hash_to_field, and
+map_to_curve_simple_swu for a, b != 0).
+
+The simplified SWU map sends a field element u to a point of E with a
+couple of exponentiations and no trial and error, deterministically, so
+large numbers of points can be derived from labels or counters at a
+steady rate. hash_to_curve adds the images of two field elements and is
+indistinguishable from a random oracle to E; encode_to_curve maps a
+single one, half the price, with a non-uniform output. Neither clears the
+cofactor, which is up to the caller on curves of composite order.
+"""
+
+import hashlib
+
+from coordinates import Jacobian, INFINITY
+from number_theory import roots_in_F_q
+from square_roots import sqrt_mod
+
+# Security level k of RFC 9380, in bits
+_security = 128
+
+
+def _strxor(u, v):
+    return ''.join(chr(ord(x) ^ ord(y)) for x, y in zip(u, v))
+
+
+def _i2osp(n, length):
+    return ''.join(chr(n >> (8 * i) & 255) for i in xrange(length - 1, -1, -1))
+
+
+def expand_message_xmd(message, dst, length):
+    """ length pseudo-random bytes from message and the domain tag dst """
+    ell = (length + 31) // 32
+    if ell > 255 or len(dst) > 255:
+        raise ValueError("expand_message_xmd asked for too much")
+    dst = dst + chr(len(dst))
+    b0 = hashlib.sha256('\0' * 64 + message + _i2osp(length, 2) + '\0' +
+                        dst).digest()
+    b = [hashlib.sha256(b0 + '\1' + dst).digest()]
+    for i in xrange(2, ell + 1):
+        b.append(hashlib.sha256(_strxor(b0, b[-1]) + chr(i) + dst).digest())
+    return ''.join(b)[:length]
+
+
+def hash_to_field(message, count, p, dst):
+    """ count elements of F_p from message """
+    L = (p.bit_length() + _security + 7) // 8
+    uniform = expand_message_xmd(message, dst, count * L)
+    return [int(uniform[i * L:(i + 1) * L].encode('hex'), 16) % p
+            for i in xrange(count)]
+
+
+def sswu_z(a, b, p):
+    """
+    The constant Z of the simplified SWU map for E (RFC 9380, H.2): the
+    first of 1, -1, 2, -2, ... that is a non-square, not -1, with g - Z
+    irreducible and g(b/(Z*a)) a square, g = x**3 + a*x + b
+    """
+    def square(v):
+        return pow(v % p, (p - 1) // 2, p) <= 1
+
+    n = 1
+    while True:
+        for Z in (n, -n):
+            if square(Z) or Z % p == p - 1:
+                continue
+            if roots_in_F_q(p, [b - Z, a, 0, 1]):
+                continue
+            x = b * pow(Z * a, p - 2, p) % p
+            if square(x ** 3 + a * x + b):
+                return Z % p
+        n += 1
+
+
+def map_to_curve(u, a, b, p, Z):
+    """ The simplified SWU image (x, y) of u in F_p """
+    uu = Z * u * u % p
+    den = (uu * uu + uu) % p
+    if den:
+        x = -b * pow(a, p - 2, p) * (1 + pow(den, p - 2, p)) % p
+    else:
+        x = b * pow(Z * a, p - 2, p) % p
+    y = sqrt_mod(x ** 3 + a * x + b, p)
+    if y is None:
+        x = uu * x % p
+        y = sqrt_mod(x ** 3 + a * x + b, p)
+    if u % 2 != y % 2:
+        y = -y % p
+    return x, y
+
+
+def _add(P, Q, a, p):
+    """ P + Q for affine points, by one mixed Jacobian addition """
+    R = Jacobian.add_mixed(Jacobian.from_affine(P), Q, a, p)
+    return Jacobian.to_affine(R, p) or INFINITY
+
+
+def hash_to_curve(message, a, b, p, dst, Z=None, add=None):
+    """
+    A point of E from message as in hash_to_curve of RFC 9380, add being
+    the group law on affine points (by default that of E)
+    """
+    Z = Z if Z is not None else sswu_z(a, b, p)
+    if add is None:
+        add = lambda P, Q: _add(P, Q, a, p)
+    u0, u1 = hash_to_field(message, 2, p, dst)
+    return add(map_to_curve(u0, a, b, p, Z), map_to_curve(u1, a, b, p, Z))
+
+
+def encode_to_curve(message, a, b, p, dst, Z=None):
+    """ A point of E from message as in encode_to_curve of RFC 9380 """
+    Z = Z if Z is not None else sswu_z(a, b, p)
+    return map_to_curve(hash_to_field(message, 1, p, dst)[0], a, b, p, Z)
@@ -0,0 +1,194 @@
+"""
+Orders of Jacobians of genus 2 curves y**2 = f(x), deg f = 5, over F_p.
+
+The characteristic polynomial of Frobenius
+
+    chi(T) = T**4 - s1*T**3 + s2*T**2 - p*s1*T + p**2
+
+gives #J = chi(1) and, for the quadratic twist y**2 = n*f(x), #J' =
+chi(-1). Its roots have k-th power sums p**k + 1 - #C(F_{p**k}), so
+Newton's identities recover chi from the point counts over F_p and
+F_{p**2} (frobenius_polynomial), which for small p are direct character
+sums (count_hyperelliptic_points in point_counting.py).
+
+For larger p only #C(F_p) is counted, which fixes s1. The Weil bounds
+leave s2 = b1*b2 + 2p for real b1 + b2 = s1 with |b_i| <= 2*sqrt(p), so
+2*sqrt(p)*|s1| - 2p <= s2 <= s1**2/4 + 2p, an interval of about 4p for
+#J = p**2 + 1 - s1*(p + 1) + s2. It is searched with baby steps and giant
+steps exactly as mestre.py searches the Hasse interval, in O(p**(1/2))
+group operations, alternating between J and J' (#J' = #J + 2*s1*(p + 1))
+until the orders of random divisors leave a single candidate.
+"""
+
+import random
+
+import mumford
+import genus2
+from genus2 import Projective
+from crt import restrict
+from number_theory import isqrt, lenstra
+from point_counting import count_hyperelliptic_points
+from polynomial import evaluate, normalize, scale
+from scalar_multiplication import scalar_multiply
+from square_roots import nonresidue, sqrt_mod
+
+# Below this p the curve is counted over F_{p**2} as well, above it the
+# Weil interval is wide enough against #J for divisor orders to settle it
+_direct_prime = 1 << 10
+
+# Divisors tried before giving up
+_max_divisors = 64
+
+
+def frobenius_polynomial(counts, p):
+    """
+    chi(T) of a curve of genus g = len(counts) with counts[k - 1] =
+    #C(F_{p**k}), as a list of ints lowest degree first
+    """
+    g = len(counts)
+    S = [p ** k + 1 - N for k, N in enumerate(counts, 1)]
+
+    # k*e_k = sum of (-1)**(i - 1)*e_(k - i)*S_i, and e_(2g - k) =
+    # p**(g - k)*e_k
+    e = [1]
+    for k in xrange(1, g + 1):
+        t = sum((-1) ** (i - 1) * e[k - i] * S[i - 1]
+                for i in xrange(1, k + 1))
+        if t % k:
+            raise ArithmeticError("no curve has these point counts")
+        e.append(t // k)
+    for k in xrange(g + 1, 2 * g + 1):
+        e.append(p ** (k - g) * e[2 * g - k])
+    return [(-1) ** k * e[k] for k in xrange(2 * g, -1, -1)]
+
+
+def _random_divisor(f, p):
+    """ A random class P1 + P2 - 2*O, affine when it can be """
+    D = mumford.IDENTITY
+    for i in xrange(2):
+        while True:
+            x = random.randrange(p)
+            y = sqrt_mod(evaluate(f, x, p), p)
+            if y is not None:
+                break
+        D = mumford.add(D, ([-x % p, 1], normalize([y])), f, 2, p)
+    return genus2.from_mumford(D)
+
+
+def _multiply(k, D, f, p):
+    R = scalar_multiply(k, D,
+                        lambda A, B: Projective.add(A, B, f, p),
+                        lambda A: Projective.double(A, f, p),
+                        lambda A: Projective.negate(A, p))
+    return R or mumford.IDENTITY
+
+
+def _key(D):
+    """ (u, v) of an affine divisor as tuples, u being shared by +-D """
+    u, v = genus2.to_mumford(D)
+    return tuple(u), tuple(v)
+
+
+def _baby_giant(D, start, step, count, f, p):
+    """
+    Some k in [0, count) with (start + k*step)*D = 0 for the affine
+    divisor D, or None if there is none
+    """
+    s = isqrt(count) + 1
+    D = Projective.from_affine(D)
+    T = _multiply(step, D, f, p)
+    babies = [T]
+    for j in xrange(1, s):
+        babies.append(Projective.add(babies[-1], T, f, p))
+    table, period = {}, None
+    for j, B in enumerate(Projective.batch_to_affine(babies, p), 1):
+        u, v = _key(B)
+        if len(u) == 1:
+            # j*T = 0, the solutions repeat every j steps
+            period = j
+            break
+        table.setdefault(u, (j, v))
+
+    # Giant steps of 2s + 1 centred on k = s + i*(2s + 1)
+    G = _multiply(2 * s + 1, T, f, p)
+    R = _multiply(start + s * step, D, f, p)
+    for centre in xrange(s, count + s, 2 * s + 1):
+        u, v = _key(Projective.to_affine(R, p))
+        if len(u) == 1:
+            found = [centre]
+        elif u in table:
+            j, w = table[u]
+            found = [centre - j] if w == v else [centre + j]
+        else:
+            found = []
+        for k in found:
+            if period:
+                k %= period
+            if 0 <= k < count:
+                return k
+        R = Projective.add(R, G, f, p)
+    return None
+
+
+def _divisor_order(D, m, f, p):
+    """ The order of the affine divisor D, given m*D = 0 """
+    D = Projective.from_affine(D)
+    factors = lenstra(m)
+    for q in set(factors):
+        for i in xrange(factors.count(q)):
+            if not mumford.is_identity(genus2.to_mumford(
+                    Projective.to_affine(_multiply(m // q, D, f, p), p))):
+                break
+            m //= q
+    return m
+
+
+def genus2_order(f, p, N1=None):
+    """
+    #J of y**2 = f(x), deg f = 5, over a prime p from N1 = #C(F_p),
+    counted if not given, with O(p**(1/2)) group operations
+    """
+    if N1 is None:
+        N1 = count_hyperelliptic_points([f], p, 1)[0][0]
+    s1 = p + 1 - N1
+    C = p * p + 1 - s1 * (p + 1)
+    lo = C - 2 * p + (isqrt(4 * p * s1 * s1 - 1) + 1 if s1 else 0)
+    hi = C + 2 * p + s1 * s1 // 4
+    delta = 2 * s1 * (p + 1)
+    twist = scale(f, nonresidue(p), p)
+
+    # #J = N0 mod M
+    N0, M = 0, 1
+    for i in xrange(_max_divisors):
+        first = lo + (N0 - lo) % M
+        if first + M > hi:
+            if first > hi:
+                raise ArithmeticError("no order left in the Weil interval")
+            return first
+        # On the twist the progression is #J + delta
+        if i % 2:
+            g, start = twist, first + delta
+        else:
+            g, start = f, first
+        D = _random_divisor(g, p)
+        k = _baby_giant(D, start, M, (hi - first) // M + 1, g, p)
+        if k is None:
+            raise ArithmeticError("no multiple of D in the Weil interval")
+        n = _divisor_order(D, start + k * M, g, p)
+        N0, M = restrict(N0, M, -delta % n if i % 2 else 0, n)
+    raise ArithmeticError("no divisor pinned down #J")
+
+
+def genus2_frobenius(f, p):
+    """
+    chi(T) of y**2 = f(x), deg f = 5, over an odd prime p < 2**31: point
+    counts over F_p and F_{p**2} below _direct_prime, the count over F_p
+    (O(p) time, fixed memory) and genus2_order above
+    """
+    if p < _direct_prime:
+        return frobenius_polynomial(count_hyperelliptic_points([f], p)[0],
+                                    p)
+    N1 = count_hyperelliptic_points([f], p, 1)[0][0]
+    s1 = p + 1 - N1
+    s2 = genus2_order(f, p, N1) - (p * p + 1 - s1 * (p + 1))
+    return [p * p, -p * s1, s2, -s1, 1]
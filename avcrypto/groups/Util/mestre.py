@@ -0,0 +1,139 @@
+"""
+Baby-step giant-step point counting with Mestre's twist trick.
+
+#E lies in the Hasse interval [p + 1 - 2*sqrt(p), p + 1 + 2*sqrt(p)] and is
+a multiple of the order of every point. For a random point P the baby
+steps j*T, T = M*P, are hashed by their x-coordinate, so one table
+serves +-j, and giant steps walk the multiples of P congruent to N0 mod
+M through the interval until one hits the table. The order of P then
+tightens the progression N0 mod M that #E is known to lie in, which
+costs O(p**(1/4)) group operations for the first point and less after.
+
+One curve alone can stall when every point has small order, but the
+quadratic twist E' has #E + #E' = 2p + 2, and for p > 229 either E or E'
+has a point whose order has a single multiple in the interval (Mestre).
+So points are taken alternately on E and E', their orders constraining
+#E and 2p + 2 - #E respectively.
+"""
+
+import random
+
+from number_theory import isqrt, lenstra
+from coordinates import Jacobian
+from crt import restrict
+from scalar_multiplication import scalar_multiply
+from square_roots import sqrt_mod
+
+# Points tried before giving up, the twist trick needs two or three
+_max_points = 64
+
+# Schoof and SEA hand over to mestre_order once at most this many orders
+# are left, about 2**13 baby and giant steps and cheaper than another l
+FEW_ORDERS = 1 << 24
+
+
+def random_point(a, b, p):
+    """ A random affine point of E """
+    while True:
+        x = random.randrange(p)
+        z = (x ** 3 + a * x + b) % p
+        if z and pow(z, (p - 1) // 2, p) == 1:
+            return x, sqrt_mod(z, p)
+
+
+def multiply(k, P, a, p):
+    """ k*P for a Jacobian point P, in Jacobian coordinates """
+    R = scalar_multiply(k, P, lambda Q, R: Jacobian.add(Q, R, a, p),
+                        lambda Q: Jacobian.double(Q, a, p),
+                        lambda Q: Jacobian.negate(Q, p))
+    return R or Jacobian.IDENTITY
+
+
+def _baby_giant(P, start, step, count, a, p):
+    """
+    Some k in [0, count) with (start + k*step)*P = O for the affine point
+    P, or None if there is none
+    """
+    s = isqrt(count) + 1
+    T = multiply(step, Jacobian.from_affine(P), a, p)
+    babies = [T]
+    for j in xrange(1, s):
+        babies.append(Jacobian.add(babies[-1], T, a, p))
+    table, period = {}, None
+    for j, xy in enumerate(Jacobian.batch_to_affine(babies, p), 1):
+        if xy is None:
+            # j*T = O, the solutions repeat every j steps
+            period = j
+            break
+        table.setdefault(xy[0], (j, xy[1]))
+
+    # Giant steps of 2s + 1 centred on k = s + i*(2s + 1)
+    G = Jacobian.to_affine(multiply(2 * s + 1, T, a, p), p)
+    R = multiply(start + s * step, Jacobian.from_affine(P), a, p)
+    for centre in xrange(s, count + s, 2 * s + 1):
+        xy = Jacobian.to_affine(R, p)
+        if xy is None:
+            found = [centre]
+        elif xy[0] in table:
+            j, y = table[xy[0]]
+            found = [centre - j] if y == xy[1] else [centre + j]
+        else:
+            found = []
+        for k in found:
+            if period:
+                k %= period
+            if 0 <= k < count:
+                return k
+        if G is not None:
+            R = Jacobian.add_mixed(R, G, a, p)
+    return None
+
+
+def _point_order(P, m, a, p):
+    """ The order of the affine point P, given m*P = O """
+    P = Jacobian.from_affine(P)
+    factors = lenstra(m)
+    for q in set(factors):
+        for i in xrange(factors.count(q)):
+            if multiply(m // q, P, a, p)[2] % p:
+                break
+            m //= q
+    return m
+
+
+def mestre_order(a, b, p, N0=0, M=1):
+    """
+    #E of y**2 = x**3 + a*x + b over a prime p > 229 with
+    O(p**(1/4)) group operations, or O(sqrt(p**(1/2)/M)) when #E = N0 mod
+    M is already known
+    """
+    a, b = a % p, b % p
+    N0 %= M
+    root = isqrt(16 * p)
+    lo, hi = p + 1 - root // 2, p + 1 + root // 2
+    d = 2
+    while pow(d, (p - 1) // 2, p) != p - 1:
+        d += 1
+    twist = a * d * d % p, b * d * d * d % p
+
+    # #E = N0 mod M
+    for i in xrange(_max_points):
+        first = lo + (N0 - lo) % M
+        if first + M > hi:
+            if first > hi:
+                raise ArithmeticError("no order left in the Hasse interval")
+            return first
+        # On the twist the progression is 2p + 2 - N
+        if i % 2:
+            A, B = twist
+            start = lo + (2 * p + 2 - N0 - lo) % M
+        else:
+            A, B = a, b
+            start = first
+        P = random_point(A, B, p)
+        k = _baby_giant(P, start, M, (hi - start) // M + 1, A, p)
+        if k is None:
+            raise ArithmeticError("no multiple of P in the Hasse interval")
+        n = _point_order(P, start + k * M, A, p)
+        N0, M = restrict(N0, M, (2 * p + 2) % n if i % 2 else 0, n)
+    raise ArithmeticError("no point pinned down #E")
@@ -1,9 +1,276 @@
-import sympy as sp 
+"""
+Canonical modular polynomials and the on-disk database they are kept in.
+
+The canonical (Mueller) modular polynomial Phi_l(F, J) of a prime l is the
+minimal polynomial of the eta quotient
+
+    f(tau) = l**s * (eta(l*tau) / eta(tau))**(2*s),  s = 12/gcd(12, l - 1)
+
+over Z[j]. Its roots in F are f(tau) and the l conjugates
+l**s/f((tau + k)/l), it has degree l + 1 in F like the classical
+polynomial but only degree v = s*(l - 1)/12 in J, and its coefficients
+are much smaller, which is what makes a database of them practical.
+
+The database file is a two line header, a magic line and a JSON index
+{l: [offset, length, s]}, followed by one zlib-compressed record per
+prime with a line of hexadecimal coefficients per power of F. The file is
+mapped with mmap and a record is only decompressed the first time its
+polynomial is asked for, so opening the database costs nothing whatever
+its size.
+"""
+
+import fractions
+import json
+import mmap
+import os
+import zlib
+
+import sympy as sp
+
+from polynomial import mul, mul_low, inverse_series, normalize
+
+_database_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'modular_polynomials.dat')
+_magic = 'AVCRYPTO MODULAR POLYNOMIALS 1\n'
+
+# The database primes: every l < 256 except l = 11 mod 12 past 71, whose
+# polynomials (s = 6, degree (l - 1)/2 in J) are too large to keep.
+# Running this module rebuilds the database, about half an hour with gmpy2
+_database_primes = [int(l) for l in sp.primerange(3, 256)
+                    if l <= 71 or l % 12 != 11]
+
+
+def _eta_product(n, step, p):
+    """ prod_{k >= 1} (1 - Q**(step*k)) mod Q**n (Euler's pentagonal theorem) """
+    series = [0] * n
+    k = 0
+    while True:
+        done = True
+        for e in (k * (3 * k - 1) // 2, k * (3 * k + 1) // 2):
+            if step * e < n:
+                series[step * e] = (-1) ** (k % 2) % p
+                done = False
+        if done:
+            break
+        k += 1
+    return series
+
+
+def _power_series(f, e, n, p):
+    """ f**e mod Q**n """
+    result, base = [1], f[:n]
+    while e:
+        if e & 1:
+            result = mul_low(result, base, n, p)
+        e >>= 1
+        if e:
+            base = mul_low(base, base, n, p)
+    return result
+
+
+def _j_powers(m, p):
+    """ (q*j)**i mod q**(m + 1) for i = 0..m """
+    n = m + 1
+    sigma = [0] * n
+    for d in xrange(1, n):
+        for k in xrange(d, n, d):
+            sigma[k] += d ** 3
+    e4 = [1] + [240 * c % p for c in sigma[1:]]
+    delta = _power_series(_eta_product(n, 1, p), 24, n, p)
+    qj = mul_low(_power_series(e4, 3, n, p), inverse_series(delta, n, p), n, p)
+    powers = [[1]]
+    for i in xrange(1, n):
+        powers.append(mul_low(powers[-1], qj, n, p))
+    return powers
+
+
+def _polynomial_in_j(principal, powers, p):
+    """
+    The polynomial P with P(j) = sum principal[i]*q**-i + O(q), given the
+    expansions of (q*j)**i from _j_powers
+    """
+    principal = list(principal)
+    P = [0] * len(principal)
+    for i in xrange(len(principal) - 1, -1, -1):
+        c = principal[i] % p
+        P[i] = c
+        if c:
+            power = powers[i]
+            for k in xrange(min(len(power), i + 1)):
+                principal[i - k] -= c * power[k]
+    return normalize(P)
+
+
+def _modular_polynomial_mod(l, P):
+    """ Phi_l mod the prime P as rows of coefficients of J, one per F**i """
+    s = 12 // fractions.gcd(12, l - 1)
+    v = s * (l - 1) // 12
+    n = (l + 1) * v + 1
+
+    # g(tau) = l**s/f(tau/l) = Q**-v * A(Q) with Q = q**(1/l)
+    A = mul_low(_eta_product(n, 1, P),
+                inverse_series(_eta_product(n, l, P), n, P), n, P)
+    A = _power_series(A, 2 * s, n, P)
+    powers = _j_powers(v + 1, P)
+
+    # Power sums of the l + 1 roots as polynomials in j. f**r vanishes at
+    # the cusp, and summing g((tau + k)/l)**r over k keeps l times the
+    # integral powers of q in g**r
+    sums = []
+    B = [1]
+    for r in xrange(1, l + 2):
+        B = mul_low(B, A, n, P)
+        B = B + [0] * (n - len(B))
+        principal = [l * B[r * v - i * l] % P for i in xrange(r * v // l + 1)]
+        sums.append(_polynomial_in_j(principal, powers, P))
+
+    # Newton's identities for the elementary symmetric functions
+    elementary = [[1]]
+    for k in xrange(1, l + 2):
+        e = []
+        for i in xrange(1, k + 1):
+            term = mul(elementary[k - i], sums[i - 1], P)
+            if i % 2 == 0:
+                term = [-c % P for c in term]
+            e = e + [0] * (len(term) - len(e))
+            for m, c in enumerate(term):
+                e[m] = (e[m] + c) % P
+        inverse = pow(k, P - 2, P)
+        elementary.append(normalize([c * inverse % P for c in e]))
+
+    rows = []
+    for i in xrange(l + 2):
+        e = elementary[l + 1 - i]
+        if (l + 1 - i) % 2:
+            e = [-c % P for c in e]
+        rows.append(e)
+    return s, rows
+
 
 def compute_modular_polynomial(l):
-    """ computes the lth modular polynomial using isogeny volcanos """
-    raise Exception("TODO: compute_modular_polynomial")
+    """
+    Computes the canonical modular polynomial of the prime l from the q
+    expansions of its roots. Returns (s, rows) where rows[i][k] is the
+    integer coefficient of F**i * J**k.
+    """
+    bits = 128
+    while True:
+        P = int(sp.nextprime(2 ** bits))
+        s, rows = _modular_polynomial_mod(l, P)
+        half, bound = P // 2, P >> 64
+        rows = [[int(c - P if c > half else c) for c in row] for row in rows]
+        # A residue of a coefficient larger than P/2 would land this close
+        # to zero with probability 2**-63, so this is the exact polynomial
+        if all(abs(c) < bound for row in rows for c in row):
+            return s, rows
+        bits *= 2
+
+
+class ModularPolynomialDatabase(object):
+    """ Read-only, lazily decoded view of a modular polynomial database """
+
+    def __init__(self, path=_database_path):
+        self.path = path
+        self._map = None
+        self._index = {}
+        self._start = 0
+        self._polynomials = {}
+        self._reduced = {}
+
+    def _open(self):
+        if self._map is None:
+            with open(self.path, 'rb') as handle:
+                self._map = mmap.mmap(handle.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            end = self._map.find('\n', len(_magic)) + 1
+            if self._map[:len(_magic)] != _magic:
+                raise ValueError("%s is not a modular polynomial database"
+                                 % self.path)
+            index = json.loads(self._map[len(_magic):end])
+            self._index = dict((int(l), entry) for l, entry in index.items())
+            self._start = end
+        return self._index
+
+    def primes(self):
+        """ The primes l in the database, in increasing order """
+        return sorted(self._open())
+
+    def __contains__(self, l):
+        return l in self._open()
+
+    def get(self, l):
+        """ (s, rows) of Phi_l as returned by compute_modular_polynomial """
+        if l not in self._polynomials:
+            offset, length, s = self._open()[l]
+            start = self._start + offset
+            text = zlib.decompress(self._map[start:start + length])
+            rows = [[int(c, 16) for c in line.split()]
+                    for line in text.split('\n')]
+            self._polynomials[l] = s, rows
+        return self._polynomials[l]
+
+    def reduce(self, l, p):
+        """ (s, rows) of Phi_l with the coefficients reduced mod p """
+        if (l, p) not in self._reduced:
+            if len(self._reduced) > 256:
+                self._reduced.clear()
+            s, rows = self.get(l)
+            self._reduced[l, p] = s, [normalize([c % p for c in row])
+                                      for row in rows]
+        return self._reduced[l, p]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def write_database(path, primes):
+    """ Computes Phi_l for each l in primes and writes them to path """
+    index, records, offset = {}, [], 0
+    for l in primes:
+        s, rows = compute_modular_polynomial(l)
+        text = '\n'.join(' '.join('%x' % c for c in row) for row in rows)
+        record = zlib.compress(text, 9)
+        index[l] = [offset, len(record), s]
+        records.append(record)
+        offset += len(record)
+    with open(path, 'wb') as handle:
+        handle.write(_magic)
+        handle.write(json.dumps(index, sort_keys=True) + '\n')
+        for record in records:
+            handle.write(record)
+
+
+_database = ModularPolynomialDatabase()
+
+
+def modular_polynomial(l, p=None):
+    """
+    Phi_l from the database that ships with this module, computed on the
+    fly for primes it does not contain. With p the coefficients are
+    reduced mod p.
+    """
+    if os.path.exists(_database.path) and l in _database:
+        if p is None:
+            return _database.get(l)
+        return _database.reduce(l, p)
+    s, rows = compute_modular_polynomial(l)
+    if p is not None:
+        rows = [normalize([c % p for c in row]) for row in rows]
+    return s, rows
+
 
 
+def database_primes():
+    """
+    The primes l whose Phi_l modular_polynomial reads from disk, or would
+    if the database file were there
+    """
+    if os.path.exists(_database.path):
+        return _database.primes()
+    return list(_database_primes)
 
 
+if __name__ == '__main__':
+    write_database(_database_path, _database_primes)
@@ -0,0 +1,236 @@
+"""
+Divisor classes on the Jacobian of a hyperelliptic curve y**2 = f(x) over
+F_p, deg f = 2g + 1, in Mumford representation.
+
+A reduced divisor is a pair (u, v) of polynomials in the dense format of
+polynomial.py with u monic, deg v < deg u <= g and u | f - v**2; the
+identity is ([1], []).
+
+cantor_add is Cantor's algorithm: composition to u1*u2/d**2, of degree up
+to 2g, followed by reduction steps u' = (f - v**2)/u that go through f
+itself. add and double are NUCOMP and NUDUPL instead (after Shanks, in
+Jacobson, Scheidler and Stein's form for function fields): the composed
+class is never written down. With A1 = u1/d, A2 = u2/d and the composed
+v = v2 + A2*K, every element of the composed ideal is
+alpha = b*y - (b*v2 + A2*R) with R = b*K mod A1, and its other zeros D'
+give the reduced class -D'. A partial extended Euclid on (A1, K) finds the
+pair (R, b) for which N(alpha)/u1*u2*d**-2 has degree at most g, so every
+intermediate polynomial has degree O(g) and the reduction loop is gone.
+"""
+
+import polynomial
+from number_theory import mod_inv, batch_mod_inv
+from polynomial import normalize, sub, mul, sqr, divmod_poly, rem, gcdex, \
+    monic, scale
+
+IDENTITY = ([1], [])
+
+
+def is_identity(D):
+    return len(D[0]) == 1
+
+
+def negate(D, p):
+    """ -(u, v) = (u, -v) """
+    return D[0], scale(D[1], -1, p)
+
+
+def _exact_quotient(f, g, p):
+    return divmod_poly(f, g, p)[0]
+
+
+def reduce_divisor(u, v, f, g, p):
+    """ The reduced divisor equivalent to the semi-reduced (u, v) """
+    v = rem(v, u, p)
+    while len(u) - 1 > g:
+        u = _exact_quotient(sub(f, sqr(v, p), p), u, p)
+        v = rem(scale(v, -1, p), u, p)
+    return monic(u, p), v
+
+
+def cantor_add(D1, D2, f, g, p):
+    """ D1 + D2 by Cantor's algorithm """
+    (u1, v1), (u2, v2) = D1, D2
+    if is_identity(D1):
+        return D2
+    if is_identity(D2):
+        return D1
+    # d1 = gcd(u1, u2) = e1*u1 + e2*u2
+    d1, e1 = gcdex(u1, u2, p)
+    if len(d1) == 1:
+        # The usual case, coprime u1 and u2
+        e2 = _exact_quotient(sub(d1, mul(e1, u1, p), p), u2, p)
+        u = mul(u1, u2, p)
+        v = polynomial.add(mul(mul(e1, u1, p), v2, p),
+                           mul(mul(e2, u2, p), v1, p), p)
+        return reduce_divisor(u, rem(v, u, p), f, g, p)
+    e2 = _exact_quotient(sub(d1, mul(e1, u1, p), p), u2, p)
+
+    # d = gcd(d1, v1 + v2) = c1*d1 + c2*(v1 + v2)
+    w = polynomial.add(v1, v2, p)
+    if w:
+        d, c1 = gcdex(d1, w, p)
+        c2 = _exact_quotient(sub(d, mul(c1, d1, p), p), w, p)
+    else:
+        d, c1, c2 = d1, [1], []
+    s1, s2, s3 = mul(c1, e1, p), mul(c1, e2, p), c2
+
+    u = _exact_quotient(mul(u1, u2, p), sqr(d, p), p)
+    v = polynomial.add(mul(mul(s1, u1, p), v2, p),
+                       mul(mul(s2, u2, p), v1, p), p)
+    v = polynomial.add(v, mul(s3, polynomial.add(mul(v1, v2, p), f, p), p),
+                       p)
+    v = _exact_quotient(v, d, p)
+    return reduce_divisor(u, rem(v, u, p), f, g, p)
+
+
+def _pseudo_divmod(f, g, p):
+    """ (c, q, r) with c*f = q*g + r for a constant c != 0, deg r < deg g """
+    lc, dg = g[-1], len(g) - 1
+    c, r = 1, list(f)
+    q = [0] * max(len(f) - dg, 0)
+    while len(r) > dg:
+        t, shift = r[-1], len(r) - 1 - dg
+        c = c * lc % p
+        q = [a * lc % p for a in q]
+        q[shift] = (q[shift] + t) % p
+        r = [a * lc % p for a in r]
+        for j, a in enumerate(g):
+            r[shift + j] = (r[shift + j] - t * a) % p
+        normalize(r)
+    return c, normalize(q), r
+
+
+def _inverse_times(f, m, p):
+    """
+    (r, s) with s*f = r mod m for a constant r, which is 0 unless f and m
+    are coprime: the inverse of f up to a factor, without inversions
+    """
+    r0, r1 = m, rem(f, m, p)
+    s0, s1 = [], [1]
+    while len(r1) > 1:
+        c, q, r = _pseudo_divmod(r0, r1, p)
+        r0, r1 = r1, r
+        s0, s1 = s1, sub(scale(s0, c, p), mul(q, s1, p), p)
+    return (r1[0] if r1 else 0), s1
+
+
+def _nucomp(d, A1, A2, K, c, v2, w2, g, p):
+    """
+    The class of the composition u = d**2*A1*A2, v = v2 + A2*K/c, with
+    w2 = (f - v2**2)/u2, as (u, v, r) for the reduced (u/lc(u), v/r); None
+    in the rare case where b and u end up with a common factor
+    """
+    if len(A1) + len(A2) - 2 <= g:
+        # Already reduced, plain composition
+        u = mul(A1, A2, p)
+        return u, rem(polynomial.add(scale(v2, c, p), mul(A2, K, p), p),
+                      u, p), c
+
+    # R = b*K mod A1 for consecutive pseudo-remainders of Euclid on (A1, K),
+    # then b*c for K/c
+    bound = (len(A1) - len(A2) + g) // 2
+    R0, R = A1, K
+    b0, b = [], [1]
+    while len(R) - 1 > bound:
+        e, q, r = _pseudo_divmod(R0, R, p)
+        R0, R = R, r
+        b0, b = b, sub(scale(b0, e, p), mul(q, b, p), p)
+    b = scale(b, c, p)
+
+    # alpha = b*y - P has norm A1*A2*d**2*u
+    bv2 = mul(b, v2, p)
+    P = polynomial.add(bv2, mul(A2, R, p), p)
+    N = polynomial.add(mul(A2, sqr(R, p), p), scale(mul(bv2, R, p), 2, p), p)
+    N = sub(N, mul(d, mul(sqr(b, p), w2, p), p), p)
+    u = _exact_quotient(N, A1, p)
+
+    # -D' has v = -P/b mod u
+    r, s = _inverse_times(b, u, p)
+    if not r:
+        return None
+    return u, rem(scale(mul(P, s, p), -1, p), u, p), r
+
+
+def _compose(D1, D2, f, g, p):
+    """ NUCOMP or NUDUPL for D1 + D2 as in _nucomp """
+    (u1, v1), (u2, v2) = D1, D2
+    if is_identity(D1):
+        return u2, v2, 1
+    if is_identity(D2):
+        return u1, v1, 1
+    if len(u1) < len(u2):
+        (u1, v1), (u2, v2) = (u2, v2), (u1, v1)
+    w2 = _exact_quotient(sub(f, sqr(v2, p), p), u2, p)
+
+    if u1 == u2 and v1 == v2:
+        # NUDUPL: d = gcd(u, 2v) = c1*u + c2*2v and K = c2*w mod u/d
+        r, s = _inverse_times(scale(v2, 2, p), u2, p)
+        if r:
+            return _nucomp([1], u2, u2, rem(mul(s, w2, p), u2, p), r,
+                           v2, w2, g, p)
+        d, c2 = gcdex(scale(v2, 2, p), u2, p)
+        A = _exact_quotient(u2, d, p)
+        K = rem(mul(c2, w2, p), A, p)
+        return _nucomp(d, A, A, K, 1, v2, w2, g, p)
+
+    # The usual case, coprime u1 and u2 and K = (v1 - v2)/u2 mod u1
+    m = sub(v1, v2, p)
+    r, s = _inverse_times(u2, u1, p)
+    if r:
+        return _nucomp([1], u1, u2, rem(mul(s, m, p), u1, p), r, v2, w2, g,
+                       p)
+
+    # d1 = gcd(u1, u2) = e1*u1 + e2*u2, d = gcd(d1, v1 + v2) = c1*d1 +
+    # c2*(v1 + v2) and K = s2*m + s3*w2 mod u1/d with s2 = c1*e2, s3 = c2
+    d1, e2 = gcdex(u2, u1, p)
+    w = polynomial.add(v1, v2, p)
+    if w:
+        d, c1 = gcdex(d1, w, p)
+        c2 = _exact_quotient(sub(d, mul(c1, d1, p), p), w, p)
+    else:
+        d, c1, c2 = d1, [1], []
+    A1 = _exact_quotient(u1, d, p)
+    A2 = _exact_quotient(u2, d, p)
+    K = rem(polynomial.add(mul(mul(c1, e2, p), m, p), mul(c2, w2, p), p),
+            A1, p)
+    return _nucomp(d, A1, A2, K, 1, v2, w2, g, p)
+
+
+def _normalize(D, inverse, p):
+    """ (u/lc(u), v/r) for D = (u, v, r) and inverse = 1/(lc(u)*r) """
+    u, v, r = D
+    return scale(u, inverse * r, p), scale(v, inverse * u[-1], p)
+
+
+def add(D1, D2, f, g, p):
+    """ D1 + D2 by NUCOMP """
+    if is_identity(D1):
+        return D2
+    if is_identity(D2):
+        return D1
+    D = _compose(D1, D2, f, g, p)
+    if D is None:
+        return cantor_add(D1, D2, f, g, p)
+    return _normalize(D, mod_inv(D[0][-1] * D[2], p), p)
+
+
+def double(D, f, g, p):
+    """ 2*D by NUDUPL """
+    return add(D, D, f, g, p)
+
+
+def batch_add(left, right, f, g, p):
+    """
+    left[i] + right[i] for every i by NUCOMP, with a single inversion
+    between them all
+    """
+    if len(left) != len(right):
+        raise ValueError("Need the same number of divisors on both sides")
+    sums = [_compose(D1, D2, f, g, p) for D1, D2 in zip(left, right)]
+    for i, D in enumerate(sums):
+        if D is None:
+            u, v = cantor_add(left[i], right[i], f, g, p)
+            sums[i] = u, v, 1
+    inverses = batch_mod_inv([u[-1] * r for u, v, r in sums], p)
+    return [_normalize(D, inverse, p) for D, inverse in zip(sums, inverses)]
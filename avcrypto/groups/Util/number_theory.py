@@ -1,6 +1,17 @@
-import math
-import random as rn
-from fractions import gcd
+import polynomial
+import sieve
+import ecm
+import crt
+from square_roots import isqrt
+
+# NumPy is optional, it only vectorises jacobi_batch
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Odd moduli whose primality legendre has already checked
+_checked_primes = set()
 
 
 def extended_gcd(aa, bb):
@@ -16,158 +27,220 @@ def extended_gcd(aa, bb):
         lasty * (-1 if bb < 0 else 1)
 
 
+# Three argument pow computes inverses natively from Python 3.8 onwards
+try:
+    pow(2, -1, 3)
+    _native_inverse = True
+except (TypeError, ValueError):
+    _native_inverse = False
+
 def mod_inv(a, m):
     """ Modular inverse """
-    g, x, y = extended_gcd(a, m)
-    if g != 1:
-		raise ValueError
-    return x % m
+    if _native_inverse:
+        return pow(a, -1, m)
+    # extended_gcd without the cofactor of m or the sign bookkeeping
+    r0, r1, s0, s1 = m, a % m, 0, 1
+    while r1:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        s0, s1 = s1, s0 - q * s1
+    if r0 != 1:
+        raise ValueError
+    return s0 % m
+
+def batch_mod_inv(values, m):
+    """
+    Inverts every element of values modulo m with a single call to
+    mod_inv (Montgomery's simultaneous inversion trick)
+    """
+    if not values:
+        return []
+    prefix = [0] * len(values)
+    acc = 1
+    for i, v in enumerate(values):
+        prefix[i] = acc
+        acc = acc * v % m
+    inv = mod_inv(acc, m)
+    inverses = [0] * len(values)
+    for i in xrange(len(values) - 1, -1, -1):
+        inverses[i] = inv * prefix[i] % m
+        inv = inv * values[i] % m
+    return inverses
 
 def chinese_remainder_theorem(n, congruences):
-    raise Exception("TODO: chinese_remainder_theorem")
-    # p = i = prod = 1; sm = 0
-    # for i in range(len(congruences)): prod *= n[i]
-    # for i in range(len(congruences)):
-    #     p = prod / n[i]
-    #     sm += congruences[i] * mod_inv(p, n[i]) * p
-    # return sm % prod
+    """
+    The x mod prod(n) with x = congruences[i] mod n[i], for pairwise
+    coprime moduli n (see crt.crt)
+    """
+    return crt.crt(zip(n, congruences))[0]
 
 
 def primes_less_than(n):
-    """ Find all primes less than a given bound """
-    sieve = [True] * n
-    for i in xrange(3,int(n**0.5)+1,2):
-        if sieve[i]:
-            sieve[i*i::2*i]=[False]*((n-i*i-1)/(2*i)+1)
-    return [2] + [i for i in xrange(3,n,2) if sieve[i]]
+    """ Find all primes less than a given bound (see sieve.primes) """
+    return list(sieve.primes(2, n))
 
-def roots_in_F_q(q, f):
-    """ Determine weather the polynomial f has roots over F_q """
-    raise Exception("TODO: roots_in_F_q")
+# Trial divisors of is_probable_prime
+_small_primes = primes_less_than(256)
 
-def is_probable_prime(N):
-    """ Miller-Rabin primality test on an integer N """
-    # special cases
-    if N == 2:
-        return True
-    elif N==1:
-        return False
-    elif N % 2 == 0:
-        return False
+# Miller-Rabin to these bases decides primality below the bound (Sorenson
+# and Webster, 2015)
+_deterministic_bases = _small_primes[:13]
+_deterministic_bound = 3317044064679887385961981
 
-    # write N-1 as 2**s * d
-    # repeatedly try to divide N-1 by 2
-    s = 0
-    d = N-1
+def roots_in_F_q(q, f):
+    """
+    Determine weather the polynomial f, given by its coefficients lowest
+    degree first, has roots over F_q (q prime), i.e. whether
+    gcd(x**q - x, f) is not constant
+    """
+    f = polynomial.normalize([c % q for c in f])
+    if len(f) <= 2:
+        return len(f) == 2
+    xq = polynomial.PolynomialModulus(f, q).pow_x(q)
+    return len(polynomial.gcd(polynomial.sub(xq, [0, 1], q), f, q)) > 1
+
+def _strong_probable_prime(N, a, d, s):
+    """ Miller-Rabin to base a for odd N with N - 1 = 2**s * d """
+    x = pow(a, d, N)
+    if x == 1 or x == N - 1:
+        return True
+    for i in xrange(s - 1):
+        x = x * x % N
+        if x == N - 1:
+            return True
+    return False
+
+def _strong_lucas_probable_prime(N):
+    """
+    Strong Lucas test of an odd N > 3 that is not a square, with the
+    parameters of Selfridge's method A: D the first of 5, -7, 9, ... with
+    (D/N) = -1, P = 1 and Q = (1 - D)/4
+    """
+    D = 5
     while True:
-        quotient, remainder = divmod(d, 2)
-        if remainder == 1:
+        j = jacobi(D, N)
+        if j == -1:
             break
-        s += 1
-        d = quotient
-    assert(2**s * d == N-1)
-
-    _mrpt_num_trials = 20
-    # test the base a to see whether it is a witness for the compositeness of N
-    def try_composite(a):
-        if a**d % N == 1:
+        if j == 0 and abs(D) != N:
             return False
-        for i in range(s):
-            if a**(2**i*d) % N == N-1:
-                return False
-        return True # N is definitely composite
-
-    for i in range(_mrpt_num_trials):
-        a = rn.randrange(2, N)
-        if try_composite(a):
-            return False
-
-    return True
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4 % N
+    d, s = N + 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+
+    # U_k, V_k and Q**k along the bits of d, starting from k = 1
+    U, V, Qk = 1, 1, Q
+    for bit in bin(d)[3:]:
+        U, V = U * V % N, (V * V - 2 * Qk) % N
+        Qk = Qk * Qk % N
+        if bit == '1':
+            U, V = U + V, D * U + V
+            U = (U + N if U % 2 else U) // 2 % N
+            V = (V + N if V % 2 else V) // 2 % N
+            Qk = Qk * Q % N
+    if U == 0 or V == 0:
+        return True
+    for r in xrange(s - 1):
+        V = (V * V - 2 * Qk) % N
+        Qk = Qk * Qk % N
+        if V == 0:
+            return True
+    return False
 
+def is_probable_prime(N):
+    """
+    Primality test on an integer N: trial division by the primes below
+    256, then Miller-Rabin to the first 13 prime bases, which is a proof
+    for N < 3.3e24, and beyond that the Baillie-PSW test (Miller-Rabin to
+    base 2 and a strong Lucas test), which has no known counterexample
+    """
+    if N < 2:
+        return False
+    for q in _small_primes:
+        if N % q == 0:
+            return N == q
+    if N < _small_primes[-1] ** 2:
+        return True
 
-def lenstra(N):
-    """ Lenstra's elliptic curve factorization method """
+    # write N-1 as 2**s * d
+    s, d = 0, N - 1
+    while d % 2 == 0:
+        s, d = s + 1, d // 2
+
+    if N < _deterministic_bound:
+        return all(_strong_probable_prime(N, a, d, s)
+                   for a in _deterministic_bases)
+    if not _strong_probable_prime(N, 2, d, s):
+        return False
+    r = isqrt(N)
+    return r * r != N and _strong_lucas_probable_prime(N)
 
-    # If N is negative
-    if N < 0:
-        return [-1] + lenstra(-N)
 
-    # If N is prime
-    if 0 <= N <= 3 or is_probable_prime(N):
+def lenstra(N):
+    """
+    Lenstra's elliptic curve factorization method: the prime factors of
+    N with multiplicity (see ecm.factor)
+    """
+    if 0 <= N <= 1:
         return [N]
-
-    # Initialize two random points mod N
-    x0,y0 = rn.randrange(1, N),rn.randrange(1, N)
-
-    # Bound for the number of trials
-    bound = int(math.sqrt(N))
-
-    for a in xrange(1, N):
-        # build elliptic curve using random points
-        b = y0**2 - x0**3 - a*x0
-
-        # Check if the curve is singular
-        if 4*a**3 - 27*b**2 == 0:
-            next
-
-        d = gcd(2*y0, N)
-        if d != 1:
-            return lenstra(d) + lenstra(N/d)
-
-        # Initial double of the point (x0,y0)
-        s = (3*x0**2 + a) * mod_inv(2*y0,N)
-        x,y = (s**2 - 2*x0,s*(3*x0 - s**2)-y0)
-
-        # Search for non-trivial gcd's
-        for k in xrange(1,bound):
-            for i in xrange(1,k):
-                d = gcd(x-x0,N)
-                if d != 1:
-                    return lenstra(d) + lenstra(N/d)
-                else:
-                    s = (y-y0) * mod_inv(x-x0,N)
-                    y = (s*(2*x + x0 - s**2)-y) % N
-                    x = (s**2 - x -x0) % N
-
-
-def legendre(a,p):
+    return ecm.factor(N)
+
+
+def jacobi(a, n):
+    """
+    The Jacobi symbol (a/n) for an odd n > 0, with the binary algorithm:
+    factors of 2 come out of a with the (2/n) rule and the rest is
+    quadratic reciprocity, so nothing is ever factored
+    """
+    if n <= 0 or n % 2 == 0:
+        raise ValueError("the Jacobi symbol needs an odd n > 0")
+    a %= n
+    t = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                t = -t
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            t = -t
+        a %= n
+    return t if n == 1 else 0
+
+def jacobi_batch(values, n):
+    """
+    Jacobi symbols (v/n) of every v in values. A NumPy array of residues
+    with n < 2**62 gets an int8 array, computed with whole-array steps of
+    the binary algorithm; anything else gets a list.
+    """
+    if np is None or not isinstance(values, np.ndarray) or n >= 1 << 62:
+        return [jacobi(int(v), n) for v in values]
+    if n <= 0 or n % 2 == 0:
+        raise ValueError("the Jacobi symbol needs an odd n > 0")
+    a = np.remainder(values, n).astype(np.int64)
+    m = np.full(a.shape, n, dtype=np.int64)
+    t = np.ones(a.shape, dtype=np.int8)
+    active = a != 0
+    while active.any():
+        # Strip all factors of 2 at once, a & -a is the lowest set bit
+        zeros = np.log2(np.where(active, a & -a, 1)).astype(np.int64)
+        flip = (zeros & 1 == 1) & ((m & 7 == 3) | (m & 7 == 5))
+        a >>= zeros
+        flip ^= active & (a & 3 == 3) & (m & 3 == 3)
+        t = np.where(flip, -t, t)
+        a, m = np.where(active, m % np.where(active, a, 1), 0), \
+            np.where(active, a, m)
+        active = a != 0
+    t[m != 1] = 0
+    return t
+
+def legendre(a, p):
     """ The legendre symbol of a mod p """
 
-    # p must be an odd prime
-    if not is_probable_prime(p) or p <=2:
-        raise Exception("p must be an odd prime")
-        
-    def f(q,p):
-        # all the base cases
-        if q == 1:
-            return 1
-        if q % p ==0:
-            return 0
-        if q == -1:
-            if p % 4 == 1:
-                return 1
-            else:
-                return -1
-        if q == 2:
-            if p % 8 == 1 or p % 8 == 7:
-                return 1
-            if p % 8 == 3 or p % 8 == 5:
-                return -1
-
-        # Recursive step
-        if q > p:
-            return f(q % p,p)
-        if q % 4 == 1 or p % 4 == 1:
-            return f(p,q)
-        else:
-            return -f(p,q)
-
-    # Because the legendre symbol is multiplicative
-    s = 1
-    for x in lenstra(a%p):
-        s *= f(x,p)
-    return s
-
-
-
-
+    # p must be an odd prime, which is only checked the first time
+    if p not in _checked_primes:
+        if p <= 2 or not is_probable_prime(p):
+            raise Exception("p must be an odd prime")
+        _checked_primes.add(p)
+    return jacobi(a, p)
@@ -0,0 +1,88 @@
+"""
+Runs the independent per-prime work of point counting (t mod l in Schoof's
+algorithm and in SEA), and other independent chunks of work such as sieve
+segments, on a concurrent.futures process pool.
+
+concurrent.futures is in the standard library from Python 3.2 and is the
+futures backport on Python 2; without it everything runs in the calling
+process.
+"""
+
+from collections import deque
+
+# concurrent.futures is optional on Python 2
+try:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+except ImportError:
+    ProcessPoolExecutor = None
+
+
+def is_parallel(workers):
+    """ Whether unordered_map(..., workers) would use a process pool """
+    if hasattr(workers, 'submit'):
+        return True
+    return ProcessPoolExecutor is not None and workers is not None and \
+        workers > 1
+
+
+def unordered_map(function, tasks, workers=None):
+    """
+    Yields (task, function(*task)) for every tuple in tasks as the results
+    come in. workers is a number of processes or an executor to share with
+    the caller; tasks are submitted in the order given, so the longest
+    should come first. With workers None or 1, or without
+    concurrent.futures, the tasks run here one after the other.
+
+    Closing the generator early cancels the tasks that have not started.
+    """
+    if not is_parallel(workers):
+        for task in tasks:
+            yield task, function(*task)
+        return
+
+    owned = not hasattr(workers, 'submit')
+    executor = ProcessPoolExecutor(max_workers=workers) if owned else workers
+    futures = {}
+    try:
+        for task in tasks:
+            futures[executor.submit(function, *task)] = task
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
+
+
+def ordered_map(function, tasks, workers=None, ahead=None):
+    """
+    Like unordered_map but yields in the order of tasks, which may be a
+    long or endless iterator: only ahead tasks (twice the number of
+    workers by default) are in flight at any time, so results do not
+    pile up in memory ahead of the consumer.
+    """
+    if not is_parallel(workers):
+        for task in tasks:
+            yield task, function(*task)
+        return
+
+    owned = not hasattr(workers, 'submit')
+    executor = ProcessPoolExecutor(max_workers=workers) if owned else workers
+    if ahead is None:
+        ahead = 2 * workers if owned else 8
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append((task, executor.submit(function, *task)))
+            if len(pending) >= ahead:
+                task, future = pending.popleft()
+                yield task, future.result()
+        while pending:
+            task, future = pending.popleft()
+            yield task, future.result()
+    finally:
+        for task, future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
@@ -0,0 +1,213 @@
+"""
+Point counting by character sums for small p,
+
+    #E = p + 1 + sum_{x in F_p} chi(x**3 + a*x + b),
+
+chi the quadratic character of F_p. Up to _table_prime chi is read from
+a table of the squares mod p, built by squaring (p - 1)/2 residues, and
+with NumPy the sum is a vectorised table lookup over F_p in blocks of
+_block values of x. Above it the table would not fit in memory, so chi is
+Euler's criterion v**((p - 1)/2), vectorised over each block: still O(p)
+time but only O(_block) memory, which keeps p up to 2**31 countable.
+count_points takes any number of curves over the same p and counts them
+all in one pass over F_p, sharing the powers of x, so surveying many
+curves costs little more than a table lookup per curve and x.
+
+count_hyperelliptic_points does the same for curves y**2 = f(x), deg f
+odd, over F_p and F_{p**2} = F_p[t]/(t**2 - n), n a non-residue. The
+quadratic character of F_{p**2} is chi of the norm to F_p, so the sum
+over a + b*t only needs chi(A**2 - n*B**2) for f(a + b*t) = A + B*t, and
+conjugates share a norm, which halves the b != 0 to 0 < b < p/2. The
+powers (a + b*t)**i are again shared between all the curves.
+
+NumPy is optional; without it the same sums run in plain Python, which is
+only practical for p up to about 2**20, or 2**10 over F_{p**2}.
+"""
+
+from number_theory import jacobi
+from square_roots import nonresidue
+
+# NumPy is optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Residues of x processed at a time, bounding the temporary arrays
+_block = 1 << 20
+
+# a*x must not overflow an int64
+_max_prime = 1 << 31
+
+# Largest p with a table of squares, p bytes; chi is Euler's above it
+_table_prime = 1 << 27
+
+
+def squares(p):
+    """
+    The table of v in [0, p) that are non-zero squares mod p, or None
+    above _table_prime
+    """
+    if p > _table_prime:
+        return None
+    if np is None:
+        table = bytearray(p)
+        for x in xrange(1, (p + 1) // 2):
+            table[x * x % p] = 1
+        return table
+    table = np.zeros(p, dtype=np.bool_)
+    for start in xrange(1, (p + 1) // 2, _block):
+        x = np.arange(start, min(start + _block, (p + 1) // 2),
+                      dtype=np.int64)
+        table[x * x % p] = True
+    return table
+
+
+def _chi(p, table):
+    """ chi as a function of one int, for the pure Python sums """
+    if table is None:
+        return lambda v: jacobi(v, p)
+    return lambda v: 2 * table[v] + (v == 0) - 1
+
+
+def count_points(curves, p):
+    """
+    The orders of y**2 = x**3 + a*x + b over F_p for every (a, b) in
+    curves, an odd prime p < 2**31.
+    """
+    if not 2 < p < _max_prime:
+        raise ValueError("character sums need an odd prime p < 2**31")
+    curves = [(a % p, b % p) for a, b in curves]
+    table = squares(p)
+
+    sums = [0] * len(curves)
+    if np is None:
+        chi = _chi(p, table)
+        for x in xrange(p):
+            x3 = x * x * x % p
+            for i, (a, b) in enumerate(curves):
+                sums[i] += chi((x3 + a * x + b) % p)
+        return [p + 1 + s for s in sums]
+
+    v = np.empty(min(_block, p), dtype=np.int64)
+    for start in xrange(0, p, _block):
+        x = np.arange(start, min(start + _block, p), dtype=np.int64)
+        x3 = x * x % p * x % p
+        w = v[:len(x)]
+        for i, (a, b) in enumerate(curves):
+            np.remainder(x3 + a * x + b, p, out=w)
+            sums[i] += _character_sum(w, table, p)
+    return [p + 1 + s for s in sums]
+
+
+def _euler(values, p):
+    """ v**((p - 1)/2) mod p for an int64 array of v in [0, p) """
+    e = (p - 1) // 2
+    r, v = np.ones_like(values), values.copy()
+    while e:
+        if e & 1:
+            r *= v
+            np.remainder(r, p, out=r)
+        v *= v
+        np.remainder(v, p, out=v)
+        e >>= 1
+    return r
+
+
+def _character_sum(values, table, p):
+    """ sum of chi(v) over an int64 array of v in [0, p) """
+    if table is None:
+        r = _euler(values, p)
+        return np.count_nonzero(r == 1) - np.count_nonzero(r == p - 1)
+    # chi(v) = 1 on the squares, 0 at v = 0 and -1 elsewhere, so the
+    # character sum over n values is 2*squares + zeros - n
+    return 2 * np.count_nonzero(np.take(table, values)) + \
+        np.count_nonzero(values == 0) - len(values)
+
+
+def count_hyperelliptic_points(curves, p, k=2):
+    """
+    (#C(F_p), #C(F_{p**2})), or just (#C(F_p),) for k = 1, of y**2 = f(x)
+    for every f in curves, lists of coefficients lowest degree first with
+    deg f odd, over an odd prime p < 2**31.
+    """
+    if not 2 < p < _max_prime:
+        raise ValueError("character sums need an odd prime p < 2**31")
+    if k not in (1, 2):
+        raise ValueError("only F_p and F_{p**2} can be counted")
+    curves = [[c % p for c in f] for f in curves]
+    if any(len(f) % 2 == 1 for f in curves):
+        raise ValueError("f must have odd degree")
+    table = squares(p)
+    n = nonresidue(p)
+    degree = max(len(f) for f in curves) - 1
+
+    # sums[i] = sum over F_p, twisted[i] = sum over the a + b*t, b != 0;
+    # over F_{p**2} every f(x) for x in F_p is a square unless it is 0
+    sums, roots = [0] * len(curves), [0] * len(curves)
+    twisted = [0] * len(curves)
+    if np is None:
+        chi = _chi(p, table)
+        for x in xrange(p):
+            for i, f in enumerate(curves):
+                v = 0
+                for c in reversed(f):
+                    v = (v * x + c) % p
+                sums[i] += chi(v)
+                roots[i] += v == 0
+        for b in xrange(1, (p + 1) // 2 if k == 2 else 1):
+            for a in xrange(p):
+                for i, f in enumerate(curves):
+                    A = B = 0
+                    for c in reversed(f):
+                        A, B = (A * a + n * B * b + c) % p, (A * b + B * a) % p
+                    twisted[i] += chi((A * A - n * B * B) % p)
+    else:
+        # Sums of products need reducing only if they could overflow
+        lazy = (degree + 1) * (p - 1) ** 2 < 1 << 63
+        w = np.empty(min(_block, p), dtype=np.int64)
+        for start in xrange(0, p, _block):
+            x = np.arange(start, min(start + _block, p), dtype=np.int64)
+            powers = [np.ones_like(x)]
+            for j in xrange(degree):
+                powers.append(powers[-1] * x % p)
+            v = w[:len(x)]
+            for i, f in enumerate(curves):
+                v.fill(0)
+                for c, power in zip(f, powers):
+                    if c:
+                        v += c * power
+                        if not lazy:
+                            np.remainder(v, p, out=v)
+                np.remainder(v, p, out=v)
+                sums[i] += _character_sum(v, table, p)
+                roots[i] += np.count_nonzero(v == 0)
+
+        # a + b*t for the indices i = (b - 1)*p + a
+        total = p * ((p - 1) // 2) if k == 2 else 0
+        for start in xrange(0, total, _block):
+            index = np.arange(start, min(start + _block, total),
+                              dtype=np.int64)
+            a, b = index % p, index // p + 1
+            powers = [(np.ones_like(a), np.zeros_like(a))]
+            for j in xrange(degree):
+                A, B = powers[-1]
+                powers.append(((A * a % p + n * (B * b % p)) % p,
+                               (A * b % p + B * a % p) % p))
+            for i, f in enumerate(curves):
+                A, B = np.zeros_like(a), np.zeros_like(a)
+                for c, (Ai, Bi) in zip(f, powers):
+                    if c:
+                        A += c * Ai
+                        B += c * Bi
+                        if not lazy:
+                            np.remainder(A, p, out=A)
+                            np.remainder(B, p, out=B)
+                np.remainder(A, p, out=A)
+                np.remainder(B, p, out=B)
+                v = (A * A % p - n * (B * B % p)) % p
+                twisted[i] += _character_sum(v, table, p)
+
+    # One point at infinity, and each norm stands for two conjugates
+    return [(p + 1 + s, p * p + 1 + p - r + 2 * t)[:k]
+            for s, r, t in zip(sums, roots, twisted)]
@@ -0,0 +1,350 @@
+"""
+Dense univariate polynomials over F_p.
+
+A polynomial is a list of ints in [0, p), lowest degree first, with no
+trailing zeros; the zero polynomial is the empty list. Products of large
+polynomials go through Kronecker substitution: both operands are packed
+into one long integer each, multiplied with a single long multiplication
+(Karatsuba in CPython, FFT when gmpy2 is installed) and unpacked again,
+which is far faster than any coefficient-level algorithm written in Python.
+
+PolynomialModulus fixes a monic modulus m and does arithmetic in
+F_p[x]/(m) with Barrett reduction (a Newton-iterated inverse of the
+reversed modulus), which is what Schoof's algorithm spends its time on.
+"""
+
+import math
+import random
+
+# gmpy2 is optional, it only makes the long multiplications faster
+try:
+    import gmpy2
+    _integer = gmpy2.mpz
+except ImportError:
+    gmpy2 = None
+    _integer = int
+
+# Below this many coefficients schoolbook multiplication beats packing
+_kronecker_threshold = 12
+
+
+def normalize(f):
+    """ Strips trailing zero coefficients in place and returns f """
+    while f and not f[-1]:
+        f.pop()
+    return f
+
+
+def degree(f):
+    """ Degree of f, -1 for the zero polynomial """
+    return len(f) - 1
+
+
+def add(f, g, p):
+    """ f + g """
+    if len(f) < len(g):
+        f, g = g, f
+    h = list(f)
+    for i, c in enumerate(g):
+        h[i] = (h[i] + c) % p
+    return normalize(h)
+
+
+def sub(f, g, p):
+    """ f - g """
+    h = list(f) + [0] * (len(g) - len(f))
+    for i, c in enumerate(g):
+        h[i] = (h[i] - c) % p
+    return normalize(h)
+
+
+def scale(f, c, p):
+    """ c * f for an int c """
+    c %= p
+    if not c:
+        return []
+    return [c * a % p for a in f]
+
+
+def monic(f, p):
+    """ f divided by its leading coefficient """
+    if f and f[-1] != 1:
+        inverse = pow(f[-1], p - 2, p)
+        return [c * inverse % p for c in f]
+    return list(f)
+
+
+def derivative(f, p):
+    """ Formal derivative df/dx """
+    return normalize([i * f[i] % p for i in xrange(1, len(f))])
+
+
+def evaluate(f, x, p):
+    """ f(x) for x in F_p (Horner) """
+    y = 0
+    for c in reversed(f):
+        y = (y * x + c) % p
+    return y
+
+
+def _slot_bits(p, n):
+    """ Bits per packed coefficient holding a sum of n products mod p """
+    bits = 2 * (p - 1).bit_length() + n.bit_length() + 1
+    return bits + (-bits % 4)
+
+
+def pack(f, bits):
+    """ Kronecker substitution f(2**bits), bits a multiple of 4 """
+    if not f:
+        return _integer(0)
+    if gmpy2 is not None:
+        return gmpy2.pack(f, bits)
+    digits = ('%%0%dx' % (bits // 4)) * len(f) % tuple(reversed(f))
+    return int(digits, 16)
+
+
+def unpack(n, bits, length, p):
+    """ The first length coefficients of the packed n >= 0, reduced mod p """
+    if gmpy2 is not None:
+        p = _integer(p)
+        return normalize([c % p for c in gmpy2.unpack(n, bits)[:length]])
+    width = bits // 4
+    total = length * width
+    digits = format(n, 'x')
+    if len(digits) < total:
+        digits = '0' * (total - len(digits)) + digits
+    else:
+        digits = digits[-total:]
+    return normalize([int(digits[i - width:i], 16) % p
+                      for i in xrange(total, 0, -width)])
+
+
+def _schoolbook(f, g, p, n):
+    """ Quadratic-time product for short operands, truncated to n terms """
+    h = [0] * min(len(f) + len(g) - 1, n)
+    for i, a in enumerate(f[:n]):
+        if a:
+            for j, b in enumerate(g[:n - i]):
+                h[i + j] += a * b
+    return normalize([c % p for c in h])
+
+
+def mul_low(f, g, n, p):
+    """ f * g mod x**n """
+    f, g = f[:n], g[:n]
+    if not f or not g:
+        return []
+    if min(len(f), len(g)) < _kronecker_threshold:
+        return _schoolbook(f, g, p, n)
+    bits = _slot_bits(p, min(len(f), len(g)))
+    product = pack(f, bits) * pack(g, bits)
+    if n < len(f) + len(g) - 1:
+        product &= (_integer(1) << (n * bits)) - 1
+    return unpack(product, bits, n, p)
+
+
+def mul(f, g, p):
+    """ f * g """
+    return mul_low(f, g, len(f) + len(g) - 1, p)
+
+
+def sqr(f, p):
+    """ f**2 """
+    if len(f) < _kronecker_threshold:
+        return _schoolbook(f, f, p, 2 * len(f))
+    bits = _slot_bits(p, len(f))
+    n = pack(f, bits)
+    return unpack(n * n, bits, 2 * len(f) - 1, p)
+
+
+def inverse_series(f, n, p):
+    """ 1/f mod x**n by Newton iteration; f(0) must be non-zero """
+    g = [pow(f[0], p - 2, p)]
+    k = 1
+    while k < n:
+        k = min(2 * k, n)
+        e = sub([2], mul_low(f, g, k, p), p)
+        g = mul_low(g, e, k, p)
+    return g
+
+
+def divmod_poly(f, g, p):
+    """ Quotient and remainder of f by g (schoolbook long division) """
+    if not g:
+        raise ZeroDivisionError("polynomial division by zero")
+    r = list(f)
+    dg = len(g) - 1
+    if len(r) <= dg:
+        return [], normalize(r)
+    inverse = pow(g[-1], p - 2, p)
+    q = [0] * (len(r) - dg)
+    for i in xrange(len(r) - 1, dg - 1, -1):
+        c = r[i] * inverse % p
+        if c:
+            q[i - dg] = c
+            for j in xrange(dg + 1):
+                r[i - dg + j] = (r[i - dg + j] - c * g[j]) % p
+    return normalize(q), normalize(r[:dg])
+
+
+def rem(f, g, p):
+    """ f mod g """
+    return divmod_poly(f, g, p)[1]
+
+
+def gcd(f, g, p):
+    """ Monic greatest common divisor of f and g """
+    f, g = normalize(list(f)), normalize(list(g))
+    while g:
+        f, g = g, rem(f, g, p)
+    return monic(f, p)
+
+
+def gcdex(f, g, p):
+    """ Returns (d, s) with d = gcd(f, g) monic and s*f = d mod g """
+    r0, r1 = normalize(list(f)), normalize(list(g))
+    s0, s1 = [1], []
+    while r1:
+        q, r = divmod_poly(r0, r1, p)
+        r0, r1 = r1, r
+        s0, s1 = s1, sub(s0, mul(q, s1, p), p)
+    if not r0:
+        return [], []
+    inverse = pow(r0[-1], p - 2, p)
+    return scale(r0, inverse, p), scale(s0, inverse, p)
+
+
+def roots(f, p):
+    """ The distinct roots of f in F_p, p an odd prime, in increasing order """
+    f = monic(normalize([c % p for c in f]), p)
+    if len(f) > 2:
+        xp = PolynomialModulus(f, p).pow_x(p)
+        f = gcd(sub(xp, [0, 1], p), f, p)
+    return sorted(_split_linear(f, p))
+
+
+def _split_linear(f, p):
+    """ Roots of a monic f that is a product of distinct linear factors """
+    if len(f) <= 2:
+        return [-f[0] % p] if len(f) == 2 else []
+    # gcd((x + c)**((p - 1)/2) - 1, f) picks out the roots r with r + c a
+    # non-zero square, about half of them for a random c (Cantor-Zassenhaus)
+    modulus = PolynomialModulus(f, p)
+    while True:
+        h = modulus.pow([random.randrange(p), 1], (p - 1) // 2)
+        g = gcd(sub(h, [1], p), f, p)
+        if 1 < len(g) < len(f):
+            return _split_linear(g, p) + \
+                _split_linear(divmod_poly(f, g, p)[0], p)
+
+
+def powmod(f, e, m, p):
+    """ f**e mod m """
+    return PolynomialModulus(m, p).pow(f, e)
+
+
+class PolynomialModulus(object):
+    """ Arithmetic in F_p[x]/(m) for a modulus m of positive degree """
+    __slots__ = ('m', 'p', 'degree', '_inverse')
+
+    def __init__(self, m, p):
+        self.p = p
+        self.m = monic(normalize(list(m)), p)
+        self.degree = len(self.m) - 1
+        if self.degree < 1:
+            raise ValueError("modulus must have positive degree")
+        # 1/rev(m) to the precision needed for products of reduced elements
+        self._inverse = inverse_series(self.m[::-1], max(self.degree - 1, 1),
+                                       p)
+
+    def reduce(self, f):
+        """ f mod m """
+        d, p = self.degree, self.p
+        n = len(f) - 1
+        if n < d:
+            return normalize(list(f))
+        if n > 2 * d - 2:
+            return rem(f, self.m, p)
+        k = n - d + 1
+        q = mul_low(f[:d - 1:-1], self._inverse, k, p)
+        q = [0] * (k - len(q)) + q[::-1]
+        return sub(f[:d], mul_low(q, self.m, d, p), p)
+
+    def mul(self, f, g):
+        """ f * g mod m """
+        return self.reduce(mul(f, g, self.p))
+
+    def sqr(self, f):
+        """ f**2 mod m """
+        return self.reduce(sqr(f, self.p))
+
+    def mulx(self, f):
+        """ x * f mod m """
+        if len(f) < self.degree:
+            return [0] + f if f else []
+        c, p, m = f[-1], self.p, self.m
+        h = [0] + f[:-1]
+        return normalize([(h[i] - c * m[i]) % p for i in xrange(self.degree)])
+
+    def pow(self, f, e):
+        """ f**e mod m with a fixed 4-bit window """
+        f = self.reduce(f)
+        if e == 0:
+            return [1]
+        table = [[1], f]
+        for i in xrange(14):
+            table.append(self.mul(table[-1], f))
+        r = [1]
+        for i, digit in enumerate('%x' % e):
+            if i:
+                for j in xrange(4):
+                    r = self.sqr(r)
+            digit = int(digit, 16)
+            if digit:
+                r = self.mul(r, table[digit])
+        return r
+
+    def pow_x(self, e):
+        """ x**e mod m; the multiplications by x are only shifts """
+        r = [1]
+        for bit in bin(e)[2:]:
+            r = self.sqr(r)
+            if bit == '1':
+                r = self.mulx(r)
+        return r
+
+    def compose(self, f, g):
+        """ f(g) mod m """
+        return self.compose_many([f], g)[0]
+
+    def compose_many(self, polynomials, g):
+        """
+        f(g) mod m for every f in polynomials (Brent-Kung). The powers
+        g**0..g**(k-1) for k ~ sqrt(deg f) are computed once and packed,
+        each block of k coefficients of f becomes one linear combination
+        of packed integers, and the blocks are put together by Horner's
+        rule in g**k. That is about 2*sqrt(deg f) multiplications mod m
+        instead of deg f.
+        """
+        p = self.p
+        n = max(len(f) for f in polynomials)
+        if n <= 1:
+            return [list(f) for f in polynomials]
+        k = int(math.sqrt(n - 1)) + 1
+        powers = [[1]]
+        for i in xrange(k):
+            powers.append(self.mul(powers[-1], g))
+        giant = powers.pop()
+        bits = _slot_bits(p, k)
+        packed = [pack(h, bits) for h in powers]
+
+        results = []
+        for f in polynomials:
+            r = []
+            for i in xrange((len(f) - 1) // k * k, -1, -k):
+                block = sum(c * packed[j]
+                            for j, c in enumerate(f[i:i + k]) if c)
+                block = unpack(block, bits, self.degree, p)
+                r = add(self.mul(r, giant), block, p)
+            results.append(r)
+        return results
@@ -0,0 +1,182 @@
+"""
+Generic scalar multiplication for abelian groups given by their group law.
+
+Functions here only see the group through add, double and negate
+callables, so the same code drives points on elliptic curves (in any
+coordinate system), symbolic points and divisors on hyperelliptic curves.
+The identity is represented by None throughout.
+"""
+
+
+def wnaf(k, w):
+    """
+    Width-w non-adjacent form of k >= 0, least significant digit first.
+    Non-zero digits are odd, lie in (-2**(w-1), 2**(w-1)) and any w
+    consecutive digits contain at most one of them.
+    """
+    digits = []
+    modulus, half = 1 << w, 1 << (w - 1)
+    while k > 0:
+        if k & 1:
+            d = k & (modulus - 1)
+            if d >= half:
+                d -= modulus
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
+        k >>= 1
+    return digits
+
+
+def window_width(bits):
+    """
+    Window for a bits-long scalar minimising the 2**(w-2) additions of the
+    precomputation plus the bits/(w+1) additions of the main loop
+    """
+    best, best_cost = 2, None
+    for w in xrange(2, 9):
+        cost = 2 ** (w - 2) + float(bits) / (w + 1)
+        if best_cost is None or cost < best_cost:
+            best, best_cost = w, cost
+    return best
+
+
+def odd_multiples(P, count, add, double):
+    """ Returns [P, 3P, 5P, ..., (2*count-1)P] """
+    table = [P]
+    if count > 1:
+        P2 = double(P)
+        for i in xrange(1, count):
+            table.append(add(table[-1], P2))
+    return table
+
+
+def wnaf_multiply(digits, table, add, double, negate, identity=None):
+    """
+    Evaluates a wNAF expansion left to right. table[i] holds (2i+1)P and
+    may contain None where that multiple is the identity. Passing the
+    accumulator's own identity lets add take table entries in a different
+    representation (mixed addition).
+    """
+    R = identity
+    for d in reversed(digits):
+        if R is not None:
+            R = double(R)
+        if d:
+            T = table[abs(d) // 2]
+            if T is None:
+                continue
+            if d < 0:
+                T = negate(T)
+            R = T if R is None else add(R, T)
+    return R
+
+
+def scalar_multiply(k, P, add, double, negate, w=None):
+    """ Computes k*P iteratively with a width-w NAF (chosen from k if None) """
+    if k < 0:
+        k, P = -k, negate(P)
+    if k == 0:
+        return None
+    w = w or window_width(k.bit_length())
+    table = odd_multiples(P, 1 << (w - 2), add, double)
+    return wnaf_multiply(wnaf(k, w), table, add, double, negate)
+
+
+def interleaved_wnaf_multiply(expansions, add, double, negate, identity=None):
+    """
+    Straus-Shamir interleaving: evaluates sum k_i*P_i from a list of
+    (wnaf digits of k_i, odd multiples of P_i) pairs with one shared chain
+    of doublings.
+    """
+    length = max(len(digits) for digits, table in expansions)
+    R = identity
+    for j in xrange(length - 1, -1, -1):
+        if R is not None:
+            R = double(R)
+        for digits, table in expansions:
+            if j >= len(digits) or not digits[j]:
+                continue
+            d = digits[j]
+            T = table[abs(d) // 2]
+            if T is None:
+                continue
+            if d < 0:
+                T = negate(T)
+            R = T if R is None else add(R, T)
+    return R
+
+
+def interleaved_cost(bit_lengths):
+    """ Estimated additions and doublings of interleaved_wnaf_multiply """
+    cost = max(bit_lengths)
+    for bits in bit_lengths:
+        w = window_width(bits)
+        cost += 2 ** (w - 2) + float(bits) / (w + 1)
+    return cost
+
+
+def signed_windows(k, c):
+    """
+    Writes k >= 0 in base 2**c with digits in (-2**(c-1), 2**(c-1)],
+    least significant first
+    """
+    digits = []
+    full, half = 1 << c, 1 << (c - 1)
+    while k:
+        d = k & (full - 1)
+        k >>= c
+        if d > half:
+            d -= full
+            k += 1
+        digits.append(d)
+    return digits
+
+
+def pippenger_window(n, bits):
+    """
+    Window c for n terms of at most bits bits minimising the bucket
+    method's cost of ceil(bits/c)*(n + 2**c) additions plus bits doublings.
+    Returns (c, cost).
+    """
+    best = None
+    for c in xrange(1, 21):
+        cost = -(-bits // c) * (n + 2 ** c) + bits
+        if best is None or cost < best[1]:
+            best = (c, cost)
+    return best
+
+
+def pippenger_multiply(scalars, points, c, add, add_point, double, negate,
+                       identity):
+    """
+    Pippenger's bucket method for sum k_i*P_i over many terms. Each c-bit
+    window sorts the points into 2**(c-1) buckets by signed digit (adding
+    them with add_point), then collapses the buckets with about 2**c
+    additions, so the cost per term is about bits/c additions.
+    """
+    expansions = [signed_windows(k, c) for k in scalars]
+    negated = [None] * len(points)
+    half = 1 << (c - 1)
+    R = identity
+    for j in xrange(max(len(digits) for digits in expansions) - 1, -1, -1):
+        for i in xrange(c):
+            R = double(R)
+        buckets = [identity] * (half + 1)
+        for i, digits in enumerate(expansions):
+            if j >= len(digits) or not digits[j]:
+                continue
+            d = digits[j]
+            if d > 0:
+                buckets[d] = add_point(buckets[d], points[i])
+            else:
+                if negated[i] is None:
+                    negated[i] = negate(points[i])
+                buckets[-d] = add_point(buckets[-d], negated[i])
+        running = total = identity
+        for b in xrange(half, 0, -1):
+            running = add(running, buckets[b])
+            total = add(total, running)
+        R = add(R, total)
+    return R
@@ -0,0 +1,128 @@
+"""
+Schoof's algorithm: the trace t = p + 1 - #E of y**2 = x**3 + a*x + b over
+F_p, modulo small primes l.
+
+For odd l everything happens in R = F_p[x]/(psi_l), psi_l the l-th
+division polynomial, so x stands for the x-coordinate of a generic point P
+of order l. Points are Jacobian triples in R whose y-coordinate carries an
+implicit factor of y,
+
+    (X, Y, Z)  ~  (X/Z**2, y*Y/Z**3),
+
+and y**2 is replaced by f = x**3 + a*x + b, so no polynomial in y is ever
+formed. Frobenius pi(P) = (x**p, y*f**((p-1)/2)) satisfies
+pi**2 - t*pi + p = 0 on E[l], and t mod l is the tau with
+pi**2(P) + (p mod l)P = tau*pi(P). The search for tau only needs
+x-coordinates (x-only differential additions); the sign of tau is then
+fixed with the Okeya-Sakurai y-recovery formula.
+"""
+
+from polynomial import PolynomialModulus, add, sub, scale
+from number_theory import roots_in_F_q
+from division_polynomials import division_polynomials
+
+
+def trace_mod_2(a, b, p):
+    """ t mod 2: E has a point of order 2 iff x**3 + a*x + b has a root """
+    return 0 if roots_in_F_q(p, [b % p, a % p, 0, 1]) else 1
+
+
+def generic_multiple(R, f, q, psi):
+    """ qP for the generic point P and 1 <= q, from psi[q-2..q+2] """
+    p = R.p
+    if q == 1:
+        return [0, 1], [1], [1]
+    psi = [R.reduce(g) for g in psi[q - 2:q + 3]]
+    Y = sub(R.mul(psi[4], R.sqr(psi[1])), R.mul(psi[0], R.sqr(psi[3])), p)
+    Y = scale(Y, pow(4, p - 2, p), p)
+    Z = psi[2]
+    if q % 2 == 0:
+        # psi_q = y*f_q, so scale by y to keep Z a polynomial in x
+        Y, Z = R.mul(f, Y), R.mul(f, Z)
+    X = sub(R.mul([0, 1], R.sqr(Z)), R.mul(f, R.mul(psi[1], psi[3])), p)
+    return X, Y, Z
+
+
+def _double(R, f, a, (X, Y, Z)):
+    """ 2*(X, Y, Z) """
+    p = R.p
+    YY = R.mul(f, R.sqr(Y))
+    S = scale(R.mul(X, YY), 4, p)
+    M = add(scale(R.sqr(X), 3, p), scale(R.sqr(R.sqr(Z)), a, p), p)
+    X3 = sub(R.sqr(M), scale(S, 2, p), p)
+    Y3 = sub(R.mul(M, sub(S, X3, p)), scale(R.sqr(YY), 8, p), p)
+    return R.mul(f, X3), R.mul(f, Y3), R.mul(f, scale(R.mul(Y, Z), 2, p))
+
+
+def _differential_add(R, a, b, (X1, Z1), xp, (X0, Z0)):
+    """ x(Q + pi) from x(Q) = X1/Z1, x(pi) = xp and x(Q - pi) = X0/Z0 """
+    p = R.p
+    X2Z1 = R.mul(xp, Z1)
+    d = R.sqr(sub(X1, X2Z1, p))
+    s = R.mul(add(X1, X2Z1, p), add(R.mul(X1, xp), scale(Z1, a, p), p))
+    s = add(scale(s, 2, p), scale(R.sqr(Z1), 4 * b, p), p)
+    return sub(R.mul(Z0, s), R.mul(X0, d), p), R.mul(Z0, d)
+
+
+def trace_mod_l(a, b, p, l, psi):
+    """
+    t mod l for an odd prime l != p, given psi = division_polynomials(m,
+    a, b, p) for some m >= l + 1
+    """
+    a, b = a % p, b % p
+    f = [b, a, 0, 1]
+    R = PolynomialModulus(psi[l], p)
+    xp, yp = R.pow_x(p), R.pow(f, (p - 1) // 2)
+    xp2, yp2 = R.compose_many([xp, yp], xp)
+    yp2 = R.mul(yp, yp2)
+
+    # L = pi**2(P) + qP, a mixed addition since pi**2(P) has Z = 1. If
+    # pi**2(P) = qP only on an eigenline of pi, L comes out as
+    # (0, 0, 0) there, which matches anything below, and the remaining
+    # roots of psi_l decide
+    X1, Y1, Z1 = generic_multiple(R, f, p % l, psi)
+    ZZ = R.sqr(Z1)
+    H = sub(R.mul(xp2, ZZ), X1, p)
+    if not H:
+        if sub(R.mul(yp2, R.mul(Z1, ZZ)), Y1, p):
+            # pi**2 = -q on E[l], so t*pi = 0
+            return 0
+        XL, YL, ZL = _double(R, f, a, (X1, Y1, Z1))
+    else:
+        r = sub(R.mul(yp2, R.mul(Z1, ZZ)), Y1, p)
+        HH = R.sqr(H)
+        HHH = R.mul(H, HH)
+        V = R.mul(X1, HH)
+        XL = sub(sub(R.mul(f, R.sqr(r)), HHH, p), scale(V, 2, p), p)
+        YL = sub(R.mul(r, sub(V, XL, p)), R.mul(Y1, HHH), p)
+        ZL = R.mul(Z1, H)
+    ZL2 = R.sqr(ZL)
+
+    # x(tau*pi) = X/Z for tau = 1, 2, ... until it matches x(L); x(2*pi)
+    # is XOnly.double with Z = 1, the others are differential additions
+    xx = R.sqr(xp)
+    doubled = (sub(R.sqr(sub(xx, [a], p)), scale(xp, 8 * b, p), p),
+               scale(add(R.mul(xp, add(xx, [a], p)), [b], p), 4, p))
+    X, Z = xp, [1]
+    previous = None
+    for tau in xrange(1, (l - 1) // 2 + 1):
+        if tau == 1:
+            following = doubled
+        else:
+            following = _differential_add(R, a, b, (X, Z), xp, previous)
+        if not sub(R.mul(X, ZL2), R.mul(XL, Z), p):
+            # Recover y(tau*pi) from x(tau*pi), x((tau+1)*pi) and pi to
+            # tell L = tau*pi from L = -tau*pi
+            X2, Z2 = following
+            ZZZ = R.mul(R.sqr(Z), Z2)
+            N = R.mul(R.mul(add(R.mul(xp, X), scale(Z, a, p), p),
+                            add(R.mul(xp, Z), X, p)), Z2)
+            N = add(N, scale(ZZZ, 2 * b, p), p)
+            N = sub(N, R.mul(R.sqr(sub(R.mul(xp, Z), X, p)), X2), p)
+            D = R.mul(f, R.mul(scale(yp, 2, p), ZZZ))
+            if not sub(R.mul(YL, D), R.mul(N, R.mul(ZL, ZL2)), p):
+                return tau
+            return l - tau
+        previous, (X, Z) = (X, Z), following
+    raise ArithmeticError("no trace found modulo %d" % l)
+
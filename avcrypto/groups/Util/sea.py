@@ -0,0 +1,429 @@
+"""
+The Schoof-Elkies-Atkin algorithm: the trace t = p + 1 - #E of
+y**2 = x**3 + a*x + b over F_p from t mod small primes l, working with the
+canonical modular polynomial Phi_l (see modular_polynomials.py) instead of
+the division polynomial psi_l of degree (l**2 - 1)/2.
+
+If Phi_l(F, j(E)) has a root in F_p, Frobenius has an eigenvalue on E[l]
+and l is an Elkies prime: the root determines the l-isogenous curve and
+the kernel polynomial of the isogeny, a factor of psi_l of degree
+(l - 1)/2, and the eigenvalue lam found in F_p[x]/(kernel) gives
+t = lam + p/lam mod l. Otherwise l is an Atkin prime and the degree r of
+the irreducible factors of Phi_l(F, j(E)) is the order of Frobenius acting
+on the lines of E[l], which leaves only a few candidates for t mod l. The
+candidates of several Atkin primes are sorted out at the end with a
+baby-step giant-step match on a point of E (Atkin's match and sort).
+"""
+
+import math
+import random
+
+from polynomial import PolynomialModulus, normalize, add, sub, scale, \
+    mul_low, evaluate, derivative, gcd, roots
+from schoof import trace_mod_2, trace_mod_l, generic_multiple
+from division_polynomials import division_polynomials, for_curve
+from modular_polynomials import modular_polynomial, database_primes
+from number_theory import isqrt
+from crt import Congruences
+from coordinates import Jacobian
+from parallel import unordered_map, is_parallel
+from scalar_multiplication import scalar_multiply
+from mestre import mestre_order, random_point, FEW_ORDERS
+
+# Largest order of Frobenius searched for at an Atkin prime; larger orders
+# leave too many candidates for t mod l to be worth it
+_max_atkin_order = 24
+
+# Largest l for which t mod l comes from Schoof's algorithm when l is not
+# an Elkies prime, psi_l has degree (l**2 - 1)/2 = 84 there
+_max_schoof_prime = 13
+
+# Largest number of candidate traces the final match and sort may face
+_max_candidates = 1 << 28
+
+
+def _inverse(c, p):
+    return pow(c, p - 2, p)
+
+
+def j_invariant(a, b, p):
+    """ j(E) = 1728*4a**3/(4a**3 + 27b**2) """
+    a3 = 4 * a ** 3 % p
+    return 1728 * a3 * _inverse(a3 + 27 * b * b, p) % p
+
+
+def _specialize(rows, j, p):
+    """ Phi(F, j) as a polynomial in F """
+    return normalize([evaluate(row, j, p) for row in rows])
+
+
+def _partials(rows, g, j, p):
+    """ dPhi/dF and dPhi/dJ at (g, j) """
+    phi_f = phi_j = 0
+    power = 1
+    for i, row in enumerate(rows):
+        phi_j += power * evaluate(derivative(row, p), j, p)
+        if i + 1 < len(rows):
+            phi_f += (i + 1) * power * evaluate(rows[i + 1], j, p)
+        power = power * g % p
+    return phi_f % p, phi_j % p
+
+
+def _weierstrass_coefficients(a, b, n, p):
+    """ c_0 = 0, c_1..c_n of wp(z) = 1/z**2 + sum c_k z**(2k) """
+    c = [0, -a * _inverse(5, p) % p, -b * _inverse(7, p) % p]
+    for k in xrange(3, n + 1):
+        s = sum(c[h] * c[k - 1 - h] for h in xrange(1, k - 1))
+        c.append(3 * s * _inverse((k - 2) * (2 * k + 3), p) % p)
+    return c[:n + 1]
+
+
+def kernel_polynomial(a, b, a2, b2, p1, l, p):
+    """
+    The kernel polynomial of the normalized l-isogeny from
+    y**2 = x**3 + a*x + b to y**2 = x**3 + a2*x + b2, p1 the sum of its
+    roots. With wp and wp2 the Weierstrass functions of the two curves,
+
+        D(wp(z)) = z**(1 - l) * exp(-p1*z**2 -
+                   sum (c2_k - l*c_k) z**(2k + 2)/((2k + 1)(2k + 2)))
+
+    and D is read off this series in w = z**2.
+    """
+    d = (l - 1) // 2
+    c = _weierstrass_coefficients(a, b, d, p)
+    c2 = _weierstrass_coefficients(a2, b2, d, p)
+    A = [0, -p1 % p] + [-(c2[k] - l * c[k]) *
+                        _inverse((2 * k + 1) * (2 * k + 2), p) % p
+                        for k in xrange(1, d)]
+    # S = exp(A) from n*S_n = sum k*A_k*S_{n - k}
+    S = [1]
+    for n in xrange(1, d + 1):
+        s = sum(k * A[k] * S[n - k] for k in xrange(1, n + 1))
+        S.append(s * _inverse(n, p) % p)
+
+    # S(w) = sum D_i w**(d - i) P(w)**i with P(w) = w*wp = 1 + c_1 w**2 + ...
+    P = normalize([1, 0] + c[1:d])
+    powers = [[1]]
+    for i in xrange(d):
+        powers.append(mul_low(powers[-1], P, d + 1, p))
+    D = [0] * d + [1]
+    for k in xrange(1, d + 1):
+        s = S[k]
+        for i in xrange(d - k + 1, d + 1):
+            power = powers[i]
+            if k - d + i < len(power):
+                s -= D[i] * power[k - d + i]
+        D[d - k] = s % p
+    return D
+
+
+def _eigenvalue(a, b, p, l, D):
+    """
+    lam with pi(P) = lam*P on the kernel of D, or None if D is not the
+    kernel of an isogeny
+    """
+    R = PolynomialModulus(D, p)
+    f = R.reduce([b, a, 0, 1])
+    psi = division_polynomials((l + 3) // 2, a, b, p, R)
+    xp = R.pow_x(p)
+    x = R.reduce([0, 1])
+    u = sub(x, xp, p)
+    for lam in xrange(1, (l + 1) // 2):
+        # x(lam*P) = x - psi_{lam-1}psi_{lam+1}/psi_lam**2 against x**p
+        left = R.mul(u, R.sqr(psi[lam]))
+        right = R.mul(psi[lam - 1], psi[lam + 1])
+        if lam % 2:
+            right = R.mul(f, right)
+        else:
+            left = R.mul(f, left)
+        if sub(left, right, p):
+            continue
+        X, Y, Z = generic_multiple(R, f, lam, psi)
+        yp = R.pow(f, (p - 1) // 2)
+        if sub(R.mul(yp, R.mul(Z, R.sqr(Z))), Y, p):
+            return l - lam
+        return lam
+    return None
+
+
+def _elkies(a, b, p, l, s, rows, j, g):
+    """ t mod l from a root g of Phi_l(F, j), or None in degenerate cases """
+    phi_f, phi_j = _partials(rows, g, j, p)
+    if not phi_f or not phi_j:
+        return None
+    E4 = -a * _inverse(3, p) % p
+    E6 = -b * _inverse(2, p) % p
+
+    # Df/f = (E6/E4)*(j*Phi_J)/(g*Phi_F), where D = q*d/dq, and the
+    # kernel's x-coordinates sum to (12*l/s)*Df/f
+    ratio = E6 * j * phi_j * _inverse(E4 * g * phi_f, p) % p
+    p1 = 6 * l * ratio * _inverse(s, p) % p
+
+    # The isogenous curve has j2 = j(l*tau) and Phi(l**s/g, j2) = 0
+    G = pow(l, s, p) * _inverse(g, p) % p
+    in_j = []
+    power = 1
+    for row in rows:
+        in_j = add(in_j, scale(row, power, p), p)
+        power = power * G % p
+    for j2 in roots(in_j, p):
+        if j2 == 0 or j2 == 1728 % p:
+            continue
+        phi_f2, phi_j2 = _partials(rows, G, j2, p)
+        if not phi_j2:
+            continue
+        # E6/E4 at l*tau, from differentiating Phi(l**s/f, j(l*tau)) = 0
+        ratio2 = -G * phi_f2 * ratio * _inverse(l * j2 * phi_j2, p) % p
+        E4_2 = ratio2 * ratio2 * j2 * _inverse(j2 - 1728, p) % p
+        E6_2 = E4_2 * ratio2 % p
+        a2 = -3 * pow(l, 4, p) * E4_2 % p
+        b2 = -2 * pow(l, 6, p) * E6_2 % p
+        D = kernel_polynomial(a, b, a2, b2, p1, l, p)
+        lam = _eigenvalue(a, b, p, l, D)
+        if lam is not None:
+            return (lam + p * _inverse(lam, l)) % l
+    return None
+
+
+def _frobenius_order(R, xp, l):
+    """ The least r | l + 1 with F**(p**r) = F mod R, up to _max_atkin_order """
+    X = xp
+    for r in xrange(1, min(l + 1, _max_atkin_order) + 1):
+        if (l + 1) % r == 0 and X == [0, 1]:
+            return r
+        X = R.compose(X, xp)
+    return None
+
+
+def _atkin_candidates(p, l, r):
+    """
+    The t mod l with t**2 = p*(z + 1/z + 2) for z a primitive r-th root of
+    unity in F_{l**2}, which is F_l(sqrt(n)) for a non-residue n
+    """
+    n = next(c for c in xrange(2, l) if pow(c, (l - 1) // 2, l) == l - 1)
+
+    def multiply((u1, w1), (u2, w2)):
+        return (u1 * u2 + n * w1 * w2) % l, (u1 * w2 + u2 * w1) % l
+
+    def power(z, e):
+        result = (1, 0)
+        while e:
+            if e & 1:
+                result = multiply(result, z)
+            z = multiply(z, z)
+            e >>= 1
+        return result
+
+    # A generator of the elements of norm 1, the subgroup of order l + 1
+    # containing the r-th roots of unity
+    factors = [q for q in xrange(2, l + 2) if (l + 1) % q == 0 and
+               all(q % k for k in xrange(2, q))]
+    while True:
+        z = power((random.randrange(l), random.randrange(1, l)), l - 1)
+        if all(power(z, (l + 1) // q) != (1, 0) for q in factors):
+            break
+
+    roots_of_squares = {}
+    for t in xrange(l):
+        roots_of_squares.setdefault(t * t % l, []).append(t)
+    candidates = set()
+    for k in xrange(1, r + 1):
+        if any(k % q == 0 and r % q == 0 for q in xrange(2, r + 1)):
+            continue
+        u, w = power(z, (l + 1) // r * k)
+        # z + 1/z is the trace 2u since 1/z is the conjugate of z
+        candidates.update(roots_of_squares.get(p * (2 * u + 2) % l, []))
+    return sorted(candidates)
+
+
+def trace_information(a, b, p, l):
+    """
+    What Phi_l says about t mod l: ('exact', t mod l), ('atkin', list of
+    candidates for t mod l) or None if l gives nothing usable. Below
+    _max_schoof_prime, where psi_l is still small, primes that are not
+    Elkies primes get t mod l from Schoof's algorithm with the curve's
+    shared division polynomials.
+    """
+    a, b = a % p, b % p
+    s, rows = modular_polynomial(l, p)
+    j = j_invariant(a, b, p)
+    phi = _specialize(rows, j, p)
+    R = PolynomialModulus(phi, p)
+    xp = R.pow_x(p)
+    split = gcd(sub(xp, [0, 1], p), phi, p)
+    if len(split) > 1:
+        for g in roots(split, p):
+            if g:
+                t = _elkies(a, b, p, l, s, rows, j, g)
+                if t is not None:
+                    return 'exact', t
+    if l <= _max_schoof_prime:
+        return 'exact', trace_mod_l(a, b, p, l, for_curve(a, b, p).range(l + 1))
+    if len(split) > 1:
+        return None
+    r = _frobenius_order(R, xp, l)
+    if r is None:
+        return None
+    candidates = _atkin_candidates(p, l, r)
+    return ('atkin', candidates) if candidates else None
+
+
+def _choose_atkin(atkin, modulus, p):
+    """
+    Atkin primes that together with the Elkies modulus pin t down, picked
+    by fewest candidates per bit, or None if the match would be too big
+    """
+    chosen, candidates = [], 1
+    for l, T in sorted(atkin, key=lambda (l, T): math.log(len(T)) / math.log(l)):
+        if modulus ** 2 > 16 * p:
+            break
+        chosen.append((l, T))
+        modulus *= l
+        candidates *= len(T)
+    if modulus ** 2 <= 16 * p or candidates > _max_candidates:
+        return None
+    return chosen
+
+
+def _match_sort(a, b, p, t1, m1, atkin):
+    """
+    t from t = t1 mod m1 and the Atkin candidates. The Atkin primes are
+    split into two sets with moduli m2 and m3 and t is written as
+    t1 + m1*(m3*r2 + m2*r3): a match of (p + 1 - t1)P - m1*m3*r2*P against
+    m1*m2*r3*P over the candidates r2 and r3 gives #E.
+    """
+    def add(P, Q):
+        return Jacobian.add(P, Q, a, p)
+
+    def multiply(k, P):
+        return scalar_multiply(k, P, add, lambda Q: Jacobian.double(Q, a, p),
+                               lambda Q: Jacobian.negate(Q, p)) or \
+            Jacobian.IDENTITY
+
+    # Balance the number of candidates between baby and giant steps
+    groups = [[], []]
+    sizes = [1, 1]
+    for l, T in sorted(atkin, key=lambda (l, T): -len(T)):
+        i = 0 if sizes[0] <= sizes[1] else 1
+        groups[i].append((l, T))
+        sizes[i] *= len(T)
+    m2 = reduce(lambda x, y: x * y, [l for l, T in groups[0]], 1)
+    m3 = reduce(lambda x, y: x * y, [l for l, T in groups[1]], 1)
+    M = m1 * m2 * m3
+
+    def steps(start, group, m, base):
+        """
+        (r, start + r*base) for r = (tau - t1)/(m1*(M/(m1*m))) mod m over
+        the candidates, r in (-m/2, m/2]
+        """
+        cofactor = M // (m1 * m)
+        shift = multiply(m, base)
+        shifts = [Jacobian.IDENTITY]
+        for i in xrange(max([l for l, T in group] + [len(group)]) + 1):
+            shifts.append(add(shifts[-1], Jacobian.negate(shift, p)))
+        items = [(0, start)]
+        for l, T in group:
+            # (rho*e mod m)*base for the CRT idempotent e of l
+            e = m // l * _inverse(m // l % l, l)
+            unit = multiply(e, base)
+            multiples = [Jacobian.IDENTITY]
+            for i in xrange(l - 1):
+                multiples.append(add(multiples[-1], unit))
+            residues = [(tau - t1) * _inverse(m1 * cofactor % l, l) % l
+                        for tau in T]
+            terms = [(rho * e % m, add(multiples[rho], shifts[rho * e // m]))
+                     for rho in residues]
+            items = [(r + v, add(point, term))
+                     for r, point in items for v, term in terms]
+        result = []
+        for r, point in items:
+            k = (r + m // 2) // m
+            result.append((r - k * m, add(point, shifts[k])))
+        return result, shift
+
+    P = Jacobian.from_affine(random_point(a, b, p))
+    Q = multiply(p + 1 - t1, P)
+    W = multiply(m1 * m3, P)
+    baby, _ = steps(Q, groups[0], m2, Jacobian.negate(W, p))
+    G = multiply(m1 * m2, P)
+    giant, shift = steps(Jacobian.IDENTITY, groups[1], m3, G)
+    # r3 is only known mod m3 and may lie one m3 either side
+    variants = [(-m3, Jacobian.negate(shift, p)), (0, Jacobian.IDENTITY),
+                (m3, shift)]
+    giant = [(r + c, add(point, S)) for r, point in giant
+             for c, S in variants]
+
+    table = {}
+    affine = Jacobian.batch_to_affine([point for r, point in baby], p)
+    for (r2, point), xy in zip(baby, affine):
+        table.setdefault(xy, []).append(r2)
+    affine = Jacobian.batch_to_affine([point for r, point in giant], p)
+    traces = set()
+    for (r3, point), xy in zip(giant, affine):
+        for r2 in table.get(xy, []):
+            t = t1 + m1 * (m3 * r2 + m2 * r3)
+            if t * t <= 4 * p:
+                traces.add(t)
+
+    # Different points have different orders, keep only the t that work on
+    # a few more
+    for i in xrange(20):
+        if len(traces) <= 1:
+            break
+        P = Jacobian.from_affine(random_point(a, b, p))
+        traces = set(t for t in traces
+                     if multiply(p + 1 - t, P)[2] % p == 0)
+    if len(traces) != 1:
+        raise ArithmeticError("match and sort found %d traces" % len(traces))
+    return traces.pop()
+
+
+def sea_trace(a, b, p, workers=None):
+    """
+    The trace of Frobenius of y**2 = x**3 + a*x + b over F_p for a large
+    prime p and j(E) != 0, 1728. With workers (see parallel.py) the
+    primes l run on a process pool: in batches whose product would be
+    enough if half of them were Elkies primes, largest first, and the
+    rest of a batch is cancelled as soon as t is pinned down.
+    """
+    a, b = a % p, b % p
+    congruences = Congruences([(2, trace_mod_2(a, b, p))])
+    bound = isqrt(4 * p)
+    atkin = []
+    chosen = None
+    primes = [l for l in database_primes() if l != p]
+    while congruences.count(bound) > FEW_ORDERS and chosen is None:
+        if not primes:
+            raise ArithmeticError("not enough modular polynomials for p")
+        batch = [primes.pop(0)]
+        if is_parallel(workers):
+            need = 16 * p // congruences.modulus ** 2
+            product = batch[0]
+            while primes and product < need:
+                batch.append(primes.pop(0))
+                product *= batch[-1]
+        results = unordered_map(trace_information,
+                                [(a, b, p, l) for l in reversed(batch)],
+                                workers)
+        for (_, _, _, l), info in results:
+            if info is None:
+                continue
+            if info[0] == 'exact':
+                congruences.add(l, info[1])
+            else:
+                atkin.append((l, info[1]))
+            if congruences.count(bound) <= FEW_ORDERS:
+                chosen = None
+                break
+            chosen = _choose_atkin(atkin, congruences.modulus, p)
+            if chosen is not None:
+                break
+        results.close()
+
+    t1, m1 = congruences.residue, congruences.modulus
+    if chosen is not None:
+        return _match_sort(a, b, p, t1, m1, chosen)
+    if congruences.count(bound) == 1:
+        return congruences.symmetric()
+    # Few enough traces left for baby steps and giant steps
+    return p + 1 - mestre_order(a, b, p, p + 1 - t1, m1)
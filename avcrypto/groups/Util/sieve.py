@@ -0,0 +1,88 @@
+"""
+Segmented sieve of Eratosthenes.
+
+primes(lo, hi) streams the primes in [lo, hi) one segment at a time.
+A segment holds one byte per odd number in a bytearray, so memory stays
+at _segment/2 bytes plus the primes up to sqrt(hi) whatever the range.
+The base primes strike their odd multiples out of each segment with
+slice assignments, and NumPy, when installed, reads the survivors back
+out. With workers (see parallel.py) segments are sieved on a process
+pool a few at a time and still come out in order. Bounds are not limited
+to the C long range, but the primes up to sqrt(hi) must fit in memory.
+"""
+
+from parallel import ordered_map
+from square_roots import isqrt
+
+# NumPy is optional, it only speeds up reading primes out of a segment
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numbers covered by one segment
+_segment = 1 << 20
+
+
+def _small_primes(n):
+    """ The odd primes up to n, for sieving """
+    if n < 3:
+        return []
+    sieve = bytearray([1]) * (n // 2 + 1)
+    for i in xrange(3, isqrt(n) + 1, 2):
+        if sieve[i // 2]:
+            start = i * i // 2
+            sieve[start::i] = bytearray(len(xrange(start, len(sieve), i)))
+    return [2 * i + 1 for i in xrange(1, n // 2 + 1) if sieve[i]
+            and 2 * i + 1 <= n]
+
+
+def sieve_segment(lo, hi, base):
+    """
+    The odd primes in [lo, hi), lo odd, given the odd primes base up to
+    sqrt(hi)
+    """
+    size = (hi - lo + 1) // 2
+    if size <= 0:
+        return []
+    segment = bytearray([1]) * size
+    for q in base:
+        if q * q >= hi:
+            break
+        # First odd multiple of q in the segment, not below q**2
+        start = max(q * q, (lo + q - 1) // q * q)
+        if start % 2 == 0:
+            start += q
+        start = (start - lo) // 2
+        if start < size:
+            segment[start::q] = bytearray(len(xrange(start, size, q)))
+    if lo == 1:
+        segment[0] = 0
+    if np is not None and hi < 1 << 62:
+        indices = np.flatnonzero(np.frombuffer(bytes(segment), np.uint8))
+        return (lo + 2 * indices).tolist()
+    return [lo + 2 * i for i in xrange(size) if segment[i]]
+
+
+def _segments(lo, hi, step, base):
+    """
+    (start, end, base) for each segment of [lo, hi), counted with a while
+    loop since xrange stops at the C long range
+    """
+    while lo < hi:
+        yield lo, min(lo + step, hi), base
+        lo += step
+
+
+def primes(lo, hi, segment=_segment, workers=None):
+    """ Yields the primes p with lo <= p < hi in increasing order """
+    if hi <= 2 or hi <= lo:
+        return
+    if lo <= 2:
+        yield 2
+    lo = max(lo, 3) | 1
+    base = _small_primes(isqrt(hi - 1))
+    tasks = _segments(lo, hi, segment - segment % 2, base)
+    for task, found in ordered_map(sieve_segment, tasks, workers):
+        for q in found:
+            yield q
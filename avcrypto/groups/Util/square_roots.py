@@ -0,0 +1,118 @@
+"""
+Square roots modulo an odd prime p.
+
+Write p - 1 = 2**s * q with q odd. For s = 1 (p = 3 mod 4) a root is
+a**((p + 1)/4), and for s = 2 (p = 5 mod 8) Atkin's formula also takes a
+single exponentiation. Otherwise Tonelli-Shanks walks down the 2-Sylow
+subgroup with a fixed non-residue, which costs up to s**2/2 extra
+multiplications, so when s is large against the size of p Cipolla's
+algorithm, an exponentiation in F_p[w]/(w**2 - d), is used instead.
+
+A non-residue is found by trial and should be kept with the field, which
+PrimeField.sqrt does. isqrt, the integer square root, lives here too so
+that sieve.py can share it without importing number_theory.
+"""
+
+import math
+import random
+
+
+def isqrt(n):
+    """ floor(sqrt(n)) of an int n >= 0 """
+    if n < 1 << 52:
+        return int(math.sqrt(n))
+    x = 1 << ((n.bit_length() + 1) // 2)
+    while True:
+        y = (x + n // x) // 2
+        if y >= x:
+            return x
+        x = y
+
+
+def nonresidue(p):
+    """ The least quadratic non-residue mod p """
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    return z
+
+
+def tonelli_shanks(a, p, z=None):
+    """ A square root of a mod p, or None, given a non-residue z """
+    a %= p
+    if a == 0:
+        return 0
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q, s = q // 2, s + 1
+    if z is None:
+        z = nonresidue(p)
+    c = pow(z, q, p)
+    x = pow(a, (q + 1) // 2, p)
+    t = pow(a, q, p)
+    while t != 1:
+        # The least i with t**(2**i) = 1
+        i, u = 0, t
+        while u != 1:
+            u = u * u % p
+            i += 1
+            if i == s:
+                return None
+        b = pow(c, 1 << (s - i - 1), p)
+        x = x * b % p
+        c = b * b % p
+        t = t * c % p
+        s = i
+    return x
+
+
+def atkin(a, p):
+    """ A square root of a mod p = 5 mod 8, or None """
+    a %= p
+    b = pow(2 * a, (p - 5) // 8, p)
+    i = 2 * a * b * b % p
+    x = a * b * (i - 1) % p
+    return x if x * x % p == a else None
+
+
+def cipolla(a, p):
+    """ A square root of a mod p, or None """
+    a %= p
+    if a == 0:
+        return 0
+    if pow(a, (p - 1) // 2, p) != 1:
+        return None
+    while True:
+        t = random.randrange(p)
+        d = (t * t - a) % p
+        if pow(d, (p - 1) // 2, p) == p - 1:
+            break
+    # (t + w)**((p + 1)/2) with w**2 = d
+    x0, x1 = 1, 0
+    y0, y1 = t, 1
+    e = (p + 1) // 2
+    while e:
+        if e & 1:
+            x0, x1 = (x0 * y0 + x1 * y1 % p * d) % p, (x0 * y1 + x1 * y0) % p
+        y0, y1 = (y0 * y0 + y1 * y1 % p * d) % p, 2 * y0 * y1 % p
+        e >>= 1
+    return x0
+
+
+def sqrt_mod(a, p, z=None):
+    """
+    A square root of a mod the odd prime p, or None if a is not a square.
+    z is a non-residue to reuse for Tonelli-Shanks.
+    """
+    a %= p
+    if p % 4 == 3:
+        x = pow(a, (p + 1) // 4, p)
+        return x if x * x % p == a else None
+    if p % 8 == 5:
+        return atkin(a, p)
+    s = 0
+    while (p - 1) >> s & 1 == 0:
+        s += 1
+    if s * s > 6 * p.bit_length():
+        return cipolla(a, p)
+    return tonelli_shanks(a, p, z)
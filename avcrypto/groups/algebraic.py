@@ -1,14 +1,34 @@
 import sympy as sp
 import random as rn
 import math
-from Util.number_theory import extended_gcd, mod_inv, is_probable_prime, \
-     lenstra, legendre, chinese_remainder_theorem
+import json
+from Util.number_theory import is_probable_prime, lenstra, isqrt
+from Util.coordinates import COORDINATE_SYSTEMS, INFINITY, XOnly, \
+     ExtensionJacobian
+from Util.finite_field import PrimeField
+from Util.extension_field import ExtensionField
+from Util.schoof import trace_mod_2, trace_mod_l
+from Util.division_polynomials import for_curve
+from Util.point_counting import count_points, count_hyperelliptic_points
+from Util.sea import sea_trace
+from Util.mestre import mestre_order, FEW_ORDERS
+from Util.jacobian_order import frobenius_polynomial, genus2_frobenius
+from Util.crt import Congruences
+from Util.hash_to_curve import sswu_z, hash_to_curve, encode_to_curve
+from Util.discrete_log import kangaroo_log, pohlig_hellman_log
+from Util.parallel import unordered_map, is_parallel
+from Util.polynomial import normalize
+from Util.genus2 import COORDINATE_SYSTEMS as GENUS2_COORDINATES
+from Util import polynomial, mumford, genus2
+from Util.scalar_multiplication import wnaf, window_width, wnaf_multiply, \
+     scalar_multiply, interleaved_wnaf_multiply, interleaved_cost, \
+     pippenger_window, pippenger_multiply
 
 
 class Group(object):
     """ Abstract abelian finite group """
     def __init__(self, elements,operation):
-        self.elements = points
+        self.elements = elements
         self.operation = operation
         
     def __mul__(self,other):
@@ -51,8 +71,9 @@ class Point(object):
 class AbelianVariety(Group):
     """
     A complete algebraic abelian group defined as the zero locus of
-    an ideal of polynomials over a finite field of prime order.
-    Let A represent an Abelian Variety in all the doc-strings.
+    an ideal of polynomials over a finite field of prime order, or over
+    an ExtensionField, whose equations are not turned into sympy
+    polynomials. Let A represent an Abelian Variety in all the doc-strings.
     """
     def __init__(self,equations,field,operation):
 
@@ -62,6 +83,8 @@ class AbelianVariety(Group):
 
         symbols = set()
         polynomials = list() # Force sympy Poly class for equations
+        if isinstance(field, ExtensionField):
+            equations = []
         for f in equations:
             symbols = set(symbols | f.atoms(sp.Symbol))
             polynomials.append(sp.poly(f, symbols, domain=field))
@@ -102,115 +125,530 @@ class AbelianVariety(Group):
         return self.operation(p1, p2)
 
 
+# Default domain separation tags of EllipticCurve.hash_to_curve and
+# encode_to_curve (RFC 9380 section 3.1)
+_hash_to_curve_dst = 'AVCRYPTO-V01-CS01-with-E_XMD:SHA-256_SSWU_RO_'
+_encode_to_curve_dst = 'AVCRYPTO-V01-CS01-with-E_XMD:SHA-256_SSWU_NU_'
+
+
+def _schoof_order(a, b, p, workers=None):
+    """ #E over F_p by Schoof's algorithm, see EllipticCurve.schoof """
+
+    # Build list of odd primes l != p whose product with 2 exceeds
+    # 4*sqrt(p), so that t in [-2*sqrt(p), 2*sqrt(p)] is determined
+    list_of_primes = []
+    product = 2
+    i = 3
+    while product ** 2 <= 16 * p:
+        if i != p and is_probable_prime(i):
+            list_of_primes.append(i)
+            product *= i
+        i += 2
+
+    # Special case to determine t mod 2
+    congruences = Congruences([(2, trace_mod_2(a, b, p))])
+    bound = isqrt(4 * p)
+
+    # Division polynomials f_0..f_{l+1} for the largest l, in F_p[x]
+    psi = for_curve(a, b, p).range(list_of_primes[-1] + 1)
+
+    # Build list of congruences, (x**p**2,y**p**2) + q_l(x,y) =
+    # t_l(x**p,y**p) in F_p[x]/(psi_l). Serially the small l come
+    # first and the large ones are skipped once few enough t are left
+    # for mestre_order to pick out with baby steps and giant steps.
+    order = reversed if is_parallel(workers) else iter
+    tasks = [(a, b, p, l, psi[:l + 2]) for l in order(list_of_primes)]
+    results = unordered_map(trace_mod_l, tasks, workers)
+    for (_, _, _, l, _), t in results:
+        congruences.add(l, t)
+        if p > 229 and congruences.count(bound) <= FEW_ORDERS:
+            break
+    results.close()
+
+    if congruences.count(bound) > 1:
+        return mestre_order(a, b, p, p + 1 - congruences.residue,
+                            congruences.modulus)
+    return p + 1 - congruences.symmetric()
+
+
+def _prime_field_order(a, b, p, workers=None):
+    """
+    #E over F_p of y**2 = x**3 + a*x + b for ints a, b: character sums
+    below 20 bits, Mestre's algorithm up to 60 bits and SEA above, except
+    for j(E) = 0, 1728, which SEA does not handle, where Schoof's
+    algorithm takes over
+    """
+    if p.bit_length() < 20:
+        return count_points([(a, b)], p)[0]
+    elif p.bit_length() <= 60:
+        return mestre_order(a, b, p)
+    elif a % p and b % p:
+        # SEA beats plain Schoof from the top of Mestre's range on
+        # (about 4x at 64 bits and 13x at 100 bits)
+        return p + 1 - sea_trace(a, b, p, workers)
+    return _schoof_order(a, b, p, workers)
+
+
 class EllipticCurve(AbelianVariety):
     """ An elliptic curve E defined by an equation y**2 = x**3 + a*x + b """
-    def __init__(self, equations, field):
-
-        def operation((x1, y1), (x2, y2)):
+    def __init__(self, equations, field, coordinates='jacobian'):
+        """
+        coordinates selects the system scalar_mult works in: 'affine'
+        pays one inversion per group operation, while 'jacobian' and
+        'projective' only invert once at the end.
+
+        Over an ExtensionField F_{p**k} equations is the pair (a, b)
+        instead, as ints, sequences of k coefficients or elements of the
+        field, and points are pairs of k-tuples (see
+        Util/extension_field.py). Such curves support is_point, add,
+        batch_add, random_points and scalar_mult, in Jacobian coordinates
+        unless coordinates is 'affine', and order, point_order and
+        security_bits when a and b lie in F_p. The other methods raise
+        NotImplementedError.
+        """
+        def operation(P, Q):
             """ Addition of two points on E """
-            p = field.characteristic()
-            a = self.polynomials[0].coeffs()[1]
+            if P is INFINITY:
+                return Q
+            if Q is INFINITY:
+                return P
+            p, a, inv = self.p, self.a, self.F.inv
+            x1, y1 = int(P[0]) % p, int(P[1]) % p
+            x2, y2 = int(Q[0]) % p, int(Q[1]) % p
             if x1 != x2:
-                s = (y1 - y2) * mod_inv(x1 - x2, p)
-            if x1 == x2:
-                if y1 == -y2:
-                    return (sp.symbols('O'), sp.symbols('O'))
+                s = (y1 - y2) * inv(x1 - x2) % p
+            else:
+                if (y1 + y2) % p == 0:
+                    return INFINITY
                 else:
-                    s = (3 * x1 ** 2 + a) * mod_inv(2 * y1, p)
-            x3 = s ** 2 - x1 - x2
-            y3 = - y1 + s * (x1 - x3)
-            return (x3 % p, y3 % p)
+                    s = (3 * x1 * x1 + a) * inv(2 * y1) % p
+            x3 = (s * s - x1 - x2) % p
+            y3 = (s * (x1 - x3) - y1) % p
+            return (x3, y3)
+
+        def extension_operation(P, Q):
+            """ Addition of two points on E over F_{p**k} """
+            if P is INFINITY:
+                return Q
+            if Q is INFINITY:
+                return P
+            F = self.F
+            x1, y1 = F.coerce(P[0]), F.coerce(P[1])
+            x2, y2 = F.coerce(Q[0]), F.coerce(Q[1])
+            if x1 != x2:
+                s = F.mul(F.sub(y1, y2), F.inv(F.sub(x1, x2)))
+            elif not any(F.add(y1, y2)):
+                return INFINITY
+            else:
+                s = F.add(F.scale(F.sqr(x1), 3), self.a)
+                s = F.mul(s, F.inv(F.scale(y1, 2)))
+            x3 = F.sub(F.sub(F.sqr(s), x1), x2)
+            y3 = F.sub(F.mul(s, F.sub(x1, x3)), y1)
+            return (x3, y3)
+
+        if coordinates != 'affine' and coordinates not in COORDINATE_SYSTEMS:
+            raise ValueError("Unknown coordinate system %s" % coordinates)
+        self.coordinates = coordinates
+
+        if isinstance(field, ExtensionField):
+            AbelianVariety.__init__(self, equations, field,
+                                    extension_operation)
+            F = self.F = field
+            self.p, self.degree = field.p, field.k
+            a, b = self.a, self.b = [F.coerce(c) for c in equations]
+            if not any(F.add(F.scale(F.mul(a, F.sqr(a)), 4),
+                             F.scale(F.sqr(b), 27))):
+                raise Exception("Curve cannot be singular")
+            return
 
         if type(equations) != 'list':
             equations = [equations]
 
         AbelianVariety.__init__(self, equations, field, operation)
 
-        a = self.a = self.polynomials[0].coeffs()[1]
-        b = self.b = self.polynomials[0].coeffs()[3]
-        p = self.p = self.field.characteristic()
+        # Only one equaions may be given
+        if len(self.polynomials) > 1:
+            raise Exception("Elliptic curve must be given by equations \
+                y**2 = x**3 + a*x + b ")
 
         # Check both a,b are not zero
         if len(self.polynomials[0].coeffs()) != 4:
             raise NotImplementedError("Only elliptic curves with non-zero \
                 coeffiencts are supported.")
 
+        # Normalise c*y**2 - c*x**3 + c1*x + c0 to y**2 = x**3 + a*x + b
+        f = self.polynomials[0]
+        x, y = sorted(f.gens, key=f.degree, reverse=True)
+        p = self.p = self.field.characteristic()
+        self.F = PrimeField(p)
+        self.degree = 1
+        c = int(f.coeff_monomial(y ** 2)) % p
+        if (int(f.coeff_monomial(x ** 3)) + c) % p != 0:
+            raise Exception("Elliptic curve must be given by equations \
+                y**2 = x**3 + a*x + b ")
+        a = self.a = -int(f.coeff_monomial(x)) * self.F.inv(c) % p
+        b = self.b = -int(f.coeff_monomial(1)) * self.F.inv(c) % p
+
         # Curve cannot be singular
         if (4*a**3 + 27*b**2) % p == 0:
             raise Exception("Curve cannot be singular")
 
-        # Only one equaions may be given
-        if len(self.polynomials) > 1:
-            raise Exception("Elliptic curve must be given by equations \
-                y**2 = x**3 + a*x + b ")
+        # psi_n in F_p[x], shared with every other E with the same a, b, p
+        self.division_polynomials = for_curve(a, b, p)
+
+        # Constant of the simplified SWU map, found on first use
+        self._sswu_z = None
 
+    def _require_prime_field(self, name):
+        """ Raises NotImplementedError for E over F_{p**k}, k > 1 """
+        if self.degree > 1:
+            raise NotImplementedError("%s needs a prime field" % name)
+
+
+    def is_point(self, point):
+        """ Verifies that given point belongs to E """
+        if point is INFINITY:
+            return True
+        if self.degree > 1:
+            F = self.F
+            x, y = F.coerce(point[0]), F.coerce(point[1])
+            rhs = F.add(F.mul(F.add(F.sqr(x), self.a), x), self.b)
+            return F.sqr(y) == rhs
+        x, y = int(point[0]), int(point[1])
+        return (y * y - x ** 3 - self.a * x - self.b) % self.p == 0
+
+    def scalar_mult(self, scalar, point, secret=False):
+        """
+        Scalar multiplication of a point on E with a width-w NAF whose
+        window is picked from the bit length of the scalar. Outside affine
+        mode the odd multiples are normalised to affine with one shared
+        inversion and the main loop uses mixed additions, so the only other
+        inversion is the final conversion back to affine coordinates.
+
+        For secret scalars (private keys, ephemerals) pass secret=True to
+        use an x-only Montgomery ladder instead: it runs a fixed number of
+        iterations, one addition and one doubling each, whatever the
+        scalar's bits or length.
+        """
+        if self.degree > 1:
+            return self._extension_scalar_mult(scalar, point, secret)
+        a, p = self.a, self.p
+        if point is INFINITY:
+            return INFINITY
+        P = (int(point[0]) % p, int(point[1]) % p)
+        if scalar < 0:
+            scalar, P = -scalar, (P[0], -P[1] % p)
+
+        if secret:
+            bits = max(p.bit_length() + 1, scalar.bit_length())
+            return XOnly.ladder(scalar, P, a, self.b, p, bits) or INFINITY
 
-    def scalar_mult(self, scalar, point):
-        """ Scalar multiplication of a point on E """
         if scalar == 0:
-            return (sp.symbols('O'), sp.symbols('O'))
-        elif scalar == 1:
-            return point
-        elif scalar % 2 == 0:
-            return self.scalar_mult(scalar / 2, self.add(point, point))
+            return INFINITY
+        w = window_width(scalar.bit_length())
+
+        if self.coordinates == 'affine':
+            R = scalar_multiply(scalar, P, self.add,
+                                lambda Q: self.add(Q, Q),
+                                lambda Q: Q if Q is INFINITY else (Q[0], -Q[1] % p),
+                                w)
+            return R or INFINITY
+
+        C = COORDINATE_SYSTEMS[self.coordinates]
+        table = [C.from_affine(P)]
+        if w > 2:
+            P2 = C.double(table[0], a, p)
+            for i in xrange(1, 1 << (w - 2)):
+                table.append(C.add(table[-1], P2, a, p))
+        table = C.batch_to_affine(table, p)
+
+        R = wnaf_multiply(wnaf(scalar, w), table,
+                          lambda R, T: C.add_mixed(R, T, a, p),
+                          lambda R: C.double(R, a, p),
+                          lambda T: (T[0], -T[1] % p), C.IDENTITY)
+        return C.to_affine(R, p) or INFINITY
+
+    def _extension_scalar_mult(self, scalar, point, secret):
+        """ scalar_mult over F_{p**k}, the same wNAF on ExtensionJacobian """
+        if secret:
+            raise NotImplementedError("The Montgomery ladder needs a prime "
+                                      "field")
+        a, F = self.a, self.F
+        if point is INFINITY or scalar == 0:
+            return INFINITY
+        P = (F.coerce(point[0]), F.coerce(point[1]))
+        if scalar < 0:
+            scalar, P = -scalar, (P[0], F.neg(P[1]))
+        w = window_width(scalar.bit_length())
+
+        if self.coordinates == 'affine':
+            R = scalar_multiply(scalar, P, self.add,
+                                lambda Q: self.add(Q, Q),
+                                lambda Q: Q if Q is INFINITY else
+                                (Q[0], F.neg(Q[1])), w)
+            return R or INFINITY
+
+        C = ExtensionJacobian
+        table = [C.from_affine(P, F)]
+        if w > 2:
+            P2 = C.double(table[0], a, F)
+            for i in xrange(1, 1 << (w - 2)):
+                table.append(C.add(table[-1], P2, a, F))
+        table = C.batch_to_affine(table, F)
+
+        R = wnaf_multiply(wnaf(scalar, w), table,
+                          lambda R, T: C.add_mixed(R, T, a, F),
+                          lambda R: C.double(R, a, F),
+                          lambda T: (T[0], F.neg(T[1])), C.identity(F))
+        return C.to_affine(R, F) or INFINITY
+
+
+    def multi_scalar_mult(self, scalars, points):
+        """
+        Computes scalars[0]*points[0] + scalars[1]*points[1] + ... with all
+        terms sharing one chain of doublings. Interleaved wNAF (Straus and
+        Shamir's trick) is used for a few terms and Pippenger's bucket
+        method for many, whichever the operation count estimate favours.
+        """
+        if len(scalars) != len(points):
+            raise ValueError("Need exactly one scalar per point")
+        self._require_prime_field("multi_scalar_mult")
+        a, p = self.a, self.p
+
+        terms = []
+        for k, P in zip(scalars, points):
+            if k == 0 or P is INFINITY:
+                continue
+            P = (int(P[0]) % p, int(P[1]) % p)
+            if k < 0:
+                k, P = -k, (P[0], -P[1] % p)
+            terms.append((k, P))
+        if not terms:
+            return INFINITY
+        scalars, points = [k for k, P in terms], [P for k, P in terms]
+
+        if self.coordinates == 'affine':
+            C = None
+            add = add_point = self.add
+            double = lambda R: self.add(R, R)
+            identity = INFINITY
+        else:
+            C = COORDINATE_SYSTEMS[self.coordinates]
+            add = lambda R, T: C.add(R, T, a, p)
+            add_point = lambda R, T: C.add_mixed(R, T, a, p)
+            double = lambda R: C.double(R, a, p)
+            identity = C.IDENTITY
+        negate = lambda T: T if T is INFINITY else (T[0], -T[1] % p)
+
+        bit_lengths = [k.bit_length() for k in scalars]
+        c, cost = pippenger_window(len(scalars), max(bit_lengths))
+        if cost < interleaved_cost(bit_lengths):
+            R = pippenger_multiply(scalars, points, c, add, add_point, double,
+                                   negate, identity)
         else:
-            return self.add(point, self.scalar_mult(scalar - 1, point))
+            widths = [window_width(bits) for bits in bit_lengths]
+            tables = []
+            for P, w in zip(points, widths):
+                table = [P if C is None else C.from_affine(P)]
+                if w > 2:
+                    P2 = double(table[0])
+                    for i in xrange(1, 1 << (w - 2)):
+                        table.append(add(table[-1], P2))
+                tables.append(table)
+            if C is not None:
+                flat = C.batch_to_affine([T for t in tables for T in t], p)
+                start = 0
+                for i, table in enumerate(tables):
+                    tables[i] = flat[start:start + len(table)]
+                    start += len(table)
+            expansions = [(wnaf(k, w), table) for k, w, table in
+                          zip(scalars, widths, tables)]
+            R = interleaved_wnaf_multiply(expansions, add_point, double,
+                                          negate, identity)
+
+        if C is not None:
+            R = C.to_affine(R, p)
+        return R or INFINITY
+
+
+    def batch_add(self, left, right):
+        """
+        Adds left[i] + right[i] for every i in affine coordinates, sharing a
+        single modular inversion between all the slopes (Montgomery's
+        simultaneous inversion trick). Doublings, the identity and P + (-P)
+        may appear anywhere in the batch.
+        """
+        if len(left) != len(right):
+            raise ValueError("Need the same number of points on both sides")
+        if self.degree > 1:
+            return self._extension_batch_add(left, right)
+        a, p = self.a, self.p
+
+        sums = [None] * len(left)
+        pending, numerators, denominators = [], [], []
+        for i, (P, Q) in enumerate(zip(left, right)):
+            if P is INFINITY:
+                sums[i] = Q
+                continue
+            if Q is INFINITY:
+                sums[i] = P
+                continue
+            x1, y1 = int(P[0]) % p, int(P[1]) % p
+            x2, y2 = int(Q[0]) % p, int(Q[1]) % p
+            if x1 != x2:
+                numerators.append(y1 - y2)
+                denominators.append(x1 - x2)
+            elif (y1 + y2) % p == 0:
+                sums[i] = INFINITY
+                continue
+            else:
+                numerators.append(3 * x1 * x1 + a)
+                denominators.append(2 * y1)
+            pending.append((i, x1, y1, x2))
+
+        inverses = self.F.batch_inv(denominators)
+        for (i, x1, y1, x2), n, inverse in zip(pending, numerators, inverses):
+            s = n * inverse % p
+            x3 = (s * s - x1 - x2) % p
+            sums[i] = (x3, (s * (x1 - x3) - y1) % p)
+        return sums
+
+    def _extension_batch_add(self, left, right):
+        """ batch_add over F_{p**k}, one Itoh-Tsujii inversion in all """
+        a, F = self.a, self.F
+
+        sums = [None] * len(left)
+        pending, numerators, denominators = [], [], []
+        for i, (P, Q) in enumerate(zip(left, right)):
+            if P is INFINITY:
+                sums[i] = Q
+                continue
+            if Q is INFINITY:
+                sums[i] = P
+                continue
+            x1, y1 = F.coerce(P[0]), F.coerce(P[1])
+            x2, y2 = F.coerce(Q[0]), F.coerce(Q[1])
+            if x1 != x2:
+                numerators.append(F.sub(y1, y2))
+                denominators.append(F.sub(x1, x2))
+            elif not any(F.add(y1, y2)):
+                sums[i] = INFINITY
+                continue
+            else:
+                numerators.append(F.add(F.scale(F.sqr(x1), 3), a))
+                denominators.append(F.scale(y1, 2))
+            pending.append((i, x1, y1, x2))
+
+        inverses = F.batch_inv(denominators)
+        for (i, x1, y1, x2), n, inverse in zip(pending, numerators, inverses):
+            s = F.mul(n, inverse)
+            x3 = F.sub(F.sub(F.sqr(s), x1), x2)
+            sums[i] = (x3, F.sub(F.mul(s, F.sub(x1, x3)), y1))
+        return sums
 
 
     def random_point(self):
         """ Finds random a point (x,y) on E """
-        a,b,p = self.a,self.b,self.p
-        x = rn.randrange(1, p)
+        return self.random_points(1)[0]
 
-        while legendre(x ** 3 + a * x + b, p) != 1:
-            x = rn.randrange(1, p)
+    def random_points(self, n):
+        """
+        n random points (x, y) on E. The candidates x are drawn in
+        batches, x**3 + a*x + b goes through one batch of Jacobi symbols
+        and only the squares pay for a square root (see
+        Util/square_roots.py).
+        """
+        a, b, p, F = self.a, self.b, self.p, self.F
+        points = []
+        if self.degree > 1:
+            while len(points) < n:
+                x = tuple(rn.randrange(p) for i in xrange(self.degree))
+                y = F.sqrt(F.add(F.mul(F.add(F.sqr(x), a), x), b))
+                if y is not None:
+                    points.append((x, y if rn.getrandbits(1) else F.neg(y)))
+            return points
+        while len(points) < n:
+            xs = [rn.randrange(p) for i in xrange(2 * (n - len(points)))]
+            zs = [(x ** 3 + a * x + b) % p for x in xs]
+            for x, z, symbol in zip(xs, zs, F.legendre_batch(zs)):
+                if symbol == 1 and len(points) < n:
+                    y = F.sqrt(z)
+                    points.append((x, y if rn.getrandbits(1) else p - y))
+        return points
+
+    def hash_to_curve(self, message, dst=_hash_to_curve_dst):
+        """
+        A point of E derived from the string message with the simplified
+        SWU map of RFC 9380 (see Util/hash_to_curve.py); the same message
+        and domain tag dst always give the same point. The cofactor is
+        not cleared.
+        """
+        self._require_prime_field("hash_to_curve")
+        if self._sswu_z is None:
+            self._sswu_z = sswu_z(self.a, self.b, self.p)
+        return hash_to_curve(message, self.a, self.b, self.p, dst,
+                             self._sswu_z, self.operation)
 
-        Z = x ** 3 + a * x + b
+    def encode_to_curve(self, message, dst=_encode_to_curve_dst):
+        """
+        Like hash_to_curve with a single SWU map, about twice as fast but
+        the points are not uniformly distributed
+        """
+        self._require_prime_field("encode_to_curve")
+        if self._sswu_z is None:
+            self._sswu_z = sswu_z(self.a, self.b, self.p)
+        return encode_to_curve(message, self.a, self.b, self.p, dst,
+                               self._sswu_z)
 
-        if p % 4 == 3:
-            return (x,(Z ** ((p + 1) / 4)) % p)
-        else:
-            r = rn.randrange(1, p)
-
-            while legendre(r ** 2 - 4 * Z, p) != -1:
-                r = rn.randrange(1, p)
-
-            d = (r ** 2 - 4 * Z) % p
-            alpha = (r + math.sqrt(d)) / 2
-            beta  = (alpha ** ((p + 1) / 2)).expand()
-            beta = str(beta)
-            for string in re.split("([+-/])",beta.replace(" ","")):
-                if "sqrt" in string:
-                    for number in re.split("([*])",string):
-                        if not "sqrt" in number:
-                            if not "*" in number:
-                                return ((int(number)/2) %p,x)
+    def order(self, workers=None):
+        """
+        Order of E over F_p. workers (a number of processes or a
+        concurrent.futures executor) spreads the work for the small primes
+        l of Schoof and SEA over a process pool.
 
-    def order(self):
-        """ Order of E over F_p"""
+        Over F_{p**k} the curve must be defined over F_p: with t the trace
+        of Frobenius over F_p and s_i = t*s_(i-1) - p*s_(i-2), s_0 = 2,
+        s_1 = t, #E(F_{p**k}) = p**k + 1 - s_k.
+        """
         p = self.p
-        if p.bit_length() < 20:
-            return self.schoof()
-        elif 20 <= p.bit_length() <= 100:
-            return self.schoof()
-        else:
-            return self.schoof_elkies_atkin()
+        if self.degree > 1:
+            if any(self.a[1:]) or any(self.b[1:]):
+                raise NotImplementedError("Only curves defined over F_p can "
+                                          "be counted over F_{p**k}")
+            t = p + 1 - _prime_field_order(self.a[0], self.b[0], p, workers)
+            s0, s1 = 2, t
+            for i in xrange(1, self.degree):
+                s0, s1 = s1, t * s1 - p * s0
+            return p ** self.degree + 1 - s1
+        return _prime_field_order(self.a, self.b, p, workers)
 
     def lenstra(self):
-        """ Lenstra's simple point counting algorithm for elliptic curves"""
-        a,b,p = self.a,self.b,self.p
-        number_of_points = 1 + p
-        for x in xrange(0,p):
-            number_of_points+= legendre(x**3 + a*x + b, p)
-        return number_of_points
+        """
+        Lenstra's simple point counting algorithm for elliptic curves,
+        #E = p + 1 + sum of the Legendre symbols of x**3 + a*x + b over
+        F_p, vectorised with NumPy (see Util/point_counting.py, whose
+        count_points does many curves over the same p at once)
+        """
+        self._require_prime_field("lenstra")
+        return count_points([(self.a, self.b)], self.p)[0]
 
-    def schoof(self):
+    def mestre(self):
+        """
+        Baby-step giant-step search of the Hasse interval for a multiple
+        of the orders of random points of E and of its quadratic twist,
+        Mestre's algorithm, in O(p**(1/4)) group operations (see
+        Util/mestre.py). Needs p > 229.
+        """
+        self._require_prime_field("mestre")
+        return mestre_order(self.a, self.b, self.p)
+
+    def schoof(self, workers=None):
         """
         schoof's algorithm for counting the number of points on an elliptic
         curve over F_p
 
         The goal is to compute the trace of the frobenious endomorphism t. 
-        Then p + 1 + t is the order of the group. 
+        Then p + 1 - t is the order of the group. 
 
         Computing t is done by computing t mod l_1,l_2,...,l_s for a 
         sufficient number of primes l_1,l_2,...,l_s such that their 
@@ -219,110 +657,57 @@ class EllipticCurve(AbelianVariety):
         Then use the chinese remainder theorem to recover t. let q_li and t_li
         be q and t mod l_i for i= 1,...,s. Then the equation 
             
-                (x**2p,y**2p) + q_li(x,y) = t_l(x**p,y**p) mod l_i
+                (x**p**2,y**p**2) + q_li(x,y) = t_l(x**p,y**p) mod l_i
         
-        is used to calculate the t_li's.  
+        is used to calculate the t_li's. All of the arithmetic is done with
+        dense polynomials in F_p[x] modulo the division polynomial psi_l
+        (see Util/schoof.py).
 
-        """
+        The primes l are independent of each other: with workers (a number
+        of processes or a concurrent.futures executor) they are handed to
+        a process pool, largest l first since those take longest. Run
+        serially the congruences are combined as they come (see
+        Util/crt.py) and the count stops early, at the last few candidate
+        traces, with a baby-step giant-step search (see Util/mestre.py).
 
-        a,b,p = self.a,self.b,self.p
-        x, y = sp.symbols('x,y')
-        list_of_primes=list_of_congruences=[]
-
-        # Build list of odd primes satisfying condition's above
-        i=3
-        product = 2
-        while product < 4*math.sqrt(p):
-            if is_probable_prime(i):
-                list_of_primes.append(i)
-                product*=i
-            i+=2
-
-        # Special case to determine t mod 2. 
-        if roots_in_F_q(p, f):
-            list_of_congruences.append((2, 1))
-        else:
-            list_of_congruences.append((2, 0))
-
-        # alias E.dpoly()
-        f = E.dpoly
-
-        # Build list of congruences
-        for l in list_of_primes:
-            p_l = p % l 
-            x_pl,y_pl = x - f(pl-1)*f(pl+1) / f(pl)**2, f(2*pl) / f(pl)**4
-
-            # We skip the case that (x**2p,y**2p) == +- q_pl(x,y)
-            if (x**(2*p), y**(2*p)) == (x_pl, y_pl):
-                continue
-            elif (x**(2*p), y**(2*p)) == (-x_pl, -y_pl):
-                continue
-
-            # Calculate (x',y') = (x**2p,y**2p) + q_pl(x,y) mod phi_l
-            x_prime, y_prime = self.symbolic_add((x**(2*p), y**(2*p)), (x_pl, y_pl))
-            x_prime, y_prime = sp.reduced(x_prime,f(pl)),sp.reduced(y_prime,f(pl))
-
-            # Look for t_l such that (x',y') = t_l(x**p,y**p) mod phi(l) 
-            for t_l in xrange(1,(l-1)/2):
-                found_tl = False
-                x_tl,y_tl = self.symbolic_scalar(t_l,(x**p,y**p))
-                if sp.reduced(x_prime - x_tl,f(pl)) == 0:
-                    found_tl = True
-                    if sp.reduced((y_prime - y_tl)/y, f(pl)) == 0:
-                        list_of_congruences.append((l,t_l))
-                    else: 
-                        list_of_congruences.append((l,-t_l))
-
-        return chinese_remainder_theorem(list_of_congruences)
+        """
+        self._require_prime_field("schoof")
+        return _schoof_order(self.a, self.b, self.p, workers)
 
 
     def dpoly(self, n):
-        """ Calculate the nth division polynomial for E """
+        """
+        The nth division polynomial psi_n of E with coefficients mod p, a
+        polynomial in x for odd n and y times one for even n. The points
+        of order dividing n have their x-coordinates among its roots.
+        """
+        self._require_prime_field("dpoly")
         x, y = sp.symbols('x,y')
-        a,b = self.a,self.b
-        assert n >= 0
-
-        if n == 0 or n == 1:
-            return sp.poly(n, gens=x)
-        elif n == 2:
-            return sp.poly(2 * y)
-        elif n == 3:
-            return sp.poly(3 * x ** 4 + 6 * a * x ** 2 + 12 * b * x - a ** 2)
-        elif n == 4:
-            return sp.poly(4 * y * (x ** 6 + 5 * a * x ** 4 \
-                                   + 20 * b * x ** 3 - 5 * a ** 2 * x ** 2 - \
-                                   4 * a * b * x - 8 * b ** 2 - a ** 3))
-        elif n % 2 == 1:
-            m = n / 2
-            return self.dpoly(m + 2) * self.dpoly(m) ** 3 \
-                   - self.dpoly(m - 1) * self.dpoly(m + 1) ** 3
-        elif n % 2 == 0:
-            m = n / 2
-            return (self.dpoly(m) / 2 * y) \
-                   * (self.dpoly(m + 2) * self.dpoly(m - 1) ** 2 \
-                      - self.dpoly(m - 2) * self.dpoly(m + 1) ** 2)
+        f, e = self.division_polynomials.psi(n)
+        psi = sp.Poly(list(reversed(f)) or [0], x)
+        if e:
+            return sp.Poly(y * psi.as_expr(), x, y)
+        return psi
 
 
     def symbolic_scalar(self, scalar, (x, y)):
         """ Symbolic scalar multiplication  of (x,y) """
-        if scalar == 0:
-            return (sp.symbols('O'), sp.symbols('O'))
-        elif scalar == 1:
-            return (x, y)
-        elif scalar % 2 == 0:
-            return self.symbolic_scalar(scalar / 2, self.symbolic_add((x, y), (x, y)))
-        else:
-            return self.symbolic_add((x, y), self.symbolic_scalar(scalar - 1, (x, y)))
+        self._require_prime_field("symbolic_scalar")
+        R = scalar_multiply(scalar, (x, y), self.symbolic_add,
+                            lambda P: self.symbolic_add(P, P),
+                            lambda P: (P[0], -P[1]))
+        return R or INFINITY
 
 
     def symbolic_add(self, (x1, y1), (x2, y2)):
         """ Adds (x1,y1) + (x2,y2) symbolically """
+        self._require_prime_field("symbolic_add")
         a = self.a
         if x1 != x2:
             s = (y1 - y2) / (x1 - x2)
         else:
             if y1 == -y2:
-                return (sp.symbols('O'), sp.symbols('O'))
+                return INFINITY
             else:
                 s = (3 * x1 ** 2 + a) / (2 * y1)
         x3 = s ** 2 - x1 - x2
@@ -330,111 +715,346 @@ class EllipticCurve(AbelianVariety):
         return (x3, y3)
 
 
-    def sea(self):
-        """" Schoof-Elkies-Atkin Algorithm for computing the number of points
-        in E. This file uses modular polynomials and isogenies volcanos.
-
-        Info found here ./.res/Implementing the Schoof-Elkies-Atkin Algorithm with NTL.pdf """
-
-        a,b,p = self.a,self.b,self.p
-        list_of_primes = Alkies = Elkies = []
-        x,y = sp.symbols('x,y')
-
-
-        # 1 Figure out first congruence l = 2
-        if sp.gcd(x**p -x,x**3+a*x +b)!=1:
-            Elkies.append((0,2))
-        else:
-            Elkies.append((1,2))
-
-        # 3 Create list of primes
-        i=3
-        product = 2
-        while product < 4*math.sqrt(p):
-            if is_probable_prime(i):
-                list_of_primes.append(i)
-                product*=i
-            i+=2
-
-
-        # 3
-        for l in list_of_primes:
-            # a) Computer lth modular polynomial phi
-
-            # a) evaluate phi at y = j (j is j-invariant of E), call this phi(j)
-            # b) compute X**p mod phi(j)
-            # c) Compute gcd(phi(j),x**P - x)
-            # c) decide if l is an elkies or atkins prime
-            if elkies == True:
-                # d) i compute j(E) as the root of phi_lj in F_p
-                # d)
-                # d)
-                # d)
-                # d)
-                pass 
-            else:
-                pass 
-
-
-
+    def sea(self, workers=None):
+        """
+        Schoof-Elkies-Atkin algorithm for the number of points of E, for
+        large p (it needs p > 2*l + 1 for the primes l it uses).
+
+        Like schoof() it finds t mod l for small primes l, but it works
+        with the canonical modular polynomial Phi_l(F, j(E)) of degree
+        l + 1 instead of psi_l of degree (l**2 - 1)/2. When Phi_l(F, j(E))
+        has a root in F_p (an Elkies prime) the root gives an l-isogeny
+        whose kernel polynomial, of degree (l - 1)/2, replaces psi_l;
+        otherwise (an Atkin prime) it only restricts t mod l to a few
+        values, and those are matched against each other on a random point
+        with baby steps and giant steps. The modular polynomials are read
+        from Util/modular_polynomials.dat (see Util/sea.py). workers runs
+        the primes l on a process pool as in schoof().
 
+        """
+        self._require_prime_field("sea")
+        a, b, p = self.a, self.b, self.p
+        return p + 1 - sea_trace(a, b, p, workers)
 
-        t = match_sort(Elkies + Atkins)
-        return p + 1 + t
+    schoof_elkies_atkin = sea
 
+    def point_order(self, point, multiple=None):
+        """
+        The order of a point on E, from a multiple of it (#E by default)
+        factored with lenstra
+        """
+        if point is INFINITY:
+            return 1
+        n = multiple or self.order()
+        for q in set(lenstra(n)):
+            while n % q == 0 and self.scalar_mult(n // q, point) is INFINITY:
+                n //= q
+        return n
+
+    def discrete_log(self, P, Q, order=None, workers=None):
+        """
+        The k in [0, n) with Q = k*P, for P of order n (found with
+        point_order if not given). Pohlig-Hellman splits the logarithm
+        over the prime factors q of n, found with lenstra; each one is
+        solved with baby steps and giant steps, or for large q with
+        Pollard's rho with the negation map and distinguished points (see
+        Util/discrete_log.py), whose walks workers runs on a process pool.
+        Raises ArithmeticError if Q is not a multiple of P.
+        """
+        self._require_prime_field("discrete_log")
+        if Q is INFINITY:
+            return 0
+        if P is INFINITY:
+            raise ArithmeticError("Q is not a multiple of P")
+        n = order or self.point_order(P)
+        p = self.p
+        P = (int(P[0]) % p, int(P[1]) % p)
+        Q = (int(Q[0]) % p, int(Q[1]) % p)
+        return pohlig_hellman_log(self.a, p, P, Q, lenstra(n), workers)
 
-    def order_frobenious(self,phi_lj):
-        pass
+    def security_bits(self, order=None):
+        """
+        log2 of the sqrt(pi*q/4) group operations Pollard's rho needs in
+        the subgroup of largest prime order q of E, the best generic
+        attack on discrete logarithms on E; order is #E if known
+        """
+        q = max(lenstra(order or self.order()))
+        return math.log(math.pi * q / 4, 2) / 2
 
+    def discrete_log_interval(self, P, Q, lo, hi, workers=None):
+        """
+        The k in [lo, hi) with Q = k*P by Pollard's kangaroo method, in
+        about 2*sqrt(hi - lo) group operations whatever the order of P.
+        Raises ArithmeticError if there is no such k.
+        """
+        self._require_prime_field("discrete_log_interval")
+        p = self.p
+        if Q is INFINITY or P is INFINITY:
+            for k in xrange(lo, hi):
+                if self.scalar_mult(k, P) == Q:
+                    return k
+            raise ArithmeticError("no logarithm in the interval")
+        P = (int(P[0]) % p, int(P[1]) % p)
+        Q = (int(Q[0]) % p, int(Q[1]) % p)
+        return kangaroo_log(self.a, p, P, Q, lo, hi, workers)
 
 
 
 
+class FixedBasePoint(object):
+    """
+    A point P on an elliptic curve E with a precomputed comb table for
+    computing k*P for many scalars k (Lim-Lee comb method).
+
+    The scalar is cut into `teeth` rows of d = ceil(bits/teeth) bits and
+    the table holds every sum of the points 2**(i*d)*P, so a
+    multiplication costs d - 1 doublings and at most d mixed additions
+    instead of bits doublings. max_table_size bounds the number of
+    stored points, which fixes teeth = floor(log2(max_table_size + 1)).
+    """
+    def __init__(self, curve, point, bits=None, max_table_size=255):
+        curve._require_prime_field("FixedBasePoint")
+        if curve.coordinates not in COORDINATE_SYSTEMS:
+            raise ValueError("FixedBasePoint needs jacobian or projective \
+                coordinates")
+        if max_table_size < 1:
+            raise ValueError("max_table_size must be at least 1")
+
+        p = curve.p
+        self.curve = curve
+        self.point = (int(point[0]) % p, int(point[1]) % p)
+        self.bits = bits or p.bit_length() + 1
+        self.teeth = min(self.bits, (max_table_size + 1).bit_length() - 1)
+        self.spacing = -(-self.bits // self.teeth)
+        self.table = self._precompute()
+
+    def _precompute(self):
+        """ Builds the comb table T[u] = sum of 2**(i*d)*P over bits i of u """
+        C = COORDINATE_SYSTEMS[self.curve.coordinates]
+        a, p = self.curve.a, self.curve.p
+
+        rows = [C.from_affine(self.point)]
+        for i in xrange(1, self.teeth):
+            R = rows[-1]
+            for j in xrange(self.spacing):
+                R = C.double(R, a, p)
+            rows.append(R)
+
+        table = [C.IDENTITY]
+        for i in xrange(self.teeth):
+            table.extend([C.add(T, rows[i], a, p) for T in table])
+        return C.batch_to_affine(table[1:], p)
+
+    def scalar_mult(self, scalar):
+        """ Computes scalar*P using the comb table """
+        curve = self.curve
+        if scalar < 0:
+            R = self.scalar_mult(-scalar)
+            if R is INFINITY:
+                return INFINITY
+            return (R[0], -R[1] % curve.p)
+        if scalar.bit_length() > self.bits:
+            return curve.scalar_mult(scalar, self.point)
+
+        C = COORDINATE_SYSTEMS[curve.coordinates]
+        a, p = curve.a, curve.p
+        d, table = self.spacing, self.table
+        R = C.IDENTITY
+        for j in xrange(d - 1, -1, -1):
+            R = C.double(R, a, p)
+            u = 0
+            for i in xrange(self.teeth - 1, -1, -1):
+                u = (u << 1) | ((scalar >> (i * d + j)) & 1)
+            if u and table[u - 1] is not None:
+                R = C.add_mixed(R, table[u - 1], a, p)
+
+        return C.to_affine(R, p) or INFINITY
+
+    def __mul__(self, scalar):
+        return self.scalar_mult(scalar)
+
+    __rmul__ = __mul__
+
+    def dumps(self):
+        """ Serializes the table to a JSON string """
+        curve = self.curve
+        return json.dumps({'a': curve.a, 'b': curve.b, 'p': curve.p,
+                           'point': self.point, 'bits': self.bits,
+                           'teeth': self.teeth, 'table': self.table})
+
+    @classmethod
+    def loads(cls, curve, data):
+        """ Rebuilds a FixedBasePoint on curve from the output of dumps() """
+        data = json.loads(data)
+        if (data['a'], data['b'], data['p']) != (curve.a, curve.b, curve.p):
+            raise ValueError("Table was computed on a different curve")
+        if len(data['table']) != 2 ** data['teeth'] - 1:
+            raise ValueError("Corrupt fixed base table")
+
+        self = cls.__new__(cls)
+        self.curve = curve
+        self.point = tuple(data['point'])
+        self.bits = data['bits']
+        self.teeth = data['teeth']
+        self.spacing = -(-self.bits // self.teeth)
+        self.table = [tuple(T) if T is not None else None
+                      for T in data['table']]
+        return self
 
 
 class HyperEllipticCurve(Group):
     """
     A hyperelliptic curve defined by an equation 0 = y**2 - f(x)
-    where deg(f) > 4, with no repeating roots over a finite field.
+    where deg(f) = 2g + 1 > 4, with no repeating roots over a finite field.
     Throughout these docstrings, the capital letter H will be used
     to denote a HyperEllipticCurve
+
+    Elements of the Jacobian of H are divisor classes in Mumford form
+    (u, v), coefficient lists over F_p lowest degree first (see
+    Util/mumford.py); the identity is ([1], []).
     """
-    def __init__(self, equations, field):
+    def __init__(self, equations, field, coordinates='projective'):
+        """
+        For genus 2, coordinates selects the explicit formulas scalar_mult
+        works with (see Util/genus2.py): 'affine' pays one inversion per
+        group operation, 'projective' only one at the end.
+        """
+        if coordinates not in GENUS2_COORDINATES:
+            raise ValueError("Unknown coordinate system %s" % coordinates)
+        self.coordinates = coordinates
 
-        def genus(self):
-            """ The arithmetic genus of H """
-            f = equations[0].subs(y ** 2, 0)
-            if degree(f) == 3:
-                return 1
+        if type(equations) != list:
+            equations = [equations]
+        self.equations = equations
+        self.field = field
+        p = self.p = field.characteristic()
+        if p <= 2:
+            raise NotImplementedError("Only fields of odd characteristic \
+                are supported.")
+        self.F = PrimeField(p)
+
+        # Normalise c*y**2 - c*f(x) to y**2 = f(x)
+        h = sp.poly(equations[0])
+        x, y = sorted(h.gens, key=h.degree, reverse=True)
+        c, f = 0, []
+        for monomial, coefficient in h.terms():
+            i, j = monomial[h.gens.index(x)], monomial[h.gens.index(y)]
+            if j == 2 and i == 0:
+                c = int(coefficient) % p
+            elif j == 0:
+                f += [0] * (i + 1 - len(f))
+                f[i] = -int(coefficient) % p
             else:
-                return 2
+                raise Exception("Hyperelliptic curve must be given by an \
+                    equation y**2 = f(x)")
+        if c == 0:
+            raise Exception("Hyperelliptic curve must be given by an \
+                equation y**2 = f(x)")
+        f = self.f = polynomial.scale(normalize(f), self.F.inv(c), p)
+        if len(f) < 4 or len(f) % 2:
+            raise NotImplementedError("Only curves y**2 = f(x) with deg(f) \
+                odd are supported.")
+        self.genus = (len(f) - 2) // 2
 
-        self.genus = self.genus()
+        # Curve cannot be singular
+        if len(polynomial.gcd(f, polynomial.derivative(f, p), p)) > 1:
+            raise Exception("Curve cannot be singular")
 
-        def operation((u1, v1), (u2, v2)):
-            """ Addition of two divisors using cantor's algorithm """
+        def operation(D1, D2):
+            """ Addition of two divisors by NUCOMP """
+            return mumford.add(D1, D2, self.f, self.genus, self.p)
 
-            f = equations[0].subs(y ** 2, 0)
-            g = self.genus
-            e1, e2, d1 = sp.gcdex(u1, u2)
-            c1, c2, d = sp.gcdex(d1, v1 + v2)
-            s1, s2, s3 = c1 * e1, c1 * e2, c2
-            u = u1 * u2 / d ** 2
-            v = sp.rem((s1 * u1 * v2 + s2 * u2 * v1 + s3 * (v1 * v2 + f)) / d, u)
+        def elements():
+            pass
 
-            while sp.degree(u) > g:
-                u = (f - v ** 2) / u
-                v = sp.rem(-v, u)
+        Group.__init__(self,elements,operation)
 
-            if u.coeffs()[len(u.coeffs()) - 1] != 1:
-                u = u / u.coeffs()[len(u.coeffs()) - 1]
+    def add(self, D1, D2):
+        """ Adds two divisor classes of the Jacobian of H """
+        return self.operation(D1, D2)
 
-            return (u, v)
+    def batch_add(self, left, right):
+        """
+        Adds left[i] + right[i] for every i, sharing a single modular
+        inversion between all the sums (see Util/mumford.py)
+        """
+        return mumford.batch_add(left, right, self.f, self.genus, self.p)
 
-        def elements():
-            pass
+    def is_point(self, point):
+        """ Verifies that (x, y) lies on H """
+        x, y = int(point[0]), int(point[1])
+        return (y * y - polynomial.evaluate(self.f, x % self.p, self.p)) \
+            % self.p == 0
 
-        Group.__init__(self,elements,operation)
+    def random_point(self):
+        """ A random affine point (x, y) on H """
+        p, F = self.p, self.F
+        while True:
+            x = rn.randrange(p)
+            z = polynomial.evaluate(self.f, x, p)
+            if F.is_square(z):
+                y = F.sqrt(z)
+                return (x, y if rn.getrandbits(1) else -y % p)
+
+    def divisor(self, point):
+        """ The class of P - O for a point P = (x, y) of H """
+        p = self.p
+        return [-int(point[0]) % p, 1], normalize([int(point[1]) % p])
+
+    def random_divisor(self):
+        """ The sum of g random divisors P - O """
+        D = ([1], [])
+        for i in xrange(self.genus):
+            D = self.add(D, self.divisor(self.random_point()))
+        return D
+
+    def scalar_mult(self, scalar, divisor):
+        """
+        Multiplies a divisor (u, v) in Mumford form by scalar, using the
+        same width-w NAF as EllipticCurve.scalar_mult (-(u, v) = (u, -v)).
+        In genus 2 the additions and doublings are explicit formulas in
+        the coordinates chosen for H, in any other genus NUCOMP and NUDUPL.
+        """
+        f, p = self.f, self.p
+        if self.genus == 2:
+            C = GENUS2_COORDINATES[self.coordinates]
+            D = genus2.from_mumford(divisor)
+            if self.coordinates == 'projective':
+                D = C.from_affine(D)
+            R = scalar_multiply(scalar, D, lambda A, B: C.add(A, B, f, p),
+                                lambda A: C.double(A, f, p),
+                                lambda A: C.negate(A, p))
+            if R is None:
+                return ([1], [])
+            if self.coordinates == 'projective':
+                R = C.to_affine(R, p)
+            return genus2.to_mumford(R)
+
+        g = self.genus
+        R = scalar_multiply(scalar, divisor, self.operation,
+                            lambda D: mumford.double(D, f, g, p),
+                            lambda D: mumford.negate(D, p))
+        if R is None:
+            return ([1], [])
+        return R
+
+    def frobenius_polynomial(self):
+        """
+        The characteristic polynomial of Frobenius on the Jacobian of H,
+        integer coefficients lowest degree first, for genus 1 and 2 over
+        p < 2**31. Point counts over F_p and F_{p**2} for small p, otherwise
+        the count over F_p and a baby-step giant-step search of the Weil
+        interval (see Util/jacobian_order.py).
+        """
+        f, p = self.f, self.p
+        if self.genus == 1:
+            return frobenius_polynomial(
+                count_hyperelliptic_points([f], p, 1)[0], p)
+        if self.genus == 2:
+            return genus2_frobenius(f, p)
+        raise NotImplementedError("Only Jacobians of genus 1 and 2 can be \
+            counted.")
 
     def order(self):
-        """ Returns the number of points on H """
+        """ Returns the number of points on the Jacobian of H, chi(1) """
+        return sum(self.frobenius_polynomial())
@@ -0,0 +1,60 @@
+"""
+Benchmarks for EllipticCurve.scalar_mult in affine, jacobian and
+projective coordinates on random curves over primes of 160 to 521 bits.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.plane_curve import random_elliptic_curve
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p160', 2**160 - 2**31 - 1),
+    ('p192', 2**192 - 2**64 - 1),
+    ('p256', 2**256 - 2**224 + 2**192 + 2**96 - 1),
+    ('p384', 2**384 - 2**128 - 2**96 + 2**32 - 1),
+    ('p521', 2**521 - 1),
+]
+_coordinates = ['affine', 'projective', 'jacobian']
+_number_of_scalars = 20
+
+
+def point_on_curve(a, b, p):
+    """ Finds a point on y**2 = x**3 + a*x + b for p = 3 mod 4 """
+    while True:
+        X = rn.randrange(1, p)
+        Z = (X ** 3 + a * X + b) % p
+        Y = pow(Z, (p + 1) // 4, p)
+        if Y * Y % p == Z:
+            return (X, Y)
+
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    a, b = random_elliptic_curve(prime)
+    f = sp.poly(y**2 - x**3 - a*x - b)
+    P = point_on_curve(a, b, prime)
+    scalars = [rn.randrange(1, prime) for i in xrange(_number_of_scalars)]
+
+    timings = {}
+    results = {}
+    for coordinates in _coordinates:
+        E = EllipticCurve(f, F, coordinates=coordinates)
+        start = time.time()
+        results[coordinates] = [E.scalar_mult(k, P) for k in scalars]
+        timings[coordinates] = (time.time() - start) / _number_of_scalars
+
+    assert results['jacobian'] == results['affine'] == results['projective']
+
+    print('%s: ' % name + ', '.join('%s %.2f ms (x%.1f)' % (c, 1000 * timings[c],
+        timings['affine'] / timings[c]) for c in _coordinates))
@@ -0,0 +1,61 @@
+"""
+Benchmarks for EllipticCurve.order() on random curves over primes of 31 to
+256 bits: Mestre's baby-step giant-step up to 60 bits, Schoof's algorithm
+over F_p[x] up to 100 bits, Schoof-Elkies-Atkin with the modular
+polynomial database beyond. Every count is checked by multiplying a
+random point by it.
+
+Run with avcrypto/groups on the PYTHONPATH. The polynomial arithmetic is
+several times faster with gmpy2 installed.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.coordinates import INFINITY
+from Util.plane_curve import random_elliptic_curve
+from Util import polynomial
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p31', 2**31 - 1),
+    ('p59', 2**59 - 225),
+    ('p61', 2**61 - 1),
+    ('p89', 2**89 - 1),
+    ('p107', 2**107 - 1),
+    ('p127', 2**127 - 1),
+    ('p192', 2**192 - 2**64 - 1),
+    ('p256', 2**256 - 2**224 + 2**192 + 2**96 - 1),
+]
+
+
+def point_on_curve(a, b, p):
+    """ Finds a point on y**2 = x**3 + a*x + b for p = 3 mod 4 """
+    while True:
+        X = rn.randrange(1, p)
+        Z = (X ** 3 + a * X + b) % p
+        Y = pow(Z, (p + 1) // 4, p)
+        if Y * Y % p == Z:
+            return (X, Y)
+
+
+print('gmpy2: %s' % (polynomial.gmpy2 is not None))
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    a, b = random_elliptic_curve(prime)
+    f = sp.poly(y**2 - x**3 - a*x - b)
+    E = EllipticCurve(f, F)
+
+    start = time.time()
+    N = E.order()
+    elapsed = time.time() - start
+
+    assert E.scalar_mult(N, point_on_curve(a, b, prime)) is INFINITY
+    print('%s: #E = %s in %.2f s' % (name, N, elapsed))
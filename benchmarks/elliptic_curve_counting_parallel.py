@@ -0,0 +1,42 @@
+"""
+Benchmarks how EllipticCurve.order() scales with the number of worker
+processes it spreads the small primes l over, for Schoof's algorithm on an
+89-bit prime and SEA on a 256-bit prime.
+
+Run with avcrypto/groups on the PYTHONPATH. Needs concurrent.futures (the
+futures backport on Python 2).
+
+"""
+
+from algebraic import EllipticCurve
+from Util.plane_curve import random_elliptic_curve
+
+import multiprocessing
+import time
+
+import sympy as sp
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p89', 2**89 - 1),
+    ('p256', 2**256 - 2**224 + 2**192 + 2**96 - 1),
+]
+_workers = [1]
+while _workers[-1] * 2 <= multiprocessing.cpu_count():
+    _workers.append(_workers[-1] * 2)
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    a, b = random_elliptic_curve(prime)
+    E = EllipticCurve(sp.poly(y**2 - x**3 - a*x - b), F)
+
+    orders = set()
+    for workers in _workers:
+        start = time.time()
+        orders.add(E.order(workers))
+        elapsed = time.time() - start
+        print('%s, %d workers: %.2f s' % (name, workers, elapsed))
+    assert len(orders) == 1
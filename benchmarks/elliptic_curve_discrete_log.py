@@ -0,0 +1,57 @@
+"""
+Benchmarks EllipticCurve.discrete_log (baby steps and giant steps at these
+sizes) on random points of prime order over primes of 24 to 40 bits, and
+discrete_log_interval (the kangaroo method) on logarithms known to lie in
+an interval of 2**32, or of the order of P if that is smaller.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.plane_curve import random_elliptic_curve
+from Util.number_theory import is_probable_prime
+
+import random as rn
+import time
+
+import sympy as sp
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p24', 16777213),
+    ('p32', 4294967291),
+    ('p40', 1099511627689),
+]
+_logs = 4
+_interval = 2**32
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    while True:
+        a, b = random_elliptic_curve(prime)
+        E = EllipticCurve(sp.poly(y**2 - x**3 - a*x - b), F)
+        N = E.order()
+        if is_probable_prime(N):
+            break
+    P = E.random_point()
+    width = min(_interval, N)
+
+    bsgs = kangaroo = 0.0
+    for i in xrange(_logs):
+        k = rn.randrange(N)
+        Q = E.scalar_mult(k, P)
+
+        start = time.time()
+        assert E.discrete_log(P, Q, N) == k
+        bsgs += time.time() - start
+
+        lo = k - rn.randrange(width)
+        start = time.time()
+        assert E.discrete_log_interval(P, Q, lo, lo + width) == k
+        kangaroo += time.time() - start
+    print('%s: bsgs %.2f s, kangaroo %.2f s per logarithm' %
+          (name, bsgs / _logs, kangaroo / _logs))
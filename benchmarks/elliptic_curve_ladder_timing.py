@@ -0,0 +1,76 @@
+"""
+Timing spread of EllipticCurve.scalar_mult for secret scalars. Scalars of
+the same bit length but very different Hamming weights are multiplied with
+the default wNAF and with the Montgomery ladder (secret=True); the ladder's
+per-call latency should not depend on the scalar.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.plane_curve import random_elliptic_curve
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_prime = 2**256 - 2**224 + 2**192 + 2**96 - 1
+_bits = 256
+_number_of_scalars = 50
+_repetitions = 7
+
+
+def point_on_curve(a, b, p):
+    """ Finds a point on y**2 = x**3 + a*x + b for p = 3 mod 4 """
+    while True:
+        X = rn.randrange(1, p)
+        Z = (X ** 3 + a * X + b) % p
+        Y = pow(Z, (p + 1) // 4, p)
+        if Y * Y % p == Z:
+            return (X, Y)
+
+
+def scalar_with_weight(bits, weight):
+    """ Random scalar of exactly bits bits with the given Hamming weight """
+    positions = rn.sample(xrange(bits - 1), weight - 1)
+    return (1 << (bits - 1)) + sum(1 << i for i in positions)
+
+
+def per_call(E, P, scalar, secret):
+    """ Best of _repetitions timings of one multiplication, in ms """
+    timings = []
+    for i in xrange(_repetitions):
+        start = time.time()
+        E.scalar_mult(scalar, P, secret=secret)
+        timings.append(time.time() - start)
+    return 1000 * min(timings)
+
+
+F = sp.FiniteField(_prime)
+a, b = random_elliptic_curve(_prime)
+E = EllipticCurve(sp.poly(y**2 - x**3 - a*x - b), F)
+P = point_on_curve(a, b, _prime)
+
+classes = [('low weight', 8), ('half weight', _bits // 2),
+           ('high weight', _bits - 8)]
+
+for secret in [False, True]:
+    medians = []
+    for name, weight in classes:
+        samples = [per_call(E, P, scalar_with_weight(_bits, weight), secret)
+                   for i in xrange(_number_of_scalars)]
+        samples.sort()
+        median = samples[len(samples) // 2]
+        spread = samples[-len(samples) // 10] - samples[len(samples) // 10]
+        medians.append(median)
+        print('%-7s %-12s median %.3f ms, 10-90%% spread %.3f ms' % (
+            'ladder' if secret else 'wnaf', name, median, spread))
+    print('%-7s spread of medians across classes %.1f%%' % (
+        'ladder' if secret else 'wnaf',
+        100 * (max(medians) - min(medians)) / min(medians)))
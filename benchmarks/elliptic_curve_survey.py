@@ -0,0 +1,45 @@
+"""
+Benchmarks counting many curves over one prime with the character sums of
+Util/point_counting.py, all curves in a single pass over F_p, for primes
+of 16 to 26 bits. The counts of the first curves are checked against
+Schoof's algorithm.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.plane_curve import random_elliptic_curve
+from Util.point_counting import count_points, np
+
+import time
+
+import sympy as sp
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p16', 65521),
+    ('p20', 1048573),
+    ('p24', 16777213),
+    ('p26', 67108859),
+]
+_curves = 16
+_checked = 2
+
+
+print('numpy: %s' % (np is not None))
+for name, prime in _primes:
+    curves = [random_elliptic_curve(prime) for i in xrange(_curves)]
+
+    start = time.time()
+    orders = count_points(curves, prime)
+    elapsed = time.time() - start
+
+    F = sp.FiniteField(prime)
+    for (a, b), N in zip(curves, orders)[:_checked]:
+        E = EllipticCurve(sp.poly(y**2 - x**3 - a*x - b), F)
+        assert E.schoof() == N
+    print('%s: %d curves in %.2f s' % (name, _curves, elapsed))
@@ -0,0 +1,72 @@
+"""
+Benchmarks ExtensionField arithmetic in F_{p**k}: multiplication,
+Itoh-Tsujii inversion and the batch methods on lists and NumPy arrays,
+then EllipticCurve.scalar_mult on curves over F_{p**2} in affine and
+Jacobian coordinates.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import EllipticCurve
+from Util.extension_field import ExtensionField
+
+import time
+
+import numpy as np
+import random as rn
+
+# Set benchmark variables
+_fields = [
+    ('p31^2', 2**31 - 1, 2),
+    ('p31^6', 2**31 - 1, 6),
+    ('p31^12', 2**31 - 1, 12),
+    ('p127^2', 2**127 - 1, 2),
+]
+_curve_fields = [
+    ('p64^2', 2**64 - 59, 2),
+    ('p127^2', 2**127 - 1, 2),
+]
+_number_of_elements = 1000
+_number_of_scalars = 10
+
+
+def timed(label, function, count):
+    start = time.time()
+    result = function()
+    elapsed = time.time() - start
+    print('%s: %.2f us' % (label, 1e6 * elapsed / count))
+    return result
+
+
+for name, p, k in _fields:
+    F = ExtensionField(p, k)
+    n = _number_of_elements
+    xs = [tuple(rn.randrange(p) for j in xrange(k)) for i in xrange(n)]
+    ys = [tuple(rn.randrange(p) for j in xrange(k)) for i in xrange(n)]
+    timed('%s mul' % name, lambda: [F.mul(x, y) for x, y in zip(xs, ys)], n)
+    timed('%s frobenius' % name, lambda: [F.frobenius(x) for x in xs], n)
+    inverses = timed('%s inv' % name, lambda: [F.inv(x) for x in xs], n)
+    assert timed('%s batch_inv' % name, lambda: F.batch_inv(xs), n) == \
+        inverses
+    if p < 2**31:
+        X, Y = np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)
+        timed('%s batch_mul (numpy)' % name, lambda: F.batch_mul(X, Y), n)
+        timed('%s batch_inv (numpy)' % name, lambda: F.batch_inv(X), n)
+
+for name, p, k in _curve_fields:
+    F = ExtensionField(p, k)
+    a, b = rn.randrange(p), [rn.randrange(p) for i in xrange(k)]
+    curves = [EllipticCurve((a, b), F, c) for c in ['affine', 'jacobian']]
+    P = curves[0].random_point()
+    scalars = [rn.randrange(p ** k) for i in xrange(_number_of_scalars)]
+
+    expected = None
+    for E in curves:
+        start = time.time()
+        results = [E.scalar_mult(s, P) for s in scalars]
+        elapsed = time.time() - start
+        assert expected is None or results == expected
+        expected = results
+        print('%s %s: %.2f ms' % (name, E.coordinates,
+                                   1000 * elapsed / _number_of_scalars))
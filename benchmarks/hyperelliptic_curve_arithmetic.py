@@ -0,0 +1,62 @@
+"""
+Benchmarks HyperEllipticCurve.scalar_mult on random genus 2 curves over
+primes of 64 to 256 bits: the explicit formulas in affine and projective
+coordinates against Cantor's algorithm on Mumford pairs.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import HyperEllipticCurve
+from Util.scalar_multiplication import scalar_multiply
+from Util import mumford
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p64', 2**64 - 59),
+    ('p128', 2**128 - 159),
+    ('p256', 2**256 - 2**224 + 2**192 + 2**96 - 1),
+]
+_coordinates = ['affine', 'projective']
+_number_of_scalars = 10
+
+
+def cantor_scalar_mult(H, scalar, D):
+    def add(A, B):
+        return mumford.cantor_add(A, B, H.f, H.genus, H.p)
+    return scalar_multiply(scalar, D, add, lambda A: add(A, A),
+                           lambda A: mumford.negate(A, H.p))
+
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    while True:
+        f = x**5 + sum(rn.randrange(prime) * x**i for i in xrange(5))
+        try:
+            curves = [HyperEllipticCurve(sp.poly(y**2 - f), F, c)
+                      for c in _coordinates]
+            break
+        except Exception:
+            continue
+    D = curves[0].random_divisor()
+    scalars = [rn.randrange(prime ** 2) for i in xrange(_number_of_scalars)]
+
+    expected = None
+    for label, multiply in [(c, H.scalar_mult) for c, H in
+                            zip(_coordinates, curves)] + \
+            [('cantor', lambda k, D: cantor_scalar_mult(curves[0], k, D))]:
+        start = time.time()
+        results = [multiply(k, D) for k in scalars]
+        elapsed = time.time() - start
+        assert expected is None or results == expected
+        expected = results
+        print('%s %s: %.2f ms' % (name, label,
+                                   1000 * elapsed / _number_of_scalars))
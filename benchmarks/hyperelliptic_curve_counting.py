@@ -0,0 +1,64 @@
+"""
+Benchmarks the Jacobian orders of random genus 2 curves: a family of
+curves over a small prime counted over F_p and F_{p**2} in one pass
+(count_hyperelliptic_points) against one curve at a time, and
+HyperEllipticCurve.order, the F_p count and a baby-step giant-step search
+of the Weil interval, over primes of 16 to 24 bits.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import HyperEllipticCurve
+from Util.point_counting import count_hyperelliptic_points
+from Util.jacobian_order import frobenius_polynomial
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_family_prime = 1009
+_family_size = 32
+_primes = [
+    ('p16', 65521),
+    ('p20', 1048573),
+    ('p24', 16777213),
+]
+_number_of_curves = 4
+
+p = _family_prime
+family = [[rn.randrange(p) for i in xrange(5)] + [1]
+          for j in xrange(_family_size)]
+start = time.time()
+counts = count_hyperelliptic_points(family, p)
+bulk = time.time() - start
+start = time.time()
+assert counts == [count_hyperelliptic_points([f], p)[0] for f in family]
+single = time.time() - start
+orders = [sum(frobenius_polynomial(c, p)) for c in counts]
+print('p%d family of %d: bulk %.2f ms, single %.2f ms per curve, '
+      '#J from %d to %d' % (p, _family_size, 1000 * bulk / _family_size,
+                            1000 * single / _family_size, min(orders),
+                            max(orders)))
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    elapsed = 0.0
+    for j in xrange(_number_of_curves):
+        while True:
+            f = x**5 + sum(rn.randrange(prime) * x**i for i in xrange(5))
+            try:
+                H = HyperEllipticCurve(sp.poly(y**2 - f), F)
+                break
+            except Exception:
+                continue
+        start = time.time()
+        N = H.order()
+        elapsed += time.time() - start
+        assert H.scalar_mult(N, H.random_divisor()) == ([1], [])
+    print('%s: %.2f s per curve' % (name, elapsed / _number_of_curves))
@@ -0,0 +1,83 @@
+"""
+Benchmarks the Jacobians of random curves of genus 2 to 4 over primes of
+64 to 256 bits: HyperEllipticCurve.scalar_mult (NUCOMP and NUDUPL above
+genus 2) against Cantor's algorithm on the same Mumford pairs, and
+HyperEllipticCurve.batch_add against one add per sum.
+
+Run with avcrypto/groups on the PYTHONPATH.
+
+"""
+
+from algebraic import HyperEllipticCurve
+from Util.scalar_multiplication import scalar_multiply
+from Util import mumford
+
+import time
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set benchmark variables
+_primes = [
+    ('p64', 2**64 - 59),
+    ('p128', 2**128 - 159),
+    ('p256', 2**256 - 2**224 + 2**192 + 2**96 - 1),
+]
+_genera = [2, 3, 4]
+_number_of_scalars = 5
+_batch = 256
+
+
+def cantor_scalar_mult(H, scalar, D):
+    def add(A, B):
+        return mumford.cantor_add(A, B, H.f, H.genus, H.p)
+    return scalar_multiply(scalar, D, add, lambda A: add(A, A),
+                           lambda A: mumford.negate(A, H.p))
+
+
+def nucomp_scalar_mult(H, scalar, D):
+    return scalar_multiply(scalar, D, H.add,
+                           lambda A: mumford.double(A, H.f, H.genus, H.p),
+                           lambda A: mumford.negate(A, H.p))
+
+
+for name, prime in _primes:
+    F = sp.FiniteField(prime)
+    for genus in _genera:
+        while True:
+            f = x**(2 * genus + 1) + sum(rn.randrange(prime) * x**i
+                                         for i in xrange(2 * genus + 1))
+            try:
+                H = HyperEllipticCurve(sp.poly(y**2 - f), F)
+                break
+            except Exception:
+                continue
+        D = H.random_divisor()
+        scalars = [rn.randrange(prime ** genus)
+                   for i in xrange(_number_of_scalars)]
+
+        timings = []
+        expected = None
+        for multiply in [nucomp_scalar_mult, cantor_scalar_mult]:
+            start = time.time()
+            results = [multiply(H, k, D) for k in scalars]
+            timings.append(1000 * (time.time() - start) / _number_of_scalars)
+            assert expected is None or results == expected
+            expected = results
+
+        left = [H.random_divisor() for i in xrange(_batch)]
+        right = [H.random_divisor() for i in xrange(_batch)]
+        start = time.time()
+        sums = H.batch_add(left, right)
+        batch = time.time() - start
+        start = time.time()
+        assert sums == [H.add(A, B) for A, B in zip(left, right)]
+        single = time.time() - start
+
+        print('%s genus %d: nucomp %.2f ms, cantor %.2f ms per scalar_mult, '
+              'batch_add %.1f us, add %.1f us per sum' %
+              (name, genus, timings[0], timings[1], 1e6 * batch / _batch,
+               1e6 * single / _batch))
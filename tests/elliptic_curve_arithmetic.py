@@ -2,11 +2,12 @@
 Tests for the arithmetic methods in the EllipticCurve class. Methods are 
 tested over a range of finite fields on random elliptic curves. 
 
-methods tested are; add(), scalar_multiplication(), random_point()
+methods tested are; add(), scalar_multiplication(), random_point(),
+FixedBasePoint.scalar_mult()
 
 """
 
-from algebraic_groups import EllipticCurve
+from algebraic_groups import EllipticCurve, FixedBasePoint
 from slog import Slog
 from progressbar import ProgressBar 	
 from nt_utils import primes_less_than, random_elliptic_curve
@@ -81,6 +82,14 @@ for prime in primes_less_than(_upper_bound_on_primes):
 			fail_count+=1
 			continue
 
+		try:
+			assert FixedBasePoint(E,R)*n == W
+		except Exception, e:
+			log.fail('FIXED_BASE: Comb multiplication of %s by %s disagrees on \
+			y**2 - x**3 - %sx + %s over F_%s. %s' % (R,n,a,b,prime,'EXCEPTION: ' + str(e)))
+			fail_count+=1
+			continue
+
 	test_completion_results.append((num_curves-fail_count)/num_curves)
 	log.ok('All methods succeeded on %s/%s random curves over F_%s' % (num_curves- fail_count,_number_of_random_elliptic_curves,prime)) 
 		
@@ -0,0 +1,143 @@
+"""
+Unit tests for discrete logarithms on elliptic curves: Pollard's rho and
+kangaroo methods, baby-step giant-step and Pohlig-Hellman on small random
+curves, checked by multiplying back.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from algebraic import EllipticCurve
+from Util.coordinates import INFINITY
+from Util.discrete_log import rho_log, bsgs_log
+from Util.number_theory import lenstra, is_probable_prime
+
+import unittest
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+
+def curve_with_prime_subgroup(bits, cofactor=False):
+    """
+    A random E and a point of prime order q >= 2**bits, with q < #E if
+    cofactor
+    """
+    p = 2**(bits + 2) + 1
+    while not is_probable_prime(p):
+        p += 2
+    while True:
+        a, b = rn.randrange(1, p), rn.randrange(1, p)
+        if (4 * a**3 + 27 * b**2) % p == 0:
+            continue
+        E = EllipticCurve(y**2 - x**3 - a*x - b, sp.FiniteField(p))
+        N = E.order()
+        q = max(lenstra(N))
+        if q >> bits and (q < N or not cofactor):
+            P = E.scalar_mult(N // q, E.random_point())
+            if P is not INFINITY:
+                return E, N, P, q
+
+
+def point_outside(E, q):
+    """ A random point of E whose order does not divide q """
+    while True:
+        R = E.random_point()
+        if E.scalar_mult(q, R) is not INFINITY:
+            return R
+
+
+class PollardTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_rho(self):
+        for bits in [8, 16, 24]:
+            E, N, P, q = curve_with_prime_subgroup(bits)
+            for i in xrange(5):
+                k = rn.randrange(q)
+                Q = E.scalar_mult(k, P)
+                if Q is INFINITY:
+                    continue
+                self.assertEqual(rho_log(E.a, E.p, P, Q, q), k)
+
+    def test_rho_without_solution(self):
+        E, N, P, q = curve_with_prime_subgroup(20, cofactor=True)
+        self.assertRaises(ArithmeticError, rho_log, E.a, E.p, P,
+                          point_outside(E, q), q)
+
+    def test_kangaroo(self):
+        p = 2**40 - 87
+        E = EllipticCurve(y**2 - x**3 - 3*x - 5, sp.FiniteField(p))
+        P = E.random_point()
+        for lo, width in [(0, 1000), (12345, 2**20), (2**30, 2**24)]:
+            k = rn.randrange(lo, lo + width)
+            Q = E.scalar_mult(k, P)
+            self.assertEqual(E.discrete_log_interval(P, Q, lo, lo + width),
+                             k)
+
+    def test_kangaroo_without_solution(self):
+        p = 2**40 - 87
+        E = EllipticCurve(y**2 - x**3 - 3*x - 5, sp.FiniteField(p))
+        P = E.random_point()
+        Q = E.scalar_mult(2**35, P)
+        self.assertRaises(ArithmeticError, E.discrete_log_interval, P, Q,
+                          0, 2**16)
+        self.assertRaises(ArithmeticError, E.discrete_log_interval, P,
+                          INFINITY, 1, 100)
+
+
+class PohligHellmanTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_bsgs(self):
+        E, N, P, q = curve_with_prime_subgroup(20)
+        for babies in [1, 7, 1 << 18]:
+            for k in [0, 1, 2, q - 1, rn.randrange(q)]:
+                Q = E.scalar_mult(k, P)
+                if Q is INFINITY:
+                    continue
+                self.assertEqual(bsgs_log(E.a, E.p, P, Q, q, babies), k)
+
+    def test_discrete_log(self):
+        for p in [10007, 1000003, 2**40 - 87]:
+            E = EllipticCurve(y**2 - x**3 - 3*x - 5, sp.FiniteField(p))
+            N = E.order()
+            for P in E.random_points(3):
+                n = E.point_order(P, N)
+                self.assertIs(E.scalar_mult(n, P), INFINITY)
+                for k in [0, 1, n - 1, rn.randrange(n), rn.randrange(n)]:
+                    Q = E.scalar_mult(k, P)
+                    self.assertEqual(E.discrete_log(P, Q, n), k)
+                self.assertEqual(E.discrete_log(P, INFINITY), 0)
+
+    def test_discrete_log_without_solution(self):
+        p = 1000003
+        E = EllipticCurve(y**2 - x**3 - 3*x - 5, sp.FiniteField(p))
+        N = E.order()
+        while True:
+            P, Q = E.random_points(2)
+            n = E.point_order(P, N)
+            if E.scalar_mult(n, Q) is not INFINITY:
+                break
+        self.assertRaises(ArithmeticError, E.discrete_log, P, Q, n)
+        self.assertRaises(ArithmeticError, E.discrete_log, INFINITY, Q)
+
+    def test_discrete_log_without_solution_past_bsgs(self):
+        # Subgroups of order above 2**38 go to rho
+        E, N, P, q = curve_with_prime_subgroup(38, cofactor=True)
+        self.assertGreater(q, 2**38)
+        self.assertRaises(ArithmeticError, E.discrete_log, P,
+                          point_outside(E, q), q)
+
+
+if __name__ == '__main__':
+    unittest.main()
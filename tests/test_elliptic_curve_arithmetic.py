@@ -0,0 +1,93 @@
+"""
+Unit tests for the arithmetic of EllipticCurve and FixedBasePoint, checked
+against plain affine additions on small random curves.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from algebraic import EllipticCurve, FixedBasePoint
+from Util.coordinates import INFINITY
+
+import unittest
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set test variables
+_primes = [10007, 65537, 2**61 - 1]
+_coordinates = ['affine', 'jacobian', 'projective']
+_number_of_scalars = 20
+
+
+def random_curve(p, coordinates='jacobian'):
+    """ A random non-singular E: y**2 = x**3 + a*x + b with a, b != 0 """
+    while True:
+        a, b = rn.randrange(1, p), rn.randrange(1, p)
+        if (4 * a**3 + 27 * b**2) % p:
+            return EllipticCurve(y**2 - x**3 - a*x - b, sp.FiniteField(p),
+                                 coordinates)
+
+
+def naive_mult(E, k, P):
+    """ k*P by repeated affine addition, k small """
+    R = INFINITY
+    for i in xrange(k):
+        R = E.add(R, P)
+    return R
+
+
+class EllipticCurveArithmeticTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_scalar_mult_matches_repeated_addition(self):
+        for p in _primes:
+            for c in _coordinates:
+                E = random_curve(p, c)
+                P = E.random_point()
+                for k in xrange(-3, 40):
+                    expected = naive_mult(E, abs(k), P)
+                    if k < 0 and expected is not INFINITY:
+                        expected = (expected[0], -expected[1] % p)
+                    self.assertEqual(E.scalar_mult(k, P), expected)
+
+    def test_coordinate_systems_agree(self):
+        for p in _primes:
+            E = random_curve(p)
+            curves = [EllipticCurve(E.equations[0], E.field, c)
+                      for c in _coordinates]
+            P = E.random_point()
+            for i in xrange(_number_of_scalars):
+                k = rn.randrange(p * p)
+                results = [C.scalar_mult(k, P) for C in curves]
+                self.assertEqual(len(set(results)), 1)
+                self.assertTrue(E.is_point(results[0]))
+
+    def test_fixed_base_point(self):
+        for p in _primes:
+            for c in ['jacobian', 'projective']:
+                E = random_curve(p, c)
+                P = E.random_point()
+                for size in [1, 15, 255]:
+                    G = FixedBasePoint(E, P, max_table_size=size)
+                    for i in xrange(_number_of_scalars):
+                        k = rn.randrange(-p, 4 * p)
+                        self.assertEqual(G * k, E.scalar_mult(k, P))
+
+    def test_fixed_base_point_round_trip(self):
+        E = random_curve(_primes[0])
+        G = FixedBasePoint(E, E.random_point())
+        H = FixedBasePoint.loads(E, G.dumps())
+        for k in [0, 1, 2, 12345, _primes[0] ** 2]:
+            self.assertEqual(G * k, H * k)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for EllipticCurve.order() and the point counting algorithms
+behind it: small curves against brute force, the algorithms against each
+other, and the published orders of standard curves.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from algebraic import EllipticCurve
+from Util.coordinates import INFINITY
+from Util.number_theory import jacobi
+
+import unittest
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# (p, a, b, #E) of secp112r1 and NIST P-192
+_known_curves = [
+    (0xdb7c2abf62e35e668076bead208b,
+     0xdb7c2abf62e35e668076bead2088,
+     0x659ef8ba043916eede8911702b22,
+     0xdb7c2abf62e35e7628dfac6561c5),
+    (2**192 - 2**64 - 1, -3,
+     0x64210519e59c80e70fa7e9ab72243049feb8deecc146b9b1,
+     0xffffffffffffffffffffffff99def836146bc9b1b4d22831),
+]
+
+
+def random_curve(p):
+    """ A random non-singular E: y**2 = x**3 + a*x + b with a, b != 0 """
+    while True:
+        a, b = rn.randrange(1, p), rn.randrange(1, p)
+        if (4 * a**3 + 27 * b**2) % p:
+            return EllipticCurve(y**2 - x**3 - a*x - b, sp.FiniteField(p))
+
+
+def brute_force_order(E):
+    """ p + 1 + the sum of the Legendre symbols of x**3 + a*x + b """
+    p = E.p
+    return p + 1 + sum(jacobi(x**3 + E.a * x + E.b, p) for x in xrange(p))
+
+
+class EllipticCurveCountingTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_small_curves_against_brute_force(self):
+        for p in [5, 7, 101, 233, 1009, 7919]:
+            for i in xrange(5):
+                E = random_curve(p)
+                N = brute_force_order(E)
+                self.assertEqual(E.lenstra(), N)
+                self.assertEqual(E.schoof(), N)
+                if p > 229:
+                    self.assertEqual(E.mestre(), N)
+
+    def test_algorithms_agree(self):
+        for p in [1000003, 2**31 - 1, 2**61 - 1]:
+            for i in xrange(2):
+                E = random_curve(p)
+                N = E.mestre()
+                self.assertEqual(E.schoof(), N)
+                self.assertEqual(E.sea(), N)
+                P = E.random_point()
+                self.assertIs(E.scalar_mult(N, P), INFINITY)
+
+    def test_order_dispatch(self):
+        for p in [65537, 2**40 - 87, 2**89 - 1]:
+            E = random_curve(p)
+            N = E.order()
+            self.assertLessEqual((p + 1 - N) ** 2, 4 * p)
+            for P in E.random_points(3):
+                self.assertIs(E.scalar_mult(N, P), INFINITY)
+
+    def test_known_orders(self):
+        for p, a, b, N in _known_curves:
+            E = EllipticCurve(y**2 - x**3 - a*x - b, sp.FiniteField(p))
+            self.assertEqual(E.sea(), N)
+
+
+if __name__ == '__main__':
+    unittest.main()
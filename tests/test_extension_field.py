@@ -0,0 +1,262 @@
+"""
+Unit tests for F_{p**k} arithmetic (Util/extension_field.py) against
+schoolbook polynomial arithmetic, and for elliptic curves over F_{p**k}:
+group operations, orders against brute force on small fields, and the
+NotImplementedError of the methods that need a prime field.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from algebraic import EllipticCurve, FixedBasePoint
+from Util.coordinates import INFINITY
+from Util.extension_field import ExtensionField, np
+
+import itertools
+import unittest
+import random as rn
+
+# (p, k); F_{3**3} and F_{5**4} have no irreducible binomial t**k - c, so
+# they take a trinomial modulus
+_fields = [(3, 2), (3, 3), (5, 4), (7, 3), (13, 2), (101, 2), (10007, 5),
+           (2**31 - 1, 2), (2**61 - 1, 3)]
+
+# Small enough to list every element
+_small_fields = [(3, 2), (3, 3), (5, 2), (5, 3), (7, 3), (13, 2), (101, 2)]
+
+_number_of_elements = 20
+
+
+def naive_mul(F, a, b):
+    """ a*b by schoolbook multiplication and long division by m """
+    p, k, m = F.p, F.k, F.modulus
+    h = [0] * (2 * k - 1)
+    for i in xrange(k):
+        for j in xrange(k):
+            h[i + j] += a[i] * b[j]
+    for j in xrange(2 * k - 2, k - 1, -1):
+        c = h[j] % p
+        for i in xrange(k + 1):
+            h[j - k + i] -= c * m[i]
+    return tuple(c % p for c in h[:k])
+
+
+def naive_pow(F, a, e):
+    r = F.one
+    for i in xrange(e):
+        r = naive_mul(F, r, a)
+    return r
+
+
+def random_element(F):
+    return tuple(rn.randrange(F.p) for i in xrange(F.k))
+
+
+def elements(F):
+    """ Every element of F """
+    return itertools.product(xrange(F.p), repeat=F.k)
+
+
+def brute_force_order(E):
+    """ 1 + the number of (x, y) over every x in F_{p**k} """
+    F = E.F
+    return 1 + sum(1 + F.legendre(F.add(F.mul(F.add(F.sqr(x), E.a), x),
+                                        E.b))
+                   for x in elements(F))
+
+
+def random_curve(F, coordinates='jacobian', base_field=True):
+    """ A random non-singular E over F, with a, b in F_p if base_field """
+    while True:
+        if base_field:
+            a, b = F.coerce(rn.randrange(F.p)), F.coerce(rn.randrange(F.p))
+        else:
+            a, b = random_element(F), random_element(F)
+        if any(F.add(F.scale(F.mul(a, F.sqr(a)), 4), F.scale(F.sqr(b), 27))):
+            return EllipticCurve((a, b), F, coordinates)
+
+
+class ExtensionFieldTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def fields(self):
+        for p, k in _fields:
+            yield ExtensionField(p, k)
+
+    def test_mul_matches_schoolbook(self):
+        for F in self.fields():
+            for i in xrange(_number_of_elements):
+                a, b = random_element(F), random_element(F)
+                self.assertEqual(F.mul(a, b), naive_mul(F, a, b))
+                self.assertEqual(F.sqr(a), naive_mul(F, a, a))
+                self.assertEqual(F.pow(a, 5), naive_pow(F, a, 5))
+                self.assertEqual(F.sub(F.add(a, b), b), a)
+                self.assertEqual(F.add(a, F.neg(a)), F.zero)
+
+    def test_every_element_is_invertible(self):
+        # Only true if the modulus is irreducible
+        for p, k in _small_fields:
+            F = ExtensionField(p, k)
+            for a in elements(F):
+                if any(a):
+                    self.assertEqual(naive_mul(F, a, F.inv(a)), F.one)
+                    self.assertEqual(F.pow(a, F.order() - 1), F.one)
+
+    def test_frobenius_matches_pow(self):
+        for F in self.fields():
+            a = random_element(F)
+            for i in xrange(F.k + 1):
+                self.assertEqual(F.frobenius(a, i), F.pow(a, F.p ** i))
+
+    def test_inverse(self):
+        for F in self.fields():
+            values = [random_element(F) for i in xrange(_number_of_elements)]
+            values = [a for a in values if any(a)]
+            for a in values:
+                self.assertEqual(F.mul(a, F.inv(a)), F.one)
+                self.assertEqual(F.norm(a), F.pow(a, (F.order() - 1) //
+                                                  (F.p - 1))[0])
+            self.assertEqual(F.batch_inv(values), [F.inv(a) for a in values])
+            self.assertEqual(F.batch_inv([]), [])
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_batches(self):
+        for F in self.fields():
+            if F.p >= 2**31:
+                continue
+            left = [random_element(F) for i in xrange(_number_of_elements)]
+            right = [random_element(F) for i in xrange(_number_of_elements)]
+            left[0] = right[1] = F.one
+            products = F.batch_mul(np.array(left), np.array(right))
+            self.assertEqual([tuple(c) for c in products],
+                             [F.mul(a, b) for a, b in zip(left, right)])
+            images = F.batch_frobenius(np.array(left), 1)
+            self.assertEqual([tuple(c) for c in images],
+                             [F.frobenius(a) for a in left])
+            values = [a for a in left if any(a)]
+            inverses = F.batch_inv(np.array(values))
+            self.assertEqual([tuple(c) for c in inverses],
+                             [F.inv(a) for a in values])
+
+    def test_sqrt(self):
+        # q = 3 mod 4 for 7**3, 10007**5 and 3**3, Tonelli-Shanks for the
+        # others
+        for F in self.fields():
+            for i in xrange(_number_of_elements):
+                a = random_element(F)
+                s = F.sqr(a)
+                self.assertEqual(F.sqr(F.sqrt(s)), s)
+                root = F.sqrt(a)
+                if root is None:
+                    self.assertEqual(F.legendre(a), -1)
+                else:
+                    self.assertEqual(F.sqr(root), a)
+            self.assertEqual(F.sqrt(F.zero), F.zero)
+            self.assertEqual(F.sqrt(F.nonresidue()), None)
+
+    def test_legendre_on_small_fields(self):
+        for p, k in _small_fields:
+            F = ExtensionField(p, k)
+            squares = set(F.sqr(a) for a in elements(F))
+            for a in elements(F):
+                if any(a):
+                    self.assertEqual(F.legendre(a) == 1, a in squares)
+            self.assertEqual(len(squares), (F.order() + 1) // 2)
+
+
+class ExtensionCurveTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_order_against_brute_force(self):
+        # y**2 = x**3 + a*x + b needs characteristic > 3
+        for p, k in [(p, k) for p, k in _small_fields if p > 3]:
+            F = ExtensionField(p, k)
+            for a, b in [(1, 1), (0, 2), (3, 0)]:
+                if (4 * a**3 + 27 * b**2) % p == 0:
+                    continue
+                E = EllipticCurve((a, b), F)
+                self.assertEqual(E.order(), brute_force_order(E))
+            E = random_curve(F)
+            self.assertEqual(E.order(), brute_force_order(E))
+
+    def test_order_annihilates_points(self):
+        # Character sums, Mestre's algorithm, SEA and, for j(E) = 0 and
+        # 1728, Schoof's algorithm for the trace over F_p
+        for p, k in [(10007, 3), (1000003, 2), (2**61 - 1, 2)]:
+            F = ExtensionField(p, k)
+            for E in [random_curve(F), EllipticCurve((0, 5), F),
+                      EllipticCurve((3, 0), F)]:
+                N = E.order()
+                self.assertLessEqual((p ** k + 1 - N) ** 2, 4 * p ** k)
+                for P in E.random_points(2):
+                    self.assertTrue(E.is_point(P))
+                    self.assertIs(E.scalar_mult(N, P), INFINITY)
+                    n = E.point_order(P, N)
+                    self.assertEqual(N % n, 0)
+                    self.assertIs(E.scalar_mult(n, P), INFINITY)
+
+    def test_order_needs_a_curve_over_the_base_field(self):
+        F = ExtensionField(101, 2)
+        E = EllipticCurve(((1, 1), 3), F)
+        self.assertRaises(NotImplementedError, E.order)
+
+    def test_scalar_mult_matches_repeated_addition(self):
+        for p, k in [(13, 2), (101, 3), (2**61 - 1, 2)]:
+            F = ExtensionField(p, k)
+            for c in ['affine', 'jacobian']:
+                E = random_curve(F, c, base_field=False)
+                P = E.random_point()
+                R = INFINITY
+                for n in xrange(40):
+                    self.assertEqual(E.scalar_mult(n, P), R)
+                    R = E.add(R, P)
+                self.assertEqual(E.scalar_mult(-5, P),
+                                 E.scalar_mult(5, (P[0], F.neg(P[1]))))
+
+    def test_coordinate_systems_agree(self):
+        F = ExtensionField(2**31 - 1, 3)
+        a, b = random_element(F), random_element(F)
+        affine = EllipticCurve((a, b), F, 'affine')
+        jacobian = EllipticCurve((a, b), F)
+        P = affine.random_point()
+        for i in xrange(_number_of_elements):
+            k = rn.randrange(F.order())
+            R = affine.scalar_mult(k, P)
+            self.assertEqual(R, jacobian.scalar_mult(k, P))
+            self.assertTrue(affine.is_point(R))
+
+    def test_batch_add(self):
+        F = ExtensionField(10007, 4)
+        E = random_curve(F, base_field=False)
+        left = E.random_points(8) + [INFINITY]
+        right = E.random_points(3) + left[3:6] + \
+            [(P[0], F.neg(P[1])) for P in left[6:8]] + [INFINITY]
+        self.assertEqual(E.batch_add(left, right),
+                         [E.add(P, Q) for P, Q in zip(left, right)])
+
+    def test_prime_field_only_methods(self):
+        F = ExtensionField(10007, 2)
+        E = random_curve(F)
+        P, Q = E.random_points(2)
+        for call in [lambda: E.multi_scalar_mult([2, 3], [P, Q]),
+                     lambda: E.hash_to_curve('message'),
+                     lambda: E.encode_to_curve('message'),
+                     E.lenstra, E.mestre, E.schoof, E.sea,
+                     lambda: E.dpoly(3),
+                     lambda: E.symbolic_add(P, Q),
+                     lambda: E.symbolic_scalar(3, P),
+                     lambda: E.discrete_log(P, Q),
+                     lambda: E.discrete_log_interval(P, Q, 0, 100),
+                     lambda: E.scalar_mult(3, P, secret=True),
+                     lambda: FixedBasePoint(E, P)]:
+            self.assertRaises(NotImplementedError, call)
+
+
+if __name__ == '__main__':
+    unittest.main()
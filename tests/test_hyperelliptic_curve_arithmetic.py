@@ -0,0 +1,122 @@
+"""
+Unit tests for divisor arithmetic on Jacobians of hyperelliptic curves:
+NUCOMP and NUDUPL (Util/mumford.py) against Cantor's algorithm, in genus
+1 to 4 on small random curves.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from algebraic import HyperEllipticCurve
+from Util import mumford, polynomial
+from Util.scalar_multiplication import scalar_multiply
+
+import unittest
+
+import sympy as sp
+import random as rn
+
+# Create sympy variables
+x, y = sp.symbols('x, y')
+
+# Set test variables
+_primes = [11, 10007, 2**61 - 1]
+_genera = [1, 2, 3, 4]
+_number_of_divisors = 20
+
+IDENTITY = ([1], [])
+
+
+def random_curve(p, g, coordinates='projective'):
+    """ A random H: y**2 = f(x) of genus g with f monic of degree 2g + 1 """
+    while True:
+        f = x**(2 * g + 1) + sum(rn.randrange(p) * x**i
+                                 for i in xrange(2 * g + 1))
+        try:
+            return HyperEllipticCurve(sp.poly(y**2 - f), sp.FiniteField(p),
+                                      coordinates)
+        except Exception:
+            continue
+
+
+def is_reduced(H, D):
+    """ (u, v) is reduced: u monic, deg v < deg u <= g and u | f - v**2 """
+    u, v = D
+    p = H.p
+    w = polynomial.sub(H.f, polynomial.sqr(v, p), p)
+    return u[-1] == 1 and len(v) < len(u) <= H.genus + 1 and \
+        not polynomial.rem(w, u, p)
+
+
+def cantor_mult(H, k, D):
+    add = lambda A, B: mumford.cantor_add(A, B, H.f, H.genus, H.p)
+    R = scalar_multiply(k, D, add, lambda A: add(A, A),
+                        lambda A: mumford.negate(A, H.p))
+    return R or IDENTITY
+
+
+class NucompTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def curves(self):
+        for p in _primes:
+            for g in _genera:
+                yield random_curve(p, g)
+
+    def test_add_matches_cantor(self):
+        for H in self.curves():
+            f, g, p = H.f, H.genus, H.p
+            divisors = [H.random_divisor()
+                        for i in xrange(_number_of_divisors)]
+            divisors.append(IDENTITY)
+            for D1 in divisors:
+                D2 = rn.choice(divisors)
+                S = mumford.add(D1, D2, f, g, p)
+                self.assertEqual(S, mumford.cantor_add(D1, D2, f, g, p))
+                self.assertTrue(is_reduced(H, S))
+                self.assertEqual(mumford.double(D1, f, g, p),
+                                 mumford.cantor_add(D1, D1, f, g, p))
+
+    def test_shared_points(self):
+        # Divisors whose u share a factor take the gcd branches
+        for H in self.curves():
+            f, g, p = H.f, H.genus, H.p
+            P, Q = H.divisor(H.random_point()), H.divisor(H.random_point())
+            minus_P = mumford.negate(P, p)
+            for D1, D2 in [(P, P), (P, minus_P),
+                           (mumford.add(P, Q, f, g, p), P),
+                           (mumford.add(P, Q, f, g, p), minus_P),
+                           (mumford.add(P, P, f, g, p), P)]:
+                self.assertEqual(mumford.add(D1, D2, f, g, p),
+                                 mumford.cantor_add(D1, D2, f, g, p))
+            self.assertEqual(mumford.add(P, minus_P, f, g, p), IDENTITY)
+
+    def test_group_laws(self):
+        for H in self.curves():
+            f, g, p = H.f, H.genus, H.p
+            A, B, C = [H.random_divisor() for i in xrange(3)]
+            add = lambda D1, D2: mumford.add(D1, D2, f, g, p)
+            self.assertEqual(add(add(A, B), C), add(A, add(B, C)))
+            self.assertEqual(add(A, B), add(B, A))
+            self.assertEqual(add(A, mumford.negate(A, p)), IDENTITY)
+
+    def test_batch_add(self):
+        for H in self.curves():
+            left = [H.random_divisor() for i in xrange(8)] + [IDENTITY]
+            right = [H.random_divisor() for i in xrange(4)] + left[4:]
+            self.assertEqual(H.batch_add(left, right),
+                             [H.add(A, B) for A, B in zip(left, right)])
+
+    def test_scalar_mult_matches_cantor(self):
+        for H in self.curves():
+            D = H.random_divisor()
+            for k in [0, 1, 2, 3, 17, rn.randrange(H.p ** H.genus)]:
+                self.assertEqual(H.scalar_mult(k, D), cantor_mult(H, k, D))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Unit tests for the number theory helpers in Util/: primality testing on
+the composites that fool weaker tests, the segmented sieve, ECM
+factoring and Chinese remaindering.
+
+Run with avcrypto/groups on the PYTHONPATH:
+
+    python -m unittest discover tests
+
+"""
+
+from Util.number_theory import is_probable_prime, primes_less_than, \
+    _strong_lucas_probable_prime
+from Util.sieve import primes, sieve_segment, _segments
+from Util.ecm import factor, ecm, ecm_curve, pollard_rho
+from Util.crt import crt, Congruences
+
+import unittest
+import random as rn
+
+# Carmichael numbers, Fermat pseudoprimes to every coprime base
+_carmichael = [561, 1105, 1729, 2465, 2821, 6601, 8911, 41041, 825265,
+               321197185, 5394826801, 232250619601, 9746347772161]
+
+# Strong pseudoprimes to base 2, and 3825123056546413051, which is one to
+# every prime base up to 23
+_strong_pseudoprimes = [2047, 3277, 4033, 4681, 8321, 15841, 29341,
+                        42799, 49141, 52633, 65281, 74665, 80581,
+                        3215031751, 3825123056546413051]
+
+# Strong Lucas pseudoprimes with Selfridge's parameters
+_lucas_pseudoprimes = [5459, 5777, 10877, 16109, 18971, 22499, 24569,
+                       25199, 40309, 58519, 75077, 97439]
+
+# (6k + 1)(12k + 1)(18k + 1) with three prime factors, past the bound of
+# the deterministic bases and strong pseudoprimes to base 2, so only the
+# Lucas half of Baillie-PSW rejects them
+_large_pseudoprimes = [
+    (600060217, 1200120433, 1800180649),
+    (600093517, 1200187033, 1800280549),
+]
+
+_primes = [2**31 - 1, 2**61 - 1, 2**89 - 1, 2**127 - 1, 2**521 - 1,
+           2**255 - 19, 2**192 - 2**64 - 1, 3317044064679887385961813]
+
+
+class PrimalityTest(unittest.TestCase):
+
+    def test_small_numbers(self):
+        primes = set(primes_less_than(20000))
+        for n in xrange(-5, 20000):
+            self.assertEqual(is_probable_prime(n), n in primes)
+
+    def test_pseudoprimes(self):
+        for n in _carmichael + _strong_pseudoprimes + _lucas_pseudoprimes:
+            self.assertFalse(is_probable_prime(n), n)
+
+    def test_lucas_pseudoprimes_pass_the_lucas_test(self):
+        for n in _lucas_pseudoprimes:
+            self.assertTrue(_strong_lucas_probable_prime(n), n)
+
+    def test_baillie_psw(self):
+        for a, b, c in _large_pseudoprimes:
+            n = a * b * c
+            self.assertTrue(pow(2, n - 1, n) == 1)
+            self.assertFalse(is_probable_prime(n), n)
+            self.assertFalse(is_probable_prime(a * a))
+            self.assertTrue(is_probable_prime(a))
+
+    def test_large_primes(self):
+        for p in _primes:
+            self.assertTrue(is_probable_prime(p), p)
+            self.assertFalse(is_probable_prime(p * p))
+            self.assertFalse(is_probable_prime(p * 1000003))
+
+
+class SieveTest(unittest.TestCase):
+
+    def test_against_trial_division(self):
+        expected = [n for n in xrange(2, 5000) if is_probable_prime(n)]
+        for segment in [2, 7, 64, 1 << 20]:
+            self.assertEqual(list(primes(0, 5000, segment)), expected)
+        for lo, hi in [(0, 2), (2, 3), (3, 3), (4, 5), (90, 97), (90, 98),
+                       (1000, 1200), (4999, 5000)]:
+            self.assertEqual(list(primes(lo, hi, 16)),
+                             [q for q in expected if lo <= q < hi])
+
+    def test_segment_windows(self):
+        lo, hi = 10**12, 10**12 + 10000
+        self.assertEqual(list(primes(lo, hi, 1000)),
+                         [n for n in xrange(lo, hi) if is_probable_prime(n)])
+
+    def test_bounds_past_the_c_long_range(self):
+        lo = 2**64 + 1
+        segments = list(_segments(lo, lo + 10, 4, []))
+        self.assertEqual([(s, e) for s, e, b in segments],
+                         [(lo, lo + 4), (lo + 4, lo + 8), (lo + 8, lo + 10)])
+        # With the odd primes below 50 as base only numbers free of those
+        # factors survive
+        base = [q for q in primes_less_than(50) if q > 2]
+        survivors = sieve_segment(lo, lo + 2000, base)
+        self.assertEqual(survivors,
+                         [lo + i for i in xrange(0, 2000, 2)
+                          if all((lo + i) % q for q in base)])
+
+
+def next_prime(n):
+    """ The least prime above n """
+    n += 1
+    while not is_probable_prime(n):
+        n += 1
+    return n
+
+
+class FactoringTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_small_numbers(self):
+        for n in xrange(-50, 3000):
+            factors = factor(n)
+            self.assertEqual(reduce(lambda x, y: x * y, factors, 1),
+                             n if n else 1)
+            self.assertTrue(all(is_probable_prime(q) for q in factors
+                                if q != -1))
+            self.assertEqual(factors, sorted(factors))
+
+    def test_pollard_rho(self):
+        p, q = next_prime(10**6), next_prime(3 * 10**6)
+        self.assertIn(pollard_rho(p * q), (p, q))
+
+    def test_ecm(self):
+        p, q = next_prime(10**14), next_prime(3 * 10**15)
+        self.assertIn(ecm(p * q), (p, q))
+        self.assertEqual(factor(p * q), [p, q])
+
+    def test_ecm_curve_finds_nothing_on_a_prime(self):
+        p = next_prime(10**20)
+        self.assertEqual(ecm_curve(p, 11, 2000, 200000), None)
+
+    def test_repeated_and_mixed_factors(self):
+        p, r = next_prime(10**14), next_prime(2**61)
+        self.assertEqual(factor(12 * p * r * r), [2, 2, 3, p, r, r])
+        q = next_prime(10**9)
+        self.assertEqual(factor(q ** 5), [q] * 5)
+        self.assertEqual(factor(-q * q * 7), [-1, 7, q, q])
+        self.assertEqual(factor(2**127 - 1), [2**127 - 1])
+
+
+class ChineseRemainderTest(unittest.TestCase):
+
+    def setUp(self):
+        rn.seed(2015)
+
+    def test_coprime_moduli(self):
+        moduli = primes_less_than(200)
+        for i in xrange(20):
+            x = rn.randrange(10**80)
+            r, M = crt([(m, x) for m in moduli])
+            self.assertEqual(M, reduce(lambda a, b: a * b, moduli))
+            self.assertEqual(r, x % M)
+
+    def test_common_factors(self):
+        self.assertEqual(crt([(4, 3), (6, 5)]), (11, 12))
+        self.assertEqual(crt([(12, 7), (18, 13), (8, 7)]), (31, 72))
+        self.assertEqual(crt([(5, 3), (5, 8)]), (3, 5))
+        self.assertEqual(crt([]), (0, 1))
+        self.assertEqual(crt([(1, 0), (7, -1)]), (6, 7))
+        self.assertRaises(ValueError, crt, [(4, 1), (6, 2)])
+
+    def test_congruences(self):
+        t = -12345
+        C = Congruences([(2, t), (3, t)])
+        for l in [5, 7, 11, 13, 17]:
+            C.add(l, t)
+            self.assertEqual(C.count(20000),
+                             len([x for x in xrange(-20000, 20001)
+                                  if (x - C.residue) % C.modulus == 0]))
+        self.assertEqual(C.symmetric(), t)
+        D = Congruences()
+        D.update([(2, t), (3, t), (5, t), (7, t), (11, t), (13, t), (17, t)])
+        self.assertEqual((D.residue, D.modulus), (C.residue, C.modulus))
+
+
+if __name__ == '__main__':
+    unittest.main()